@@ -3,7 +3,6 @@ import pandas as pd
 import numpy as np
 from urllib.parse import urlparse
 from utils.countries import get_all_countries, get_display_currencies, get_regions, get_cities
-from utils.pipeline import run_pipeline, compute_sigma_stats
 
 # ── Page config ──────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -441,6 +440,9 @@ with right_col:
             st.stop()
 
         # ── Pipeline ──────────────────────────────────────────────────────────
+        # Imported here so the form renders without loading anthropic / bs4 / the pipeline
+        from utils.pipeline import run_pipeline, compute_sigma_stats
+
         st.session_state["health_events"] = []
         st.markdown('<div class="sec-label">Pipeline</div>', unsafe_allow_html=True)
 
@@ -482,6 +484,15 @@ with right_col:
                     live_df = pd.DataFrame(collected_rows, columns=SCHEMA)
                     df_placeholder.dataframe(live_df, use_container_width=True, height=260)
 
+                elif etype == "row_validated":
+                    url = event["row"].get("web_search_result_url")
+                    for i, r in enumerate(collected_rows):
+                        if r.get("web_search_result_url") == url:
+                            collected_rows[i] = event["row"]
+                            break
+                    live_df = pd.DataFrame(collected_rows, columns=SCHEMA)
+                    df_placeholder.dataframe(live_df, use_container_width=True, height=260)
+
                 elif etype == "stats":
                     final_df = event["df"]
                     df_placeholder.dataframe(final_df, use_container_width=True, height=260)
@@ -494,6 +505,11 @@ with right_col:
                         st.session_state["health_events"] = []
                     st.session_state["health_events"].append(event)
 
+                elif etype == "health_update":
+                    for h in st.session_state.get("health_events", []):
+                        if h.get("domain") == event["domain"]:
+                            h["valid_rows"] = event["valid_rows"]
+
                 elif etype == "error":
                     st.error(event["message"])
                     progress_bar.empty()
@@ -0,0 +1,102 @@
+"""Cold-start import benchmark for app.py and every utils module.
+
+Each target is imported in a fresh interpreter with ``python -X importtime`` and
+the cumulative time of the top-level import is reported (median of --repeat
+runs).  For app.py only its module-level import statements are timed — running
+the script itself would need a Streamlit server.
+
+    python benchmarks/import_time.py                 # table
+    python benchmarks/import_time.py --top 10        # plus the slowest modules app.py pulls in
+    python benchmarks/import_time.py --json out.json # machine-readable, for tracking over time
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def _app_import_snippet() -> str:
+    """The module-level import statements of app.py, as a runnable snippet."""
+    tree = ast.parse((ROOT / "app.py").read_text(encoding="utf-8"))
+    imports = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(n) for n in imports)
+
+
+def _targets() -> dict[str, str]:
+    targets = {"app.py": _app_import_snippet()}
+    for path in sorted((ROOT / "utils").glob("*.py")):
+        if path.stem != "__init__":
+            targets[f"utils.{path.stem}"] = f"import utils.{path.stem}"
+    return targets
+
+
+def _run(snippet: str) -> tuple[int, list[tuple[int, str]]]:
+    """Import *snippet* cold; return (total µs, [(cumulative µs, module), ...])."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", snippet],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative), name[1:]))  # drop the separator space, keep the nesting indent
+    # Top-level imports are the unindented entries; skip the interpreter's own startup imports
+    startup = _startup_modules()
+    total = sum(us for us, name in modules if not name.startswith(" ") and name.strip() not in startup)
+    return total, modules
+
+
+_startup: set[str] | None = None
+
+
+def _startup_modules() -> set[str]:
+    global _startup
+    if _startup is None:
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True)
+        _startup = {line.rsplit("|", 1)[-1].strip() for line in proc.stderr.splitlines() if "|" in line}
+    return _startup
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="cold imports per target (median is reported)")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest modules imported by app.py")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    args = parser.parse_args()
+
+    results: dict[str, float] = {}
+    app_modules: list[tuple[int, str]] = []
+    for name, snippet in _targets().items():
+        try:
+            runs = [_run(snippet) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{name:28s}  failed: {e}")
+            continue
+        results[name] = statistics.median(total for total, _ in runs) / 1000
+        if name == "app.py":
+            app_modules = runs[-1][1]
+        print(f"{name:28s} {results[name]:9.1f} ms")
+
+    if args.top and app_modules:
+        print(f"\nSlowest modules imported by app.py (cumulative):")
+        for us, module in sorted(app_modules, reverse=True)[:args.top]:
+            print(f"  {us / 1000:9.1f} ms  {module.strip()}")
+
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
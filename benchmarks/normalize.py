@@ -0,0 +1,159 @@
+"""Normalisation benchmark: _normalize_rows vs the original per-row loop.
+
+Builds synthetic extraction rows (annual / hourly / missing figures, missing
+currencies, unconvertible currencies, repeated (domain, pay) pairs), runs
+Steps 4 & 5 plus dedupe through the original loop (the reference) and through
+_normalize_rows, checks the results agree and reports both timings.
+
+    python benchmarks/normalize.py                       # 1k, 10k, 100k rows
+    python benchmarks/normalize.py --sizes 1000 250000   # custom sizes
+    python benchmarks/normalize.py --json out.json       # machine-readable, for tracking over time
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import pathlib
+import random
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.pipeline import HOURS_PER_YEAR, _make_error, _normalize_rows  # noqa: E402
+
+RATES = {"USD": 1.0, "CAD": 0.73, "GBP": 1.27, "EUR": 1.08, "XXX": None}  # XXX: conversion fails
+
+
+def _get_rate(from_code: str, to_code: str) -> float | None:
+    return 1.0 if from_code == to_code else RATES.get(from_code)
+
+
+def _synthetic_rows(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        kind = rng.random()
+        annual = hourly = None
+        if kind < 0.55:
+            annual = float(rng.choice(range(30_000, 200_000, 500)))
+        elif kind < 0.85:
+            hourly = round(rng.uniform(15, 120), 2)
+        elif kind < 0.9:
+            annual, hourly = float(rng.randrange(30_000, 200_000)), round(rng.uniform(15, 120), 2)
+        rows.append({
+            "country_specific_site_url": f"site{rng.randrange(200)}.com",
+            "web_search_result_url": f"https://example.com/{i}",
+            "found_currency": rng.choice(["USD", "USD", "CAD", "GBP", "EUR", None, "", "XXX"]),
+            "found_annual_pay": annual,
+            "found_hourly_pay": hourly,
+            "display_pay_rate": None,
+            "valid": None,
+            "error_message": rng.choice([None, None, None, '{"stage": "extract"}']),
+            "validation_reason": None,
+        })
+    return rows
+
+
+def _reference_normalize(rows: list[dict], display_pref: str, display_currency: str, country_currency: str | None) -> None:
+    """The original per-row Steps 4 & 5 loop and dedupe."""
+    for row in rows:
+        annual = row.get("found_annual_pay")
+        hourly = row.get("found_hourly_pay")
+        if hourly and not annual:
+            row["found_annual_pay"] = hourly * HOURS_PER_YEAR
+        elif annual and not hourly:
+            row["found_hourly_pay"] = annual / HOURS_PER_YEAR
+
+        found_currency = row.get("found_currency")
+        source_amount = row.get("found_annual_pay") if display_pref == "Annual Salary" else row.get("found_hourly_pay")
+        if source_amount is None:
+            row["display_pay_rate"] = None
+            continue
+        if not found_currency:
+            if country_currency:
+                found_currency = country_currency
+                row["found_currency"] = country_currency
+                if not row.get("error_message"):
+                    row["error_message"] = _make_error(
+                        "currency", f"Currency inferred from country ({country_currency})", recoverable=True
+                    )
+            else:
+                row["display_pay_rate"] = None
+                row["error_message"] = _make_error("currency", "Currency code missing — cannot convert")
+                continue
+        rate = _get_rate(found_currency, display_currency)
+        if rate is not None:
+            row["display_pay_rate"] = source_amount * rate
+        else:
+            row["display_pay_rate"] = None
+            row["error_message"] = _make_error(
+                "currency", f"Currency conversion failed ({found_currency} → {display_currency})"
+            )
+
+    seen: set[tuple] = set()
+    for row in rows:
+        if row.get("display_pay_rate") is None:
+            row["valid"] = 0
+            row["validation_reason"] = "null pay rate"
+            continue
+        key = (row.get("country_specific_site_url"), row.get("found_annual_pay"))
+        if key in seen:
+            row["display_pay_rate"] = None
+            row["valid"] = 0
+            row["validation_reason"] = "duplicate data point"
+        else:
+            seen.add(key)
+
+
+def _check(expected: list[dict], actual: list[dict]) -> None:
+    for e, a in zip(expected, actual):
+        for key, value in e.items():
+            got = a.get(key)
+            same = got == value or (
+                isinstance(value, float) and isinstance(got, float) and abs(value - got) < 1e-6 * max(1.0, abs(value))
+            )
+            if not same:
+                raise AssertionError(f"{e['web_search_result_url']} {key}: expected {value!r}, got {got!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        rows = _synthetic_rows(n)
+        for display_pref, country_currency in (("Annual Salary", "USD"), ("Hourly Rate", None)):
+            reference = copy.deepcopy(rows)
+            started = time.perf_counter()
+            _reference_normalize(reference, display_pref, "USD", country_currency)
+            loop_s = time.perf_counter() - started
+
+            normalized = copy.deepcopy(rows)
+            started = time.perf_counter()
+            pending = _normalize_rows(normalized, display_pref, "USD", country_currency, _get_rate)
+            rows_s = time.perf_counter() - started
+            _check(reference, normalized)
+            assert len(pending) == sum(1 for r in reference if r["valid"] is None)
+
+            results.append({
+                "rows": n, "display_pref": display_pref, "country_currency": country_currency,
+                "loop_seconds": round(loop_s, 4), "rows_seconds": round(rows_s, 4),
+            })
+            print(
+                f"{n:>9,} rows  {display_pref:13s}  loop {loop_s * 1000:8.1f} ms   "
+                f"rows {rows_s * 1000:8.1f} ms  ({n / rows_s:>11,.0f} rows/s)"
+            )
+
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
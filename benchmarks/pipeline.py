@@ -0,0 +1,509 @@
+"""End-to-end pipeline benchmark over recorded fixtures — no API quota needed.
+
+Every external call the pipeline makes is intercepted at one seam:
+
+    search     serpapi_client.search_site
+    discover   serpapi_client.discover_top_sites
+    fetch      jina_client.fetch_page
+    llm        anthropic Messages.create (extraction, critique, validation, summary,
+               niche classification, source suggestions, SOC lookup)
+    bls        bls_client._query_bls_api
+    fx         currency._fetch_table (frankfurter)
+
+``record`` runs the real pipeline once (needs SERPAPI_KEY / ANTHROPIC_API_KEY)
+and saves every response with its measured latency to a fixture file.
+``replay`` runs ``run_pipeline`` against the fixture: each call returns its
+recorded response after a synthetic latency (fixed per call kind, or the
+recorded one), so wall time, per-stage time and calls per valid row are
+deterministic and comparable across commits.  Each replay starts cold in a
+fresh working directory (page / extraction / FX caches, run store, run log).
+
+LLM responses are keyed by the full request; when a prompt has changed since
+recording, the reply recorded for the same user message is used instead, so
+prompt edits can still be benchmarked; calls whose content follows timing
+(e.g. the summary's row list) fall back to the reply recorded for the same
+system prompt.  Extraction pages and validation rows
+are also recorded one by one: micro-batch composition depends on timing, so a
+replayed batch that was never sent as such is answered by reassembling its
+items (token usage for those is estimated).  Calls with no recorded response
+are counted as misses and fail the way an API error would.
+
+    python benchmarks/pipeline.py record fixtures/data_engineer_ca.json --title "Data Engineer" --country Canada
+    python benchmarks/pipeline.py replay fixtures/data_engineer_ca.json --runs 3
+    python benchmarks/pipeline.py replay fx.json --latency llm=0.5 --latency fetch=2 --json after.json --compare before.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import anthropic  # noqa: E402
+from anthropic.resources.messages import Messages  # noqa: E402
+
+import utils.bls_client as bls_client  # noqa: E402
+import utils.claude_client as claude_client  # noqa: E402
+import utils.currency as currency  # noqa: E402
+import utils.jina_client as jina_client  # noqa: E402
+import utils.pipeline as pipeline  # noqa: E402
+import utils.serpapi_client as serpapi_client  # noqa: E402
+
+FIXTURE_VERSION = 1
+# Synthetic replay latency per call kind, in seconds — roughly the live p50s
+DEFAULT_LATENCY = {"search": 0.8, "discover": 1.5, "fetch": 1.2, "llm": 1.5, "bls": 0.4, "fx": 0.2}
+STAGES = ("first_row", "fetch_stage", "validation", "summary", "total")
+
+_PAGE_BLOCK_RE = re.compile(r'<page id="(\d+)">\n(.*?)\n</page>', re.DOTALL)
+_SINGLE_PAGE_RE = re.compile(r"((?:SOURCE TYPE:[^\n]*\n\n)?)Page content:\n(.*)", re.DOTALL)
+_ROWS_MARKER = "Results to validate:\n"
+
+
+def _key(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _llm_keys(kwargs: dict) -> tuple[str, str, str]:
+    """(exact request key, user-message key, system-prompt key) for a messages.create call."""
+    return _key(kwargs), _key(kwargs.get("model"), kwargs.get("messages")), _key(kwargs.get("model"), kwargs.get("system"))
+
+
+def _prompt_parts(kwargs: dict) -> tuple[str, str]:
+    """(cached instructions block, user message text) of a messages.create call."""
+    system = kwargs.get("system")
+    instructions = system[-1]["text"] if isinstance(system, list) and system else str(system or "")
+    content = kwargs["messages"][-1]["content"]
+    user = content if isinstance(content, str) else "".join(b.get("text", "") for b in content if isinstance(b, dict))
+    return instructions, user
+
+
+def _item_requests(kwargs: dict) -> tuple[str, list[tuple[int | None, str]]] | None:
+    """For extraction / validation calls: (kind, [(page_id or idx, item key), ...]); None otherwise.
+
+    An item key covers one page (hint + text) or one validation row, so the
+    same page keys alike whether it was extracted alone or in any batch.
+    """
+    instructions, user = _prompt_parts(kwargs)
+    if _ROWS_MARKER in user:
+        try:
+            rows = json.loads(user.split(_ROWS_MARKER, 1)[1])
+        except ValueError:
+            return None
+        return "validate", [(row.pop("idx"), _key(instructions, row)) for row in rows]
+    if user.startswith("BATCH MODE"):
+        return "extract_batch", [(int(i), _key(instructions, body)) for i, body in _PAGE_BLOCK_RE.findall(user)]
+    single = _SINGLE_PAGE_RE.fullmatch(user)
+    if single:
+        return "extract", [(None, _key(instructions, single.group(1) + single.group(2)))]
+    return None
+
+
+def _item_results(kind: str, text: str) -> dict[int | None, dict]:
+    """Per-item results of a recorded extraction / validation response."""
+    try:
+        if kind == "extract":
+            match = re.search(r"\{.*\}", text, re.DOTALL)
+            return {None: json.loads(match.group())} if match else {}
+        match = re.search(r"\[.*\]", text, re.DOTALL)
+        items = json.loads(match.group()) if match else []
+    except ValueError:
+        return {}
+    id_field = "idx" if kind == "validate" else "page_id"
+    return {
+        item[id_field]: {k: v for k, v in item.items() if k != id_field}
+        for item in items if isinstance(item, dict) and isinstance(item.get(id_field), int)
+    }
+
+
+def _message(model: str, text: str, usage: dict) -> anthropic.types.Message:
+    return anthropic.types.Message.model_validate({
+        "id": "msg_replay", "type": "message", "role": "assistant", "model": model,
+        "content": [{"type": "text", "text": text}], "stop_reason": "end_turn", "stop_sequence": None,
+        "usage": usage,
+    })
+
+
+# ---------------------------------------------------------------------------
+# Record / replay layer
+# ---------------------------------------------------------------------------
+
+class Tape:
+    """Recorded responses by call kind and key, plus the query they came from."""
+
+    def __init__(self, query: dict | None = None) -> None:
+        self.query = query or {}
+        self.calls: dict[str, dict[str, dict]] = {kind: {} for kind in DEFAULT_LATENCY}
+        self.llm_fallback: dict[str, str] = {}  # user-message key -> exact key
+        self.llm_by_system: dict[str, str] = {}  # system-prompt key -> exact key (non-item calls)
+        self.llm_items: dict[str, dict] = {}     # page / validation row key -> its result
+        self._lock = threading.Lock()
+
+    def put(self, kind: str, key: str, result: Any, latency: float) -> None:
+        with self._lock:
+            self.calls[kind][key] = {"result": result, "latency": round(latency, 3)}
+
+    def get(self, kind: str, key: str) -> dict | None:
+        return self.calls[kind].get(key)
+
+    def save(self, path: pathlib.Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": FIXTURE_VERSION, "query": self.query, "calls": self.calls,
+            "llm_fallback": self.llm_fallback, "llm_by_system": self.llm_by_system, "llm_items": self.llm_items,
+        }
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "Tape":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") != FIXTURE_VERSION:
+            raise SystemExit(f"{path}: fixture version {data.get('version')}, expected {FIXTURE_VERSION}")
+        tape = cls(data["query"])
+        tape.calls.update(data["calls"])
+        tape.llm_fallback = data.get("llm_fallback", {})
+        tape.llm_by_system = data.get("llm_by_system", {})
+        tape.llm_items = data.get("llm_items", {})
+        return tape
+
+
+class _Patcher:
+    """Swaps module attributes and restores them on exit."""
+
+    def __init__(self) -> None:
+        self._saved: list[tuple[Any, str, Any]] = []
+
+    def set(self, obj: Any, name: str, value: Any) -> None:
+        self._saved.append((obj, name, getattr(obj, name)))
+        setattr(obj, name, value)
+
+    def restore(self) -> None:
+        for obj, name, value in reversed(self._saved):
+            setattr(obj, name, value)
+        self._saved.clear()
+
+
+def _install(patcher: _Patcher, wrap: Callable[[str, Callable, Callable[..., str]], Callable]) -> None:
+    """Route every external call through wrap(kind, original, key_fn)."""
+    search = wrap("search", serpapi_client.search_site, lambda *a, **k: _key(a[:6], a[7:], sorted(k.items())))
+    discover = wrap("discover", serpapi_client.discover_top_sites, lambda country, _key_, **k: _key(country, k.get("job_title")))
+    fetch = wrap("fetch", jina_client.fetch_page, lambda url, *a, **k: _key(url))
+    for module in (serpapi_client, pipeline):
+        patcher.set(module, "search_site", search)
+        patcher.set(module, "discover_top_sites", discover)
+    for module in (jina_client, pipeline):
+        patcher.set(module, "fetch_page", fetch)
+    patcher.set(bls_client, "_query_bls_api", wrap("bls", bls_client._query_bls_api, lambda series_id, *a, **k: _key(series_id)))
+    patcher.set(currency, "_fetch_table", wrap("fx", currency._fetch_table, lambda: _key(currency.FX_BASE_CURRENCY)))
+
+
+def _recorder(tape: Tape, patcher: _Patcher) -> None:
+    def wrap(kind: str, original: Callable, key_fn: Callable[..., str]) -> Callable:
+        def _recorded(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            result = original(*args, **kwargs)
+            tape.put(kind, key_fn(*args, **kwargs), result, time.perf_counter() - started)
+            return result
+        return _recorded
+
+    _install(patcher, wrap)
+    original_create = Messages.create
+
+    def _create(self, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        response = original_create(self, **kwargs)
+        exact, fallback, by_system = _llm_keys(kwargs)
+        tape.put("llm", exact, response.model_dump(mode="json"), time.perf_counter() - started)
+        items = _item_requests(kwargs)
+        text = getattr(response.content[0], "text", None) if response.content else None
+        results = _item_results(items[0], text) if items is not None and text else {}
+        with tape._lock:
+            tape.llm_fallback[fallback] = exact
+            if items is None:
+                tape.llm_by_system[by_system] = exact
+            else:
+                tape.llm_items.update({key: results[i] for i, key in items[1] if i in results})
+        return response
+
+    patcher.set(Messages, "create", _create)
+
+
+class _Replayer:
+    """Serves a Tape with synthetic latency and counts calls / misses per kind."""
+
+    def __init__(self, tape: Tape, latency: dict[str, float], recorded_latency: bool, scale: float) -> None:
+        self.tape = tape
+        self.latency = latency
+        self.recorded_latency = recorded_latency
+        self.scale = scale
+        self.calls: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _serve(self, kind: str, key: str | None) -> dict | None:
+        entry = self.tape.get(kind, key) if key else None
+        with self._lock:
+            self.calls[kind] += 1
+            if entry is None:
+                self.misses[kind] += 1
+        self._sleep(kind, entry)
+        return entry
+
+    def _sleep(self, kind: str, entry: dict | None) -> None:
+        delay = entry["latency"] if entry is not None and self.recorded_latency else self.latency[kind]
+        time.sleep(delay * self.scale)
+
+    def _reassemble(self, kwargs: dict) -> anthropic.types.Message | None:
+        """Answer an extraction / validation call from per-item recordings; None if nothing matches."""
+        items = _item_requests(kwargs)
+        if items is None:
+            return None
+        kind, keyed = items
+        found = [(i, self.tape.llm_items[key]) for i, key in keyed if key in self.tape.llm_items]
+        if not found:
+            return None
+        if kind == "extract":
+            text = json.dumps(found[0][1])
+        else:
+            id_field = "idx" if kind == "validate" else "page_id"
+            text = json.dumps([{id_field: i, **result} for i, result in found])
+        with self._lock:
+            self.calls["llm"] += 1
+            self.calls["llm_reassembled"] += 1
+            if len(found) < len(keyed):
+                self.misses["llm_items"] += len(keyed) - len(found)
+        self._sleep("llm", None)
+        user_chars = len(_prompt_parts(kwargs)[1]) + len(_prompt_parts(kwargs)[0])
+        return _message(kwargs["model"], text, {"input_tokens": user_chars // 4, "output_tokens": len(text) // 4})
+
+    def install(self, patcher: _Patcher) -> None:
+        misses = {"search": [], "discover": [], "fetch": (None, "fetch: no recorded response"), "bls": None, "fx": None}
+
+        def wrap(kind: str, original: Callable, key_fn: Callable[..., str]) -> Callable:
+            def _replayed(*args: Any, **kwargs: Any) -> Any:
+                entry = self._serve(kind, key_fn(*args, **kwargs))
+                if entry is None:
+                    return misses[kind]
+                result = entry["result"]
+                return tuple(result) if kind == "fetch" else result
+            return _replayed
+
+        _install(patcher, wrap)
+
+        def _create(_self, **kwargs: Any) -> Any:
+            exact, fallback, by_system = _llm_keys(kwargs)
+            if self.tape.get("llm", exact) is None:
+                exact = self.tape.llm_fallback.get(fallback)
+                if exact is None:
+                    reassembled = self._reassemble(kwargs)
+                    if reassembled is not None:
+                        return reassembled
+                    exact = self.tape.llm_by_system.get(by_system) if _item_requests(kwargs) is None else None
+            entry = self._serve("llm", exact)
+            if entry is None:
+                raise RuntimeError("messages.create: no recorded response")
+            return anthropic.types.Message.model_validate(entry["result"])
+
+        patcher.set(Messages, "create", _create)
+
+
+def _reset_process_state() -> None:
+    """Drop cache / store singletons so the next run opens fresh files in the current directory."""
+    claude_client._extraction_cache = None
+    jina_client._page_cache = None
+    pipeline._run_store = None
+    pipeline._run_log = None
+    currency._fx_cache = None
+    currency._table = None
+    currency._retry_after = 0.0
+
+
+# ---------------------------------------------------------------------------
+# Runs
+# ---------------------------------------------------------------------------
+
+def _run_query(query: dict, serpapi_key: str, anthropic_key: str) -> dict:
+    """Run the pipeline once in a fresh working directory; returns timings and counts."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="pipeline-bench-") as workdir:
+        os.chdir(workdir)
+        _reset_process_state()
+        marks: dict[str, float] = {}
+        valid = rows = 0
+        started = time.perf_counter()
+        try:
+            for event in pipeline.run_pipeline(
+                query["job_title"], query["country"], query.get("region", ""), query.get("city", ""),
+                query.get("description", ""), query.get("display_pref", "Annual Salary"),
+                query.get("display_currency", "USD"), serpapi_key, anthropic_key, "",
+            ):
+                now = time.perf_counter() - started
+                kind = event["type"]
+                if kind == "row":
+                    marks.setdefault("first_row", now)
+                elif kind == "progress" and event["value"] >= 0.86:
+                    marks.setdefault("fetch_stage", now)
+                elif kind == "stats":
+                    marks["validation"] = now
+                    rows = len(event["df"])
+                    valid = int((event["df"]["valid"] == 1).sum())
+                elif kind == "summary":
+                    marks["summary"] = now
+                elif kind == "error":
+                    print(f"  pipeline error: {event['message']}")
+            marks["total"] = time.perf_counter() - started
+        finally:
+            _reset_process_state()
+            os.chdir(cwd)
+    # Stage durations from the cumulative marks
+    durations, previous = {}, 0.0
+    for stage in STAGES:
+        if stage in marks:
+            durations[stage] = round(marks[stage] - (previous if stage != "total" else 0.0), 3)
+            previous = marks[stage] if stage != "total" else previous
+    return {"rows": rows, "valid_rows": valid, "stages": durations}
+
+
+def record(fixture: pathlib.Path, query: dict) -> None:
+    serpapi_key = os.environ.get("SERPAPI_KEY", "")
+    anthropic_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    if not serpapi_key or not anthropic_key:
+        raise SystemExit("record needs SERPAPI_KEY and ANTHROPIC_API_KEY in the environment")
+    tape = Tape(query)
+    patcher = _Patcher()
+    _recorder(tape, patcher)
+    try:
+        result = _run_query(query, serpapi_key, anthropic_key)
+    finally:
+        patcher.restore()
+    tape.save(fixture)
+    counts = {kind: len(entries) for kind, entries in tape.calls.items()}
+    print(f"Recorded {sum(counts.values())} responses {counts} -> {fixture}")
+    print(f"Live run: {result['valid_rows']} valid of {result['rows']} rows in {result['stages'].get('total', 0):.1f}s")
+
+
+def replay(
+    fixture: pathlib.Path, runs: int, latency: dict[str, float], recorded_latency: bool, scale: float,
+) -> dict:
+    tape = Tape.load(fixture)
+    results = []
+    for i in range(runs):
+        replayer = _Replayer(tape, latency, recorded_latency, scale)
+        patcher = _Patcher()
+        replayer.install(patcher)
+        try:
+            result = _run_query(tape.query, "replay", "replay")
+        finally:
+            patcher.restore()
+        result["calls"] = dict(replayer.calls)
+        result["misses"] = dict(replayer.misses)
+        results.append(result)
+        print(f"  run {i + 1}: {result['stages'].get('total', 0):.2f}s, {result['valid_rows']} valid of {result['rows']} rows")
+
+    last = results[-1]
+    total_calls = sum(n for kind, n in last["calls"].items() if kind != "llm_reassembled")
+    valid = last["valid_rows"]
+    return {
+        "fixture": str(fixture),
+        "query": tape.query,
+        "runs": runs,
+        "latency": "recorded" if recorded_latency else latency,
+        "scale": scale,
+        "stages": {
+            stage: round(statistics.median(r["stages"][stage] for r in results), 3)
+            for stage in STAGES if all(stage in r["stages"] for r in results)
+        },
+        "rows": last["rows"],
+        "valid_rows": valid,
+        "calls": last["calls"],
+        "misses": last["misses"],
+        "calls_per_valid_row": round(total_calls / valid, 2) if valid else None,
+        "llm_calls_per_valid_row": round(last["calls"].get("llm", 0) / valid, 2) if valid else None,
+    }
+
+
+def _print_report(report: dict, baseline: dict | None) -> None:
+    def delta(new: float | None, old: float | None) -> str:
+        if baseline is None or new is None or not old:
+            return ""
+        return f"  ({(new - old) / old * 100:+.1f}% vs baseline)"
+
+    base_stages = (baseline or {}).get("stages", {})
+    print(f"\n{report['query'].get('job_title')} / {report['query'].get('country')} — median of {report['runs']} run(s)")
+    for stage, seconds in report["stages"].items():
+        print(f"  {stage:12s} {seconds:8.2f} s{delta(seconds, base_stages.get(stage))}")
+    print(f"  valid rows   {report['valid_rows']:8d}   of {report['rows']}")
+    calls = {k: n for k, n in report["calls"].items() if k != "llm_reassembled"}
+    reassembled = report["calls"].get("llm_reassembled", 0)
+    print(f"  calls        {sum(calls.values()):8d}   {calls}" + (f", {reassembled} LLM replies reassembled" if reassembled else ""))
+    print(
+        f"  calls/valid  {report['calls_per_valid_row']}{delta(report['calls_per_valid_row'], (baseline or {}).get('calls_per_valid_row'))}"
+        f"   (LLM {report['llm_calls_per_valid_row']}{delta(report['llm_calls_per_valid_row'], (baseline or {}).get('llm_calls_per_valid_row'))})"
+    )
+    if any(report["misses"].values()):
+        print(f"  fixture misses {report['misses']} — re-record if the pipeline now makes different calls")
+
+
+def _parse_latency(values: list[str]) -> dict[str, float]:
+    latency = dict(DEFAULT_LATENCY)
+    for value in values:
+        kind, _, seconds = value.partition("=")
+        if kind not in latency or not seconds:
+            raise SystemExit(f"--latency expects KIND=SECONDS with KIND in {sorted(latency)}, got {value!r}")
+        latency[kind] = float(seconds)
+    return latency
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="run the live pipeline once and save every response")
+    rec.add_argument("fixture", type=pathlib.Path)
+    rec.add_argument("--title", required=True)
+    rec.add_argument("--country", required=True)
+    rec.add_argument("--region", default="")
+    rec.add_argument("--city", default="")
+    rec.add_argument("--display-pref", default="Annual Salary", choices=["Annual Salary", "Hourly Rate"])
+    rec.add_argument("--currency", default="USD")
+
+    rep = sub.add_parser("replay", help="run the pipeline offline against a fixture")
+    rep.add_argument("fixture", type=pathlib.Path)
+    rep.add_argument("--runs", type=int, default=3)
+    rep.add_argument("--latency", action="append", default=[], metavar="KIND=SECONDS",
+                     help=f"synthetic latency per call kind (defaults: {DEFAULT_LATENCY})")
+    rep.add_argument("--recorded-latency", action="store_true", help="replay each call with its recorded latency")
+    rep.add_argument("--scale", type=float, default=1.0, help="multiply every latency (e.g. 0.1 for a quick run)")
+    rep.add_argument("--json", metavar="PATH", help="write the report as JSON")
+    rep.add_argument("--compare", metavar="PATH", help="earlier --json report to diff against")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.fixture, {
+            "job_title": args.title, "country": args.country, "region": args.region, "city": args.city,
+            "display_pref": args.display_pref, "display_currency": args.currency,
+        })
+        return
+
+    report = replay(args.fixture, args.runs, _parse_latency(args.latency), args.recorded_latency, args.scale)
+    baseline = json.loads(pathlib.Path(args.compare).read_text(encoding="utf-8")) if args.compare else None
+    _print_report(report, baseline)
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import asyncio
+
+import pytest
+
+from utils.concurrency import MicroBatcher, SingleFlight
+
+
+# ---------------------------------------------------------------------------
+# MicroBatcher
+# ---------------------------------------------------------------------------
+
+def _doubler(batches: list[list[int]]):
+    async def run_batch(items: list[int]) -> list[int]:
+        batches.append(items)
+        return [i * 2 for i in items]
+    return run_batch
+
+
+def test_full_batch_flushes_at_once():
+    batches = []
+
+    async def main():
+        batcher = MicroBatcher(_doubler(batches), max_batch=3, max_delay=60)
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(3))), timeout=1)
+
+    assert asyncio.run(main()) == [0, 2, 4]
+    assert batches == [[0, 1, 2]]
+
+
+def test_partial_batch_flushes_after_the_delay():
+    batches = []
+
+    async def main():
+        batcher = MicroBatcher(_doubler(batches), max_batch=3, max_delay=0.01)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        return results, batcher.batches, batcher.items
+
+    assert asyncio.run(main()) == ([0, 2, 4, 6, 8], 2, 5)
+    assert batches == [[0, 1, 2], [3, 4]]
+
+
+def test_flush_sends_the_partial_batch_now():
+    batches = []
+
+    async def main():
+        batcher = MicroBatcher(_doubler(batches), max_batch=10, max_delay=60)
+        pending = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0)
+        batcher.flush()
+        return await asyncio.wait_for(pending, timeout=1)
+
+    assert asyncio.run(main()) == 2
+
+
+def test_batch_error_reaches_every_caller():
+    async def fail(items):
+        raise ValueError("bad batch")
+
+    async def main():
+        batcher = MicroBatcher(fail, max_batch=2, max_delay=60)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+
+
+def test_wrong_result_count_is_an_error():
+    async def short(items):
+        return items[:1]
+
+    async def main():
+        batcher = MicroBatcher(short, max_batch=2, max_delay=60)
+        await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    with pytest.raises(RuntimeError, match="1 results for 2 items"):
+        asyncio.run(main())
+
+
+def test_close_cancels_waiting_callers():
+    async def main():
+        running = asyncio.Event()
+
+        async def slow(items):
+            running.set()
+            await asyncio.sleep(60)
+            return items
+
+        batcher = MicroBatcher(slow, max_batch=1, max_delay=60)
+        queued = MicroBatcher(slow, max_batch=10, max_delay=60)
+        in_batch = asyncio.ensure_future(batcher.submit(1))
+        pending = asyncio.ensure_future(queued.submit(2))
+        await asyncio.wait_for(running.wait(), timeout=1)
+        batcher.close()
+        queued.close()
+        return await asyncio.wait_for(asyncio.gather(in_batch, pending, return_exceptions=True), timeout=1)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+
+
+# ---------------------------------------------------------------------------
+# SingleFlight
+# ---------------------------------------------------------------------------
+
+def _counting_factory(calls: list[str], key: str, result=None, delay: float = 0.0):
+    async def factory():
+        calls.append(key)
+        await asyncio.sleep(delay)
+        return key.upper() if result is None else result
+    return factory
+
+
+def test_concurrent_callers_share_one_run():
+    calls = []
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("a", _counting_factory(calls, "a", delay=0.01)) for _ in range(3)))
+        return results, flight.hits, flight.misses
+
+    assert asyncio.run(main()) == (["A", "A", "A"], 2, 1)
+    assert calls == ["a"]
+
+
+def test_finished_results_are_reused():
+    calls = []
+
+    async def main():
+        flight = SingleFlight()
+        first = await flight.do("a", _counting_factory(calls, "a"))
+        second = await flight.do("a", _counting_factory(calls, "a"))
+        return first, second
+
+    assert asyncio.run(main()) == ("A", "A")
+    assert calls == ["a"]
+
+
+def test_results_are_bounded_lru():
+    calls = []
+
+    async def main():
+        flight = SingleFlight(max_results=2)
+        for key in ("a", "b", "a", "c", "a", "b"):
+            await flight.do(key, _counting_factory(calls, key))
+
+    asyncio.run(main())
+    assert calls == ["a", "b", "c", "b"]  # "b" was the least recently used when "c" arrived
+
+
+def test_rejected_results_are_not_kept():
+    calls = []
+
+    async def main():
+        flight = SingleFlight()
+        failed = {"error": "timeout"}
+        for _ in range(2):
+            await flight.do("a", _counting_factory(calls, "a", result=failed), keep=lambda r: "error" not in r)
+
+    asyncio.run(main())
+    assert calls == ["a", "a"]
+
+
+def test_exceptions_reach_waiting_callers_and_are_not_kept():
+    calls = []
+
+    async def boom():
+        calls.append("a")
+        await asyncio.sleep(0.01)
+        raise ValueError("down")
+
+    async def main():
+        flight = SingleFlight()
+        first = await asyncio.gather(flight.do("a", boom), flight.do("a", boom), return_exceptions=True)
+        retry = await flight.do("a", _counting_factory(calls, "a"))
+        return first, retry
+
+    first, retry = asyncio.run(main())
+    assert [type(e) for e in first] == [ValueError, ValueError]
+    assert retry == "A"
+    assert calls == ["a", "a"]
+
+
+def test_one_caller_timing_out_does_not_cancel_the_others():
+    calls = []
+
+    async def main():
+        flight = SingleFlight()
+        factory = _counting_factory(calls, "a", delay=0.05)
+        impatient = asyncio.wait_for(flight.do("a", factory), timeout=0.01)
+        patient = flight.do("a", factory)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    timed_out, result = asyncio.run(main())
+    assert isinstance(timed_out, asyncio.TimeoutError)
+    assert result == "A"
+    assert calls == ["a"]
@@ -0,0 +1,98 @@
+import pytest
+
+from utils import disk_cache
+from utils.disk_cache import DiskCache
+
+
+class _Clock:
+    """Stand-in for time.time() inside disk_cache."""
+
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(disk_cache, "time", fake)
+    return fake
+
+
+def test_roundtrip_with_meta(tmp_path):
+    cache = DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=1_000)
+    cache.set("k", "value", {"etag": '"abc"'})
+    entry = cache.get("k")
+    assert (entry.value, entry.meta, entry.fresh) == ("value", {"etag": '"abc"'}, True)
+    assert cache.get("missing") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "stale_hits": 0, "evictions": 0}
+
+
+def test_persists_across_instances(tmp_path):
+    DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=1_000).set("k", "value")
+    assert DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=1_000).get("k").value == "value"
+
+
+def test_expired_entry_is_a_miss_unless_stale_allowed(tmp_path, clock):
+    cache = DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=1_000)
+    cache.set("k", "value")
+    clock.now += 61
+    assert cache.get("k") is None
+    entry = cache.get("k", allow_stale=True)
+    assert (entry.value, entry.fresh) == ("value", False)
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_touch_makes_entry_fresh_and_replaces_meta(tmp_path, clock):
+    cache = DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=1_000)
+    cache.set("k", "value", {"etag": "old"})
+    clock.now += 61
+    cache.touch("k", {"etag": "new"})
+    entry = cache.get("k")
+    assert (entry.fresh, entry.meta) == (True, {"etag": "new"})
+
+    clock.now += 61
+    cache.touch("k")
+    assert cache.get("k").meta == {"etag": "new"}
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=30)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.set(key, key * 10)
+    clock.now += 1
+    cache.get("a")  # "b" is now the least recently used
+    clock.now += 1
+    cache.set("d", "d" * 10)
+    assert cache.get("b") is None
+    assert [cache.get(k).value[0] for k in ("a", "c", "d")] == ["a", "c", "d"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_frees_enough_for_a_large_value(tmp_path, clock):
+    cache = DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=30)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.set(key, key * 10)
+    clock.now += 1
+    cache.set("big", "x" * 25)
+    assert [k for k in ("a", "b", "c") if cache.get(k) is not None] == []
+    assert cache.get("big").value == "x" * 25
+
+
+def test_value_larger_than_the_cache_is_not_stored(tmp_path):
+    cache = DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=10)
+    cache.set("small", "s")
+    cache.set("big", "x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("small").value == "s"
+
+
+def test_size_counts_utf8_bytes(tmp_path):
+    cache = DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=10)
+    cache.set("k", "€" * 4)  # 12 bytes
+    assert cache.get("k") is None
+
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils.llm_usage import (
+    BATCH_PRICE_FACTOR,
+    RunUsage,
+    create_message,
+    current_run_usage,
+    record_usage,
+    reset_run_usage,
+    set_run_usage,
+)
+from utils.pipeline import _RunState
+
+MODEL = "claude-haiku-4-5-20251001"  # $1 / $5 per million tokens
+
+
+def _response(input_tokens=0, output_tokens=0, cache_read=0, cache_write=0):
+    return SimpleNamespace(usage=SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cache_read_input_tokens=cache_read,
+        cache_creation_input_tokens=cache_write,
+    ))
+
+
+@pytest.fixture
+def usage():
+    run_usage = RunUsage(budget_tokens=1_000)
+    token = set_run_usage(run_usage)
+    yield run_usage
+    reset_run_usage(token)
+
+
+def test_calls_are_charged_to_the_active_run(usage):
+    record_usage("extract", MODEL, _response(input_tokens=400, output_tokens=100), 0.5)
+    record_usage("validate", MODEL, _response(input_tokens=200, output_tokens=50), 0.2)
+    summary = usage.summary()
+    assert summary["calls"] == 2
+    assert summary["tokens"] == 750
+    assert summary["by_kind"]["extract"]["input_tokens"] == 400
+    assert summary["cost_usd"] == pytest.approx((600 * 1 + 150 * 5) / 1_000_000, abs=1e-4)
+
+
+def test_cache_and_batch_pricing(usage):
+    record_usage("extract", MODEL, _response(input_tokens=1_000_000), 1.0)
+    record_usage("extract", MODEL, _response(cache_read=1_000_000), 1.0)
+    record_usage("extract", MODEL, _response(cache_write=1_000_000), 1.0)
+    record_usage("bulk_extract", MODEL, _response(output_tokens=1_000_000), 60.0, price_factor=BATCH_PRICE_FACTOR)
+    by_kind = usage.by_kind()
+    assert by_kind["extract"]["cost_usd"] == pytest.approx(1.00 + 0.10 + 1.25)
+    assert by_kind["bulk_extract"]["cost_usd"] == pytest.approx(2.50)
+
+
+def test_unknown_model_costs_nothing(usage):
+    record_usage("extract", "some-other-model", _response(input_tokens=100), 0.1)
+    assert usage.summary()["cost_usd"] == 0
+    assert usage.tokens == 100
+
+
+def test_calls_outside_a_run_are_not_charged():
+    assert current_run_usage() is None
+    record_usage("extract", MODEL, _response(input_tokens=100), 0.1)  # must not raise
+
+
+def test_create_message_records_the_call(usage):
+    client = SimpleNamespace(messages=SimpleNamespace(create=lambda **params: _response(input_tokens=10, output_tokens=5)))
+    create_message(client, "summary", model=MODEL, max_tokens=10, messages=[])
+    assert usage.by_kind()["summary"]["calls"] == 1
+
+
+def test_budget_exhaustion_stops_fetching(usage):
+    state = _RunState(target=10, niche_level="common", usage=usage)
+    record_usage("extract", MODEL, _response(input_tokens=600, output_tokens=399), 1.0)
+    assert not usage.budget_exhausted
+    assert not state.stop_fetching()
+
+    record_usage("extract", MODEL, _response(cache_read=1), 1.0)  # every token counts
+    assert usage.budget_exhausted
+    assert state.stop_fetching()
+    assert usage.summary()["budget_exhausted"] is True
+
+
+def test_no_budget_never_exhausts():
+    usage = RunUsage()
+    token = set_run_usage(usage)
+    try:
+        record_usage("extract", MODEL, _response(input_tokens=10_000_000), 1.0)
+    finally:
+        reset_run_usage(token)
+    assert not usage.budget_exhausted
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import message_batches
+from utils.llm_usage import RunUsage, reset_run_usage, set_run_usage
+from utils.message_batches import run_message_batch
+
+MODEL = "claude-haiku-4-5-20251001"
+
+
+def _message(text: str | None):
+    content = [] if text is None else [SimpleNamespace(type="text", text=text)]
+    return SimpleNamespace(content=content, usage=SimpleNamespace(input_tokens=100, output_tokens=20))
+
+
+class FakeBatches:
+    """messages.batches stand-in: a batch ends after *polls* retrieves."""
+
+    def __init__(self, outcomes: dict[str, str | None], polls: int = 1) -> None:
+        self.outcomes = outcomes  # custom_id -> text, or None for an errored request
+        self.polls = polls
+        self.submitted: list[list[str]] = []
+        self.retrieves = 0
+        self.cancelled: list[str] = []
+
+    def _batch(self, batch_id: str, status: str):
+        return SimpleNamespace(id=batch_id, processing_status=status, request_counts={})
+
+    def create(self, requests):
+        self.submitted.append([r["custom_id"] for r in requests])
+        return self._batch(f"batch-{len(self.submitted)}", "in_progress")
+
+    def retrieve(self, batch_id):
+        self.retrieves += 1
+        return self._batch(batch_id, "ended" if self.retrieves >= self.polls else "in_progress")
+
+    def cancel(self, batch_id):
+        self.cancelled.append(batch_id)
+
+    def results(self, batch_id):
+        for custom_id in self.submitted[int(batch_id.split("-")[1]) - 1]:
+            text = self.outcomes.get(custom_id, "")
+            if custom_id == "empty":
+                result = SimpleNamespace(type="succeeded", message=_message(None))
+            elif text is None:
+                result = SimpleNamespace(type="errored")
+            else:
+                result = SimpleNamespace(type="succeeded", message=_message(text))
+            yield SimpleNamespace(custom_id=custom_id, result=result)
+
+
+def _client(batches: FakeBatches):
+    return SimpleNamespace(messages=SimpleNamespace(batches=batches))
+
+
+def _requests(*ids: str) -> list[dict]:
+    return [{"custom_id": i, "params": {"model": MODEL, "max_tokens": 10, "messages": []}} for i in ids]
+
+
+@pytest.fixture
+def usage():
+    run_usage = RunUsage()
+    token = set_run_usage(run_usage)
+    yield run_usage
+    reset_run_usage(token)
+
+
+def test_texts_per_request(usage):
+    batches = FakeBatches({"a": "  first ", "b": None}, polls=3)
+    texts = run_message_batch(_client(batches), _requests("a", "b", "empty"), poll_interval=0, sleep=lambda s: None)
+    assert texts == {"a": "first", "b": None, "empty": None}
+    assert batches.retrieves == 3
+
+
+def test_succeeded_requests_are_charged_at_the_batch_price(usage):
+    batches = FakeBatches({"a": "x", "b": None})
+    run_message_batch(_client(batches), _requests("a", "b"), poll_interval=0, sleep=lambda s: None, kind="bulk_extract")
+    totals = usage.by_kind()["bulk_extract"]
+    assert totals["calls"] == 1
+    assert totals["cost_usd"] == pytest.approx((100 * 1 + 20 * 5) / 1_000_000 * 0.5)
+
+
+def test_large_request_lists_are_split(usage, monkeypatch):
+    monkeypatch.setattr(message_batches, "MAX_REQUESTS_PER_BATCH", 2)
+    batches = FakeBatches({}, polls=0)
+    texts = run_message_batch(_client(batches), _requests("a", "b", "c"), poll_interval=0, sleep=lambda s: None)
+    assert batches.submitted == [["a", "b"], ["c"]]
+    assert set(texts) == {"a", "b", "c"}
+
+
+def test_timeout_cancels_the_batch(usage):
+    batches = FakeBatches({"a": "x"}, polls=10**6)
+    with pytest.raises(TimeoutError):
+        run_message_batch(_client(batches), _requests("a"), poll_interval=0, timeout=-1, sleep=lambda s: None)
+    assert batches.cancelled == ["batch-1"]
@@ -0,0 +1,148 @@
+import json
+
+import pytest
+
+from utils.pre_extract import get_run_pre_extract_stats, likely_low_confidence, pre_extract
+from utils.tracing import SpanRecorder, reset_recorder, set_recorder
+
+
+def _json_ld_page(posting: dict) -> str:
+    return f"Careers at Example\n{json.dumps(posting)}\nApply now"
+
+
+def _posting(**overrides) -> dict:
+    posting = {
+        "@context": "https://schema.org",
+        "@type": "JobPosting",
+        "title": "Senior Software Engineer",
+        "baseSalary": {
+            "@type": "MonetaryAmount",
+            "currency": "CAD",
+            "value": {"@type": "QuantitativeValue", "minValue": 90000, "maxValue": 110000, "unitText": "YEAR"},
+        },
+        "jobLocation": {
+            "@type": "Place",
+            "address": {"addressCountry": "Canada", "addressRegion": "ON", "addressLocality": "Toronto"},
+        },
+    }
+    posting.update(overrides)
+    return posting
+
+
+# ---------------------------------------------------------------------------
+# JSON-LD
+# ---------------------------------------------------------------------------
+
+def test_json_ld_range():
+    result = pre_extract(_json_ld_page(_posting()), "Software Engineer")
+    assert result["confidence"] == "high"
+    assert result["found_currency"] == "CAD"
+    assert result["found_annual_pay"] == 100000
+    assert result["found_hourly_pay"] is None
+    assert (result["found_pay_low"], result["found_pay_high"]) == (90000, 110000)
+    assert (result["found_country"], result["found_region"], result["found_city"]) == ("Canada", "ON", "Toronto")
+
+
+def test_json_ld_monthly_value_is_annualised():
+    posting = _posting(baseSalary={"currency": "EUR", "value": "4,500", "unitText": "MONTH"})
+    result = pre_extract(_json_ld_page(posting), "Software Engineer")
+    assert result["found_currency"] == "EUR"
+    assert result["found_annual_pay"] == 54000
+    assert result["found_pay_low"] is None
+
+
+def test_json_ld_hourly():
+    posting = _posting(baseSalary={"currency": "usd", "value": {"value": 42.5, "unitText": "HOUR"}})
+    result = pre_extract(_json_ld_page(posting), "Software Engineer")
+    assert result["found_currency"] == "USD"
+    assert result["found_hourly_pay"] == 42.5
+    assert result["found_annual_pay"] is None
+
+
+def test_json_ld_inside_graph_and_remote():
+    page = _json_ld_page({"@graph": [{"@type": "Organization"}, _posting(jobLocationType="TELECOMMUTE")]})
+    result = pre_extract(page, "Software Engineer")
+    assert result["remote_ok"] == 1
+
+
+def test_json_ld_iso_country_code_is_dropped():
+    posting = _posting(jobLocation=[{"address": {"addressCountry": "CA", "addressLocality": "Toronto"}}])
+    result = pre_extract(_json_ld_page(posting), "Software Engineer")
+    assert result["found_country"] is None
+    assert result["found_city"] == "Toronto"
+
+
+@pytest.mark.parametrize("posting", [
+    _posting(title="Registered Nurse"),                                                # another job
+    _posting(baseSalary={"currency": "CAD", "value": 100000}),                        # no unit
+    _posting(baseSalary={"value": 100000, "unitText": "YEAR"}),                       # no currency
+    _posting(baseSalary={"currency": "CAD", "value": 100, "unitText": "YEAR"}),       # implausible
+])
+def test_json_ld_rejected(posting):
+    assert pre_extract(_json_ld_page(posting), "Software Engineer") is None
+
+
+def test_json_ld_skips_malformed_json():
+    page = "{not json} " + _json_ld_page(_posting())
+    assert pre_extract(page, "Software Engineer")["found_annual_pay"] == 100000
+
+
+# ---------------------------------------------------------------------------
+# Salary patterns
+# ---------------------------------------------------------------------------
+
+def test_pattern_hourly_range():
+    page = "Software Engineer - Toronto\nPay: $38.46 - $63.46 per hour\nBenefits included."
+    result = pre_extract(page, "Software Engineer", "CAD")
+    assert result["confidence"] == "medium"
+    assert result["found_currency"] == "CAD"
+    assert result["found_hourly_pay"] == pytest.approx(50.96)
+    assert (result["found_pay_low"], result["found_pay_high"]) == (38.46, 63.46)
+
+
+def test_pattern_k_suffix_annual():
+    page = "Software Engineer\nSalary: £45K-£55K a year"
+    result = pre_extract(page, "Software Engineer", "GBP")
+    assert result["found_currency"] == "GBP"
+    assert result["found_annual_pay"] == 50000
+    assert (result["found_pay_low"], result["found_pay_high"]) == (45000, 55000)
+
+
+def test_pattern_repeated_figure_counts_once():
+    page = "Software Engineer €60,000/year. Apply today: €60,000/year"
+    assert pre_extract(page, "Software Engineer")["found_annual_pay"] == 60000
+
+
+@pytest.mark.parametrize("page, currency", [
+    ("Software Engineer: $90,000/year, Senior Software Engineer: $120,000/year", "USD"),  # two figures
+    ("Software Engineer salary $5,000 per month", "PLN"),                                # "$" on a non-dollar market
+    ("Nurse: $40 per hour", "USD"),                                                      # title not on the page
+    ("Software Engineer: $90 - $40 per hour", "USD"),                                     # inverted range
+    ("Software Engineer, competitive salary", "USD"),                                     # no figure at all
+])
+def test_pattern_inconclusive(page, currency):
+    assert pre_extract(page, "Software Engineer", currency) is None
+
+
+# ---------------------------------------------------------------------------
+# Pre-screen and counters
+# ---------------------------------------------------------------------------
+
+def test_likely_low_confidence():
+    assert likely_low_confidence("Software Engineer, pay CAD 95,000", "Software Engineer") is False
+    assert likely_low_confidence("Software Engineer, great team", "Software Engineer") is True
+    assert likely_low_confidence("Pay CAD 95,000", "Software Engineer") is True
+    assert likely_low_confidence("x" * 15000 + "Software Engineer $95,000", "Software Engineer") is True
+
+
+def test_run_stats_count_only_the_active_run():
+    pre_extract("Software Engineer, competitive salary", "Software Engineer")  # outside any run
+    token = set_recorder(SpanRecorder())
+    try:
+        pre_extract(_json_ld_page(_posting()), "Software Engineer")
+        pre_extract("Software Engineer €60,000/year", "Software Engineer")
+        pre_extract("Software Engineer, competitive salary", "Software Engineer")
+        stats = get_run_pre_extract_stats()
+    finally:
+        reset_recorder(token)
+    assert stats == {"pages": 3, "json_ld": 1, "pattern": 1, "inconclusive": 1, "llm_calls_avoided": 2}
@@ -0,0 +1,123 @@
+import time
+
+import pytest
+
+from utils.pipeline import _is_settled, _make_error, _NO_SALARY_DATA
+from utils.run_store import RunStore
+
+QUERY = "software engineer|canada|"
+
+
+def _row(url: str, domain: str = "a.com", **fields) -> dict:
+    row = {
+        "country_specific_site_url": domain,
+        "web_search_result_url": url,
+        "found_annual_pay": None,
+        "found_hourly_pay": None,
+        "error_message": None,
+    }
+    row.update(fields)
+    return row
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RunStore(tmp_path / "runs.sqlite", ttl_seconds=3600)
+
+
+def test_rows_survive_an_unfinished_run(store, tmp_path):
+    store.start_run("r1", QUERY)
+    store.add_row("r1", QUERY, _row("https://a.com/1", found_annual_pay=90000))
+    store.add_row("r1", QUERY, _row("https://a.com/2"))
+    store.mark_domain_done("r1", QUERY, "a.com", urls_fetched=2, valid_rows=1)
+
+    reopened = RunStore(tmp_path / "runs.sqlite", ttl_seconds=3600)
+    assert reopened.last_complete_run(QUERY) is None
+    assert [r["web_search_result_url"] for r in reopened.load_rows(QUERY)] == ["https://a.com/1", "https://a.com/2"]
+    assert reopened.covered_domains(QUERY) == {"a.com": {"valid_rows": 1, "urls_fetched": 2}}
+
+
+def test_rows_are_scoped_to_their_query(store):
+    store.add_row("r1", QUERY, _row("https://a.com/1"))
+    store.add_row("r2", "nurse|canada|", _row("https://a.com/1"))
+    assert len(store.load_rows(QUERY)) == 1
+    assert store.covered_domains("nurse|canada|") == {}
+
+
+def test_later_row_for_a_url_replaces_the_earlier_one(store):
+    store.add_row("r1", QUERY, _row("https://a.com/1", error_message=_make_error("fetch", "NETWORK: timeout")))
+    store.add_row("r2", QUERY, _row("https://a.com/1", found_annual_pay=90000))
+    (row,) = store.load_rows(QUERY)
+    assert row["found_annual_pay"] == 90000
+
+
+def test_row_without_url_is_ignored(store):
+    store.add_row("r1", QUERY, _row(""))
+    assert store.load_rows(QUERY) == []
+
+
+def test_finish_run_records_validation(store):
+    rows = [_row("https://a.com/1", valid=1), _row("https://a.com/2", valid=0)]
+    store.start_run("r1", QUERY)
+    for row in rows:
+        store.add_row("r1", QUERY, row)
+    store.finish_run("r1", QUERY, rows)
+
+    run = store.last_complete_run(QUERY)
+    assert (run.run_id, run.valid_count) == ("r1", 1)
+    assert [r["web_search_result_url"] for r in store.load_rows(QUERY, valid_only=True)] == ["https://a.com/1"]
+
+
+def test_expired_data_is_purged_on_open(tmp_path, monkeypatch):
+    path = tmp_path / "runs.sqlite"
+    old = RunStore(path, ttl_seconds=3600)
+    old.start_run("r1", QUERY)
+    old.add_row("r1", QUERY, _row("https://a.com/1"))
+    old.mark_domain_done("r1", QUERY, "a.com", urls_fetched=1, valid_rows=0)
+    old.finish_run("r1", QUERY, [])
+
+    later = time.time() + 3601
+    monkeypatch.setattr("utils.run_store.time.time", lambda: later)
+    reopened = RunStore(path, ttl_seconds=3600)
+    assert reopened.last_complete_run(QUERY) is None
+    assert reopened.load_rows(QUERY) == []
+    assert reopened.covered_domains(QUERY) == {}
+
+
+# ---------------------------------------------------------------------------
+# Which stored rows a resumed run keeps (the rest are refetched)
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("row", [
+    _row("u", found_annual_pay=90000),
+    _row("u", found_hourly_pay=45.0),
+    _row("u", error_message=_make_error("fetch", "WALL: login required")),
+    _row("u", error_message=_make_error("extract", _NO_SALARY_DATA)),
+    _row("u", error_message="Implausible range for the role"),  # validation reason
+])
+def test_settled_rows(row):
+    assert _is_settled(row)
+
+
+@pytest.mark.parametrize("row", [
+    _row("u", error_message=_make_error("fetch", "NETWORK: connection reset")),
+    _row("u", error_message=_make_error("fetch", "Page fetch failed")),
+    _row("u", error_message=_make_error("extract", "API error: overloaded", recoverable=True)),
+])
+def test_transient_failures_are_retried(row):
+    assert not _is_settled(row)
+
+
+def test_resume_keeps_settled_rows_and_covered_domains(store):
+    network = _make_error("fetch", "NETWORK: timeout")
+    store.add_row("r1", QUERY, _row("https://a.com/1", found_annual_pay=90000))
+    store.add_row("r1", QUERY, _row("https://a.com/2", error_message=network))
+    store.add_row("r1", QUERY, _row("https://b.com/1", domain="b.com", error_message=network))
+    store.mark_domain_done("r1", QUERY, "b.com", urls_fetched=1, valid_rows=0)
+
+    covered = store.covered_domains(QUERY)
+    kept = [
+        r["web_search_result_url"] for r in store.load_rows(QUERY)
+        if _is_settled(r) or r.get("country_specific_site_url") in covered
+    ]
+    assert kept == ["https://a.com/1", "https://b.com/1"]
@@ -0,0 +1,153 @@
+import asyncio
+
+from utils.scheduler import DomainState, FetchScheduler
+
+BAIL_LIMITS = {"wall": 2, "network": 3}
+
+
+def _run(domains: dict[str, list[str]], outcomes=None, *, workers=4, per_domain=2, delay=0.0,
+         domain_timeout=60.0, stop_after=None, bail_limit=10, raise_for=()):
+    """Schedule *domains* (rank = insertion order) and return what happened.
+
+    outcomes maps a URL to the outcome on_result reports for it (default "data").
+    """
+    outcomes = outcomes or {}
+    fetched: list[str] = []
+    done: list[DomainState] = []
+    peak = {"total": 0, **{d: 0 for d in domains}}
+    active = {"total": 0, **{d: 0 for d in domains}}
+
+    async def fetch(url, state):
+        for key in ("total", state.domain):
+            active[key] += 1
+            peak[key] = max(peak[key], active[key])
+        try:
+            await asyncio.sleep(delay)
+            if url in raise_for:
+                raise RuntimeError("boom")
+            fetched.append(url)
+            return url
+        finally:
+            active["total"] -= 1
+            active[state.domain] -= 1
+
+    def on_result(state, url):
+        return outcomes.get(url, "data")
+
+    def should_stop():
+        return stop_after is not None and len(fetched) >= stop_after
+
+    async def main():
+        scheduler = FetchScheduler(
+            fetch, on_result, done.append, should_stop,
+            workers=workers, per_domain=per_domain, bail_limits=BAIL_LIMITS, domain_timeout=domain_timeout,
+        )
+        scheduler.start()
+        states = {
+            domain: scheduler.add_domain(domain, urls, rank, None, bail_limit)
+            for rank, (domain, urls) in enumerate(domains.items())
+        }
+        await asyncio.wait_for(scheduler.join(), timeout=5)
+        scheduler.close()
+        return scheduler, states
+
+    scheduler, states = asyncio.run(main())
+    return scheduler, states, fetched, done, peak
+
+
+def _urls(domain: str, n: int) -> list[str]:
+    return [f"https://{domain}/{i}" for i in range(n)]
+
+
+def test_fetches_everything_in_priority_order():
+    domains = {"a.com": _urls("a.com", 3), "b.com": _urls("b.com", 2)}
+    scheduler, states, fetched, done, _ = _run(domains, workers=1, per_domain=1)
+    assert fetched == domains["a.com"] + domains["b.com"]
+    assert [s.domain for s in done] == ["a.com", "b.com"]
+    assert states["a.com"].urls_fetched == 3 and states["a.com"].valid_rows == 3
+    assert states["a.com"].closed_reason is None
+    assert scheduler.pages_done == 5
+
+
+def test_per_domain_limit_caps_in_flight_fetches():
+    domains = {"a.com": _urls("a.com", 6), "b.com": _urls("b.com", 6)}
+    _, _, fetched, _, peak = _run(domains, workers=8, per_domain=2, delay=0.01)
+    assert len(fetched) == 12
+    assert peak["a.com"] == 2 and peak["b.com"] == 2
+    assert peak["total"] == 4  # the rest of the pool has no domain it may fetch from
+
+
+def test_worker_pool_caps_total_in_flight_fetches():
+    domains = {d: _urls(d, 3) for d in ("a.com", "b.com", "c.com")}
+    _, _, _, _, peak = _run(domains, workers=2, per_domain=3, delay=0.01)
+    assert peak["total"] == 2
+
+
+def test_consecutive_walls_close_the_domain():
+    urls = _urls("a.com", 6)
+    scheduler, states, fetched, done, _ = _run(
+        {"a.com": urls}, {u: "wall" for u in urls}, workers=1, per_domain=1,
+    )
+    state = states["a.com"]
+    assert fetched == urls[:2]
+    assert (state.closed_reason, state.wall_hits, state.queued) == ("bail", 2, 0)
+    assert done == [state]
+    assert scheduler.backlog == 0
+
+
+def test_data_resets_the_consecutive_counters():
+    urls = _urls("a.com", 5)
+    outcomes = {urls[0]: "wall", urls[1]: "data", urls[2]: "wall", urls[3]: "data", urls[4]: "wall"}
+    _, states, fetched, _, _ = _run({"a.com": urls}, outcomes, workers=1, per_domain=1)
+    assert len(fetched) == 5
+    assert states["a.com"].closed_reason is None
+    assert states["a.com"].wall_hits == 3
+
+
+def test_no_data_bail_uses_the_domain_limit():
+    urls = _urls("a.com", 5)
+    _, states, fetched, _, _ = _run(
+        {"a.com": urls}, {u: "no_data" for u in urls}, workers=1, per_domain=1, bail_limit=3,
+    )
+    assert len(fetched) == 3
+    assert states["a.com"].closed_reason == "bail"
+
+
+def test_bailing_one_domain_leaves_the_others_running():
+    a, b = _urls("a.com", 4), _urls("b.com", 4)
+    _, states, fetched, _, _ = _run(
+        {"a.com": a, "b.com": b}, {u: "network" for u in a}, workers=2, per_domain=1,
+    )
+    assert states["a.com"].closed_reason == "bail"
+    assert states["a.com"].network_errors == 3
+    assert states["b.com"].urls_fetched == 4
+
+
+def test_fetch_exception_counts_as_no_data():
+    urls = _urls("a.com", 2)
+    _, states, fetched, _, _ = _run({"a.com": urls}, workers=1, per_domain=1, raise_for={urls[0]})
+    assert fetched == urls[1:]
+    assert (states["a.com"].urls_fetched, states["a.com"].valid_rows) == (2, 1)
+
+
+def test_should_stop_drops_queued_urls():
+    domains = {"a.com": _urls("a.com", 5), "b.com": _urls("b.com", 5)}
+    scheduler, states, fetched, done, _ = _run(domains, workers=1, per_domain=1, stop_after=3)
+    assert len(fetched) == 3
+    assert states["b.com"].closed_reason == "stopped"
+    assert {s.domain for s in done} == {"a.com", "b.com"}
+    assert scheduler.backlog == 0
+
+
+def test_domain_timeout_drops_the_rest_of_the_domain():
+    domains = {"a.com": _urls("a.com", 10)}
+    _, states, fetched, done, _ = _run(domains, workers=1, per_domain=1, delay=0.02, domain_timeout=0.05)
+    assert states["a.com"].closed_reason == "timeout"
+    assert 1 <= len(fetched) < 10
+    assert done == [states["a.com"]]
+
+
+def test_domain_without_urls_finishes_at_once():
+    _, states, fetched, done, _ = _run({"a.com": []})
+    assert fetched == []
+    assert done == [states["a.com"]]
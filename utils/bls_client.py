@@ -18,9 +18,12 @@ from __future__ import annotations
 
 import json
 import re
-import requests
 from typing import Any
 
+from utils import transport
+from utils.llm_usage import create_message
+from utils.tracing import span
+
 _HAIKU_MODEL = "claude-haiku-4-5-20251001"
 _BLS_API_URL = "https://api.bls.gov/publicAPI/v2/timeseries/data/"
 
@@ -43,7 +46,8 @@ def _lookup_soc_code(job_title: str, anthropic_client) -> tuple[str, str] | None
         f'Pick the single best match. No explanations, no markdown.'
     )
     try:
-        response = anthropic_client.messages.create(
+        response = create_message(
+            anthropic_client, "soc_lookup",
             model=_HAIKU_MODEL,
             max_tokens=128,
             messages=[{"role": "user", "content": prompt}],
@@ -89,7 +93,8 @@ def _query_bls_api(series_id: str, bls_api_key: str | None = None) -> dict | Non
         payload["registrationkey"] = bls_api_key
 
     try:
-        resp = requests.post(_BLS_API_URL, json=payload, timeout=15)
+        with span("bls.query"):
+            resp = transport.post(_BLS_API_URL, json=payload, timeout=15)
         resp.raise_for_status()
         data = resp.json()
 
@@ -1,30 +1,113 @@
+from __future__ import annotations
+
+import contextvars
+import hashlib
 import json
+import pathlib
 import re
-import anthropic
-import pandas as pd
+import statistics
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING
+
+from utils.disk_cache import DiskCache
+from utils.llm_usage import create_message
+from utils.pre_extract import likely_low_confidence, pre_extract
+
+if TYPE_CHECKING:  # annotations only — callers pass in the client and DataFrame
+    import anthropic
+    import pandas as pd
 
 HAIKU_MODEL = "claude-haiku-4-5-20251001"
 SONNET_MODEL = "claude-sonnet-4-6"
 
+# Bump whenever the extraction / critique prompts change so cached results are not reused
+EXTRACTION_PROMPT_VERSION = "3"
+
+# Content-addressed extraction cache
+EXTRACTION_CACHE_FILE = pathlib.Path("pipeline_cache") / "extractions.sqlite"
+EXTRACTION_CACHE_TTL_HOURS = 14 * 24
+EXTRACTION_CACHE_MAX_MB = 50
+
+# When the low-confidence critique call starts (see extract_salary)
+CRITIQUE_MODES = ("sequential", "speculative", "race")
+CRITIQUE_MODE = "sequential"
+CRITIQUE_POOL_WORKERS = 8  # threads for concurrent first-pass / critique calls
+
+# Validation runs in chunks so large row sets are not truncated by max_tokens
+VALIDATION_CHUNK_SIZE = 25     # rows per validation call
+VALIDATION_MAX_WORKERS = 4     # chunks validated in parallel
+VALIDATION_REASONING_CHARS = 300  # extraction reasoning sent to the validator is trimmed to this
+
 EXTRACTION_SYSTEM = """You are a salary data extractor. Your job is to extract the most relevant salary information from web page content. Return ONLY valid JSON with no additional text."""
 
 VALIDATION_SYSTEM = """You are a job title and location matching expert. Determine if search results match search criteria using semantic matching. Return ONLY valid JSON."""
 
 SUMMARY_SYSTEM = """You are a compensation market expert for myBasePay, a professional salary benchmarking platform. Provide accurate, helpful market intelligence."""
 
+# Prompts are built as (instructions, tail): the run-stable rules first, the
+# per-call content (page text, rows) last.  They are not marked for prompt
+# caching — Haiku 4.5 only caches prefixes of 4096+ tokens and these
+# instructions are ~1.1k, so cache_control would never take effect.
+
+
+def _user_prompt(instructions: str, tail: str) -> list[dict]:
+    """The single user message for an (instructions, tail) prompt."""
+    return [{"role": "user", "content": f"{instructions}\n\n{tail}"}]
+
+
 # CHANGE 8: Module-level extraction failure log
 _extraction_failures: list[dict] = []
 
+_extraction_cache: DiskCache | None = None
+_extraction_cache_lock = threading.Lock()
 
-def _build_extraction_prompt(
+
+def _get_extraction_cache() -> DiskCache:
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = DiskCache(
+                EXTRACTION_CACHE_FILE,
+                ttl_seconds=EXTRACTION_CACHE_TTL_HOURS * 3600,
+                max_bytes=EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+            )
+        return _extraction_cache
+
+
+def _extraction_cache_key(
+    page_text: str,
     job_title: str,
     location_str: str,
     currency_hint: str,
-    page_text: str,
-    source_type: str | None = None,  # CHANGE 3
+    source_type: str | None,
 ) -> str:
-    """Build the extraction prompt for a first-pass salary extraction."""
-    # CHANGE 3: Build source hint block
+    """Hash of everything that determines an extraction result."""
+    payload = json.dumps(
+        [page_text, job_title, location_str, currency_hint, source_type, HAIKU_MODEL, EXTRACTION_PROMPT_VERSION],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_critique_pool: ThreadPoolExecutor | None = None
+_critique_pool_lock = threading.Lock()
+
+
+def _get_critique_pool() -> ThreadPoolExecutor:
+    global _critique_pool
+    with _critique_pool_lock:
+        if _critique_pool is None:
+            _critique_pool = ThreadPoolExecutor(CRITIQUE_POOL_WORKERS, thread_name_prefix="critique")
+        return _critique_pool
+
+
+def get_extraction_cache_stats() -> dict:
+    return _get_extraction_cache().stats()
+
+
+def _source_hint(source_type: str | None) -> str:
+    """Per-source-type extraction hint (CHANGE 3)."""
     source_hint = ""
     if source_type == "job_board":
         source_hint = "SOURCE TYPE: Job board listing. Salary typically appears as a range '$X.XX - $Y.YY per hour' or '$X,000 - $Y,000/year' near the job title or in a compensation/pay section. Extract the full range.\n\n"
@@ -35,7 +118,12 @@ def _build_extraction_prompt(
     elif source_type == "aggregator":
         source_hint = "SOURCE TYPE: Salary aggregator (crowdsourced or employer-reported). Extract the most prominent figure for the specific job title shown.\n\n"
 
-    return f"""{source_hint}Given this web page content from a salary data site, extract salary data matching:
+    return source_hint
+
+
+def _extraction_instructions(job_title: str, location_str: str, currency_hint: str) -> str:
+    """The instruction block shared by single-page and batched extraction prompts."""
+    return f"""Given this web page content from a salary data site, extract salary data matching:
 - Job Title: "{job_title}"
 - Location: {location_str}{currency_hint}
 
@@ -96,10 +184,54 @@ CRITICAL for numeric fields:
 - Strip all currency symbols, commas, and K/M suffixes before returning (e.g. "$53,035" → 53035, "45K" → 45000).
 - If no salary data is found, use JSON null (not the string "null").
 
-If absolutely no salary data is found, return all null values with confidence "low" and reasoning explaining why.
+If absolutely no salary data is found, return all null values with confidence "low" and reasoning explaining why."""
 
-Page content:
+
+def _build_extraction_prompt(
+    job_title: str,
+    location_str: str,
+    currency_hint: str,
+    page_text: str,
+    source_type: str | None = None,  # CHANGE 3
+) -> tuple[str, str]:
+    """Build the first-pass extraction prompt as (instructions, per-page tail)."""
+    instructions = _extraction_instructions(job_title, location_str, currency_hint)
+    tail = f"""{_source_hint(source_type)}Page content:
 {page_text[:15000]}"""
+    return instructions, tail
+
+
+def _build_batch_extraction_prompt(
+    job_title: str,
+    location_str: str,
+    currency_hint: str,
+    pages: list[tuple[str, str | None]],
+) -> tuple[str, str]:
+    """Build one prompt covering several pages, each wrapped in <page id="N"> delimiters.
+
+    The instructions are the same block as the single-page prompt.
+    """
+    blocks = []
+    for i, (page_text, source_type) in enumerate(pages):
+        hint = _source_hint(source_type)
+        blocks.append(f'<page id="{i}">\n{hint}{page_text[:15000]}\n</page>')
+    n = len(pages)
+    instructions = _extraction_instructions(job_title, location_str, currency_hint)
+    tail = f"""BATCH MODE: {n} separate pages follow, each wrapped in <page id="N"> ... </page>.
+Extract each page independently — apply the instructions above (and the page's own SOURCE TYPE hint, if any) to that page only.
+Return ONLY a JSON array of exactly {n} objects in page order. Each object uses the schema above plus an integer "page_id" matching its page.
+
+{chr(10).join(blocks)}"""
+    return instructions, tail
+
+
+_TARGETED_SEARCH = """TARGETED SEARCH INSTRUCTION:
+Before finalizing your answer, systematically scan the page for:
+1. ANY occurrence of "$", "£", "€", "¥" followed by a number
+2. ANY number followed by "/hr", "/hour", "/yr", "/year", "per hour", "per year", "annually"
+3. ANY JSON-LD block (in <script> tags) containing "salary", "baseSalary", "minValue", "maxValue"
+4. ANY table cell containing a number that looks like a wage
+Report what you find in your reasoning even if uncertain."""
 
 
 def _build_critique_prompt(
@@ -107,35 +239,50 @@ def _build_critique_prompt(
     location_str: str,
     page_text: str,
     first_attempt: dict,
-) -> str:
-    """Build a retry-with-critique prompt for low-confidence extractions."""
+) -> tuple[str, str]:
+    """Build a retry-with-critique prompt for low-confidence extractions as (instructions, tail)."""
     first_json = json.dumps(first_attempt, indent=2)
-    return f"""Here is a first extraction attempt for salary data from a web page.
+    instructions = f"""Here is a first extraction attempt for salary data from a web page.
 The extraction was flagged as LOW confidence. Your job is to confirm or correct the figures.
 
 Target:
 - Job Title: "{job_title}"
 - Location: {location_str}
 
-First extraction attempt:
-{first_json}
-
-Review the page content below and either:
+Review the page content and either:
 1. Confirm the figures if they look correct, upgrading confidence if warranted.
 2. Correct the figures if the first attempt was wrong — extract fresh values.
 
 Return the same JSON schema as the first attempt. Set confidence to your own assessment.
 
-TARGETED SEARCH INSTRUCTION:
-Before finalizing your answer, systematically scan the page for:
-1. ANY occurrence of "$", "£", "€", "¥" followed by a number
-2. ANY number followed by "/hr", "/hour", "/yr", "/year", "per hour", "per year", "annually"
-3. ANY JSON-LD block (in <script> tags) containing "salary", "baseSalary", "minValue", "maxValue"
-4. ANY table cell containing a number that looks like a wage
-Report what you find in your reasoning even if uncertain.
+{_TARGETED_SEARCH}"""
+    tail = f"""First extraction attempt:
+{first_json}
 
 Page content:
 {page_text[:15000]}"""
+    return instructions, tail
+
+
+def _build_targeted_extraction_prompt(
+    job_title: str,
+    location_str: str,
+    currency_hint: str,
+    page_text: str,
+    source_type: str | None = None,
+) -> tuple[str, str]:
+    """Critique-style prompt that does not need a first attempt, so it can run alongside it.
+
+    Uses the first-pass prompt's instructions; the critique's targeted search
+    goes in the per-page tail.
+    """
+    instructions = _extraction_instructions(job_title, location_str, currency_hint)
+    tail = f"""{_source_hint(source_type)}This page is expected to be hard to read and would normally get a LOW confidence first pass.
+{_TARGETED_SEARCH}
+
+Page content:
+{page_text[:15000]}"""
+    return instructions, tail
 
 
 def extract_salary(
@@ -147,13 +294,79 @@ def extract_salary(
     client: anthropic.Anthropic,
     country_currency: str | None = None,
     source_type: str | None = None,    # CHANGE 7
+    local_first: bool = True,
+    critique_mode: str = CRITIQUE_MODE,
+    defer_critique: bool = False,
 ) -> dict:
     """Extract salary data from a page using Claude Haiku.
 
     If the first extraction has low confidence, a second critique call is made
-    (capped at 2 total calls per page).
+    (capped at 2 total calls per page). Results are cached by a hash of the
+    page text, target and prompt/model version, so an identical page is never
+    sent to the API twice.  Uncached pages first go through the local
+    JSON-LD / pattern pre-extractor (skip with local_first=False); Haiku is
+    only called when that pass is inconclusive.
+
+    critique_mode controls when the second call starts:
+      "sequential"  — only after the first call comes back low confidence.
+      "speculative" — alongside the first call when the page pre-screen
+                      predicts low confidence; used only if the first is low.
+      "race"        — always run both at once and take the first high/medium.
+    The returned dict carries the path taken under "_extraction_path".
+
+    defer_critique (sequential path only): a low-confidence first result is
+    returned uncached with "_needs_critique" set, for the caller to finish
+    with critique_extraction under its own concurrency limits.
     """
+    if critique_mode not in CRITIQUE_MODES:
+        raise ValueError(f"critique_mode must be one of {CRITIQUE_MODES}, got {critique_mode!r}")
+
+    location_str, currency_hint = _extraction_target(country, region, city, country_currency)
+
+    cache = _get_extraction_cache()
+    cache_key = _extraction_cache_key(page_text, job_title, location_str, currency_hint, source_type)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return _with_path(json.loads(cached.value), "cache")
 
+    if local_first:
+        local = pre_extract(page_text, job_title, country_currency)
+        if local is not None:
+            return _with_path(local, "local")
+
+    # CHANGE 7: Pass source_type to _build_extraction_prompt
+    instructions, tail = _build_extraction_prompt(job_title, location_str, currency_hint, page_text, source_type)
+
+    if critique_mode == "race" or (
+        critique_mode == "speculative" and likely_low_confidence(page_text, job_title)
+    ):
+        return _extract_concurrently(
+            client, instructions, tail, page_text, job_title, location_str, currency_hint,
+            source_type, cache_key, race=critique_mode == "race",
+        )
+
+    # --- First extraction call ---
+    result = _call_haiku_extraction(client, instructions, tail)
+    if result is None:
+        return _with_path(_empty_extraction(), "failed")
+
+    return _finish_extraction(
+        result, page_text, job_title, location_str, source_type, client, cache_key, defer_critique,
+    )
+
+
+def _with_path(result: dict, path: str) -> dict:
+    result["_extraction_path"] = path
+    return result
+
+
+def _extraction_target(
+    country: str,
+    region: str,
+    city: str,
+    country_currency: str | None,
+) -> tuple[str, str]:
+    """Return (location_str, currency_hint) for the extraction prompts."""
     location_parts = [p for p in [city, region, country] if p]
     location_str = ", ".join(location_parts)
 
@@ -163,18 +376,11 @@ def extract_salary(
         if country_currency
         else ""
     )
+    return location_str, currency_hint
 
-    # CHANGE 7: Pass source_type to _build_extraction_prompt
-    prompt = _build_extraction_prompt(job_title, location_str, currency_hint, page_text, source_type)
-
-    # --- First extraction call ---
-    result = _call_haiku_extraction(client, prompt)
-    if result is None:
-        return _empty_extraction()
-
-    result = _coerce_numeric_fields(result)
 
-    # CHANGE 8: Log extraction failures after first-pass coercion
+def _log_extraction_failure(result: dict, page_text: str, job_title: str, source_type: str | None) -> None:
+    """CHANGE 8: Log extraction failures after first-pass coercion."""
     if result.get("found_annual_pay") is None and result.get("found_hourly_pay") is None:
         _extraction_failures.append({
             "job_title": job_title,
@@ -187,41 +393,276 @@ def extract_salary(
             _extraction_failures.pop(0)
         print(f"[claude] extraction failed: no pay found. reasoning={result.get('reasoning', 'none')[:100]}")
 
+
+def _finish_extraction(
+    result: dict,
+    page_text: str,
+    job_title: str,
+    location_str: str,
+    source_type: str | None,
+    client: anthropic.Anthropic,
+    cache_key: str,
+    defer_critique: bool = False,
+) -> dict:
+    """Coerce a first-pass result, log failures, run the low-confidence critique and cache it."""
+    result = _coerce_numeric_fields(result)
+    _log_extraction_failure(result, page_text, job_title, source_type)
+    if result.get("confidence") == "low" and defer_critique:
+        result["_needs_critique"] = True
+        return _with_path(result, "first")
+    return _critique_and_cache(result, page_text, job_title, location_str, client, cache_key)
+
+
+def _critique_and_cache(
+    result: dict,
+    page_text: str,
+    job_title: str,
+    location_str: str,
+    client: anthropic.Anthropic,
+    cache_key: str,
+) -> dict:
+    path = "first"
+
     # --- Retry-with-critique if confidence is low ---
     if result.get("confidence") == "low":
         print("[claude] low confidence — retrying with critique")
-        critique_prompt = _build_critique_prompt(
+        instructions, tail = _build_critique_prompt(
             job_title, location_str, page_text, result
         )
-        retry_result = _call_haiku_extraction(client, critique_prompt)
+        retry_result = _call_haiku_extraction(client, instructions, tail, kind="critique")
         if retry_result is not None:
             result = _coerce_numeric_fields(retry_result)
+            path = "critique"
 
-    return result
+    _get_extraction_cache().set(cache_key, json.dumps(result))
+    return _with_path(result, path)
+
+
+def critique_extraction(
+    result: dict,
+    page_text: str,
+    job_title: str,
+    country: str,
+    region: str,
+    city: str,
+    client: anthropic.Anthropic,
+    country_currency: str | None = None,
+    source_type: str | None = None,
+) -> dict:
+    """Finish a result returned with "_needs_critique" (see defer_critique): critique call, then cache."""
+    result = {k: v for k, v in result.items() if k not in ("_needs_critique", "_extraction_path")}
+    location_str, currency_hint = _extraction_target(country, region, city, country_currency)
+    cache_key = _extraction_cache_key(page_text, job_title, location_str, currency_hint, source_type)
+    return _critique_and_cache(result, page_text, job_title, location_str, client, cache_key)
+
+
+def _extract_concurrently(
+    client: anthropic.Anthropic,
+    instructions: str,
+    tail: str,
+    page_text: str,
+    job_title: str,
+    location_str: str,
+    currency_hint: str,
+    source_type: str | None,
+    cache_key: str,
+    race: bool,
+) -> dict:
+    """Run the first pass and a targeted (critique-style) pass at the same time.
+
+    Still two calls per page at most.  The first-pass result goes through the
+    same failure logging as the sequential path, even when it loses a race.
+    Speculative: the targeted result is used only if the first pass is low
+    confidence (or fails).  Race: the first call to return high/medium wins;
+    if neither does, the targeted result is preferred, as a critique would be.
+    """
+    t_instructions, t_tail = _build_targeted_extraction_prompt(
+        job_title, location_str, currency_hint, page_text, source_type,
+    )
+    pool = _get_critique_pool()
+    # Each call runs in a copy of this context so its timing span reaches the run's recorder
+    first = pool.submit(contextvars.copy_context().run, _call_haiku_extraction, client, instructions, tail)
+    second = pool.submit(
+        contextvars.copy_context().run, _call_haiku_extraction, client, t_instructions, t_tail, "critique",
+    )
 
+    def _coerced(future: Future) -> dict | None:
+        raw = future.result()
+        return _coerce_numeric_fields(raw) if raw is not None else None
+
+    def _log_first(future: Future) -> None:
+        if future.result() is not None:
+            _log_extraction_failure(_coerced(future), page_text, job_title, source_type)
+
+    first.add_done_callback(_log_first)
+
+    label = "race" if race else "speculative"
+    names = {first: "first", second: "critique"}
+    results: dict[str, dict | None] = {}
+    winner = None
+    if race:
+        for future in as_completed((first, second)):
+            results[names[future]] = _coerced(future)
+            if (results[names[future]] or {}).get("confidence") in ("high", "medium"):
+                winner = names[future]
+                break
+    else:
+        results["first"] = _coerced(first)
+        if results["first"] is not None and results["first"].get("confidence") != "low":
+            winner = "first"
+
+    if winner is None:
+        for name, future in (("critique", second), ("first", first)):
+            if name not in results:
+                results[name] = _coerced(future)
+            if results[name] is not None:
+                winner = name
+                break
+    if winner is None:
+        return _with_path(_empty_extraction(), "failed")
+
+    result = results[winner]
+    print(f"[claude] {label} critique: {winner} result used")
+    _get_extraction_cache().set(cache_key, json.dumps(result))
+    return _with_path(result, f"{label}:{winner}")
+
+
+def extract_salary_batch(
+    pages: list[tuple[str, str | None]],
+    job_title: str,
+    country: str,
+    region: str,
+    city: str,
+    client: anthropic.Anthropic,
+    country_currency: str | None = None,
+    critique_mode: str = CRITIQUE_MODE,
+    defer_critique: bool = False,
+) -> list[dict]:
+    """Extract salary data from several pages with one Haiku call.
+
+    pages: (page_text, source_type) pairs.  Returns one extraction dict per page,
+    in order, in the same schema as extract_salary.  Cached pages are answered
+    from the cache and pages the local pre-extractor resolves skip the API; pages whose result is missing from (or unparseable in) the
+    batched response fall back to single-page extract_salary calls.  The
+    low-confidence critique still runs per page, with the batched call
+    counting as that page's first call; with defer_critique those pages are
+    returned flagged instead (see extract_salary) so the caller can run the
+    critiques concurrently.  critique_mode applies to the fallback calls.
+    """
+    location_str, currency_hint = _extraction_target(country, region, city, country_currency)
+    cache = _get_extraction_cache()
+
+    results: list[dict | None] = [None] * len(pages)
+    keys = []
+    todo = []
+    for i, (page_text, source_type) in enumerate(pages):
+        key = _extraction_cache_key(page_text, job_title, location_str, currency_hint, source_type)
+        keys.append(key)
+        cached = cache.get(key)
+        if cached is not None:
+            results[i] = _with_path(json.loads(cached.value), "cache")
+            continue
+        local = pre_extract(page_text, job_title, country_currency)
+        if local is not None:
+            results[i] = _with_path(local, "local")
+        else:
+            todo.append(i)
 
-def _call_haiku_extraction(client: anthropic.Anthropic, prompt: str) -> dict | None:
+    if len(todo) > 1:
+        instructions, tail = _build_batch_extraction_prompt(
+            job_title, location_str, currency_hint, [pages[i] for i in todo],
+        )
+        batch = _call_haiku_batch_extraction(client, instructions, tail, len(todo))
+        print(f"[claude] extract_salary_batch: {len(todo)} pages in one call, {len(batch)} parsed")
+        for page_id, i in enumerate(todo):
+            first = batch.get(page_id)
+            if first is not None:
+                page_text, source_type = pages[i]
+                results[i] = _finish_extraction(
+                    first, page_text, job_title, location_str, source_type, client, keys[i], defer_critique,
+                )
+
+    for i in todo:
+        if results[i] is None:
+            page_text, source_type = pages[i]
+            results[i] = extract_salary(
+                page_text, job_title, country, region, city, client, country_currency,
+                source_type=source_type, local_first=False,
+                critique_mode=critique_mode, defer_critique=defer_critique,
+            )
+    return results
+
+
+def _call_haiku_extraction(
+    client: anthropic.Anthropic,
+    instructions: str,
+    tail: str,
+    kind: str = "extract",
+) -> dict | None:
     """Make a single Haiku extraction call. Returns parsed dict or None on failure."""
     try:
-        response = client.messages.create(
-            model=HAIKU_MODEL,
-            max_tokens=1024,
-            system=EXTRACTION_SYSTEM,
-            messages=[{"role": "user", "content": prompt}],
-        )
+        response = create_message(client, kind, **_extraction_params(instructions, tail))
 
         content = response.content[0].text.strip()
         print(f"[claude] extract_salary raw: {content[:300]}")
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group())
-        return None
+        return _parse_extraction(content)
 
     except (json.JSONDecodeError, Exception) as e:
         print(f"[claude] extract_salary error: {e}")
         return None
 
 
+def _extraction_params(instructions: str, tail: str, max_tokens: int = 1024) -> dict:
+    """messages.create keyword arguments for an extraction / critique call."""
+    return {
+        "model": HAIKU_MODEL,
+        "max_tokens": max_tokens,
+        "system": EXTRACTION_SYSTEM,
+        "messages": _user_prompt(instructions, tail),
+    }
+
+
+def _parse_extraction(content: str) -> dict | None:
+    """Pull the extraction JSON object out of a model response."""
+    json_match = re.search(r'\{.*\}', content, re.DOTALL)
+    if json_match:
+        return json.loads(json_match.group())
+    return None
+
+
+def _call_haiku_batch_extraction(
+    client: anthropic.Anthropic,
+    instructions: str,
+    tail: str,
+    n_pages: int,
+) -> dict[int, dict]:
+    """Make one batched Haiku extraction call. Returns {page_id: parsed dict}; empty on failure."""
+    try:
+        response = create_message(
+            client, "extract_batch",
+            **_extraction_params(instructions, tail, max_tokens=min(4096, 512 * n_pages + 256)),
+        )
+
+        content = response.content[0].text.strip()
+        print(f"[claude] extract_salary_batch raw: {content[:300]}")
+        json_match = re.search(r'\[.*\]', content, re.DOTALL)
+        if not json_match:
+            return {}
+        parsed = json.loads(json_match.group())
+        results = {}
+        for pos, item in enumerate(parsed if isinstance(parsed, list) else []):
+            if not isinstance(item, dict):
+                continue
+            page_id = item.pop("page_id", pos)
+            if isinstance(page_id, int) and 0 <= page_id < n_pages:
+                results[page_id] = item
+        return results
+
+    except (json.JSONDecodeError, Exception) as e:
+        print(f"[claude] extract_salary_batch error: {e}")
+        return {}
+
+
 def _validation_fallback(rows: list[dict]) -> list[dict]:
     """Fallback when validation API call fails: pass rows with plausible pay rates."""
     results = []
@@ -243,20 +684,80 @@ def validate_rows_batch(
     client: anthropic.Anthropic,
     niche_level: str = "common",
     title_variants: list[str] | None = None,
+    context_rows: list[dict] | None = None,
 ) -> list[dict]:
-    """Batch validate rows using a single Haiku call.
+    """Batch validate rows with Haiku, in parallel chunks of VALIDATION_CHUNK_SIZE.
 
     Returns list of dicts with keys:
       - "valid": 0 or 1
       - "validation_reason": short explanation string
+    one per input row, in input order.  Each chunk is told the median / IQR of
+    display_pay_rate across all rows so outlier checks still see the whole set.
+    A chunk whose call fails falls back to the plausibility passthrough.
 
     niche_level / title_variants: passed through from classify_job_niche() to
     instruct the validator to accept related/broader titles for niche searches.
+    context_rows: every row seen so far (including *rows*), when *rows* is a
+    small slice of a larger set — the outlier stats are computed over these.
     """
 
     if not rows:
         return []
 
+    pay_stats = _pay_rate_stats(context_rows if context_rows is not None else rows)
+
+    def _validate_chunk(chunk: list[dict]) -> list[dict]:
+        instructions, tail = _build_validation_prompt(
+            chunk, job_title, country, region, city, niche_level, title_variants, pay_stats,
+        )
+        try:
+            response = create_message(client, "validate", **_validation_params(instructions, tail))
+
+            content = response.content[0].text.strip()
+            return _parse_validation(content, len(chunk))
+
+        except Exception as e:
+            print(f"[claude] validate_rows_batch error: {e}")
+            return _validation_fallback(chunk)
+
+    chunks = _validation_chunks(rows)
+    if len(chunks) == 1:
+        return _validate_chunk(chunks[0])
+
+    print(f"[claude] validate_rows_batch: {len(rows)} rows in {len(chunks)} chunks")
+    with ThreadPoolExecutor(min(VALIDATION_MAX_WORKERS, len(chunks)), thread_name_prefix="validate") as pool:
+        contexts = [contextvars.copy_context() for _ in chunks]
+        chunk_results = list(pool.map(lambda ctx, chunk: ctx.run(_validate_chunk, chunk), contexts, chunks))  # keeps chunk order
+    return [r for results in chunk_results for r in results]
+
+
+def _validation_chunks(rows: list[dict]) -> list[list[dict]]:
+    return [rows[i:i + VALIDATION_CHUNK_SIZE] for i in range(0, len(rows), VALIDATION_CHUNK_SIZE)]
+
+
+def _pay_rate_stats(rows: list[dict]) -> dict | None:
+    """Median / quartiles of display_pay_rate across all rows, or None with fewer than 2 figures."""
+    pays = sorted(r["display_pay_rate"] for r in rows if r.get("display_pay_rate") is not None)
+    if len(pays) < 2:
+        return None
+    q1, median, q3 = statistics.quantiles(pays, n=4, method="inclusive")
+    return {"n": len(pays), "median": median, "q1": q1, "q3": q3, "min": pays[0], "max": pays[-1]}
+
+
+def _build_validation_prompt(
+    rows: list[dict],
+    job_title: str,
+    country: str,
+    region: str,
+    city: str,
+    niche_level: str = "common",
+    title_variants: list[str] | None = None,
+    pay_stats: dict | None = None,
+) -> tuple[str, str]:
+    """Build the validation prompt as (rules, rows-to-validate tail).
+
+    pay_stats (see _pay_rate_stats) describes the full row set when *rows* is one chunk of it.
+    """
     # CHANGE 9a: Add remote_ok field to rows_json serialization
     rows_json = json.dumps([
         {
@@ -268,10 +769,10 @@ def validate_rows_batch(
             "remote_ok": r.get("remote_ok", 0),    # NEW
             "display_pay_rate": r.get("display_pay_rate"),
             "confidence": r.get("confidence", "medium"),
-            "reasoning": r.get("reasoning", ""),
+            "reasoning": (r.get("reasoning") or "")[:VALIDATION_REASONING_CHARS],
         }
         for i, r in enumerate(rows)
-    ], indent=2)
+    ], separators=(",", ":"), ensure_ascii=False)
 
     location_parts = [p for p in [city, region, country] if p]
     location_str = ", ".join(location_parts)
@@ -293,15 +794,13 @@ def validate_rows_batch(
         niche_note = ""
 
     # CHANGE 9b: Updated validation prompt with location matching rules
-    prompt = f"""For each result below, determine if it is a valid salary data point for the search criteria. Use semantic matching for job titles (related titles count as valid).
+    # The rules are the instructions; the rows to validate are the per-call tail.
+    instructions = f"""For each result below, determine if it is a valid salary data point for the search criteria. Use semantic matching for job titles (related titles count as valid).
 
 Search criteria:
 - Job Title: "{job_title}"
 - Location: {location_str}
 {niche_note}
-Results to validate:
-{rows_json}
-
 Each result includes:
 - display_pay_rate: the extracted salary figure
 - confidence: how confident the extraction was ("high", "medium", or "low")
@@ -347,36 +846,48 @@ LOCATION MATCHING RULES:
 Use validation_reason values like: "plausible range", "mismatched job title", "outlier",
 "currency ambiguous", "low confidence unverified", "null pay rate", "location mismatch (wrong country)"
 """
-
-    try:
-        response = client.messages.create(
-            model=HAIKU_MODEL,
-            max_tokens=2048,
-            system=VALIDATION_SYSTEM,
-            messages=[{"role": "user", "content": prompt}],
+    context = ""
+    if pay_stats:
+        part = "these results are one chunk of them; " if len(rows) < pay_stats["n"] else ""
+        context = (
+            f"Batch context — display_pay_rate across all {pay_stats['n']} results being validated "
+            f"({part}use this distribution for cross-row and outlier checks): "
+            f"median {pay_stats['median']:,.2f}, IQR {pay_stats['q1']:,.2f}–{pay_stats['q3']:,.2f}, "
+            f"range {pay_stats['min']:,.2f}–{pay_stats['max']:,.2f}\n\n"
         )
+    tail = f"""{context}Results to validate:
+{rows_json}"""
+    return instructions, tail
 
-        content = response.content[0].text.strip()
-        json_match = re.search(r'\[.*\]', content, re.DOTALL)
-        if json_match:
-            results = json.loads(json_match.group())
-            result_map = {
-                r["idx"]: {
-                    "valid": r.get("valid", 0),
-                    "validation_reason": r.get("validation_reason", "unknown"),
-                }
-                for r in results
-            }
-            return [
-                result_map.get(i, {"valid": 0, "validation_reason": "missing from response"})
-                for i in range(len(rows))
-            ]
 
-        return [{"valid": 0, "validation_reason": "no valid response"} for _ in rows]
+def _validation_params(instructions: str, tail: str) -> dict:
+    """messages.create keyword arguments for a validation call."""
+    return {
+        "model": HAIKU_MODEL,
+        "max_tokens": 2048,
+        "system": VALIDATION_SYSTEM,
+        "messages": _user_prompt(instructions, tail),
+    }
 
-    except Exception as e:
-        print(f"[claude] validate_rows_batch error: {e}")
-        return _validation_fallback(rows)
+
+def _parse_validation(content: str, n_rows: int) -> list[dict]:
+    """Map a validation response back onto row indices 0..n_rows-1."""
+    json_match = re.search(r'\[.*\]', content, re.DOTALL)
+    if json_match:
+        results = json.loads(json_match.group())
+        result_map = {
+            r["idx"]: {
+                "valid": r.get("valid", 0),
+                "validation_reason": r.get("validation_reason", "unknown"),
+            }
+            for r in results
+        }
+        return [
+            result_map.get(i, {"valid": 0, "validation_reason": "missing from response"})
+            for i in range(n_rows)
+        ]
+
+    return [{"valid": 0, "validation_reason": "no valid response"} for _ in range(n_rows)]
 
 
 def generate_summary(
@@ -446,7 +957,8 @@ All monetary values should be in {display_currency} as {display_pref.lower()} fi
 Return ONLY valid JSON."""
 
     try:
-        response = client.messages.create(
+        response = create_message(
+            client, "summary",
             model=SONNET_MODEL,
             max_tokens=1500,
             system=SUMMARY_SYSTEM,
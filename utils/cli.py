@@ -0,0 +1,364 @@
+"""Headless bulk runner: price a list of jobs from the command line.
+
+Reads a CSV or JSONL job list with the columns
+
+    title, country, region, city, display_pref, currency   (+ optional description)
+
+and runs the async pipeline for each job, CLI_MAX_CONCURRENT_JOBS at a time.
+All jobs share one Anthropic client, one ConcurrencyLimiter and the batch
+mode's deduplicated lookups (see ``run_pipeline_batch_async``), so per-host
+caps hold across the whole run.  Each finished job's rows are written to the
+output straight away:
+
+- ``.jsonl`` — one line per row, appended and flushed as each job finishes
+- ``.parquet`` — a directory with one part file per job (read it back with
+  ``pd.read_parquet(path)``; needs pyarrow or fastparquet)
+
+Every output row carries ``job_key`` / ``job_index``.  A job's LLM tokens and
+cost in the checkpoint cover its own calls; lookups shared between jobs
+(niche, site discovery, searches, SOC mapping) are counted once in the run
+totals.  Finished jobs are
+recorded in a checkpoint file, so a restarted run skips them; rows written for
+a job that never reached the checkpoint (a crash in between) are dropped from
+the output on restart, before the job runs again.  A throughput
+summary (jobs/min, pages/min, LLM calls and cost per job) is printed at the end.
+
+API keys come from the environment: SERPAPI_KEY, ANTHROPIC_API_KEY and
+(optionally) EXCHANGERATE_KEY.
+
+    python -m utils.cli jobs.csv --out results.jsonl
+    python -m utils.cli jobs.jsonl --out results.parquet --jobs 6
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import pathlib
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable
+
+import pandas as pd
+
+from utils.concurrency import ConcurrencyLimiter
+from utils.pipeline import (
+    BATCH_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_PER_HOST_CONCURRENCY,
+    PER_HOST_CONCURRENCY,
+    _BatchShared,
+    _location_label,
+    run_pipeline_async,
+)
+
+CLI_MAX_CONCURRENT_JOBS = 3  # jobs run at the same time (each fans out its own searches / fetches)
+DISPLAY_PREFS = {"annual": "Annual Salary", "hourly": "Hourly Rate"}
+
+
+@dataclass
+class Job:
+    title: str
+    country: str
+    region: str = ""
+    city: str = ""
+    display_pref: str = "Annual Salary"
+    currency: str = "USD"
+    description: str = ""
+
+    @property
+    def key(self) -> str:
+        """Stable id of the job's inputs — the checkpoint / output key."""
+        payload = json.dumps(asdict(self), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def label(self) -> str:
+        return f"{self.title} / {_location_label(self.country, self.region, self.city)}"
+
+
+# ---------------------------------------------------------------------------
+# Input / output
+# ---------------------------------------------------------------------------
+
+def _job_from_record(record: dict[str, Any], line: int) -> Job:
+    record = {k.strip().lower(): (v.strip() if isinstance(v, str) else v) for k, v in record.items() if k}
+    title = record.get("title") or record.get("job_title")
+    country = record.get("country")
+    if not title or not country:
+        raise ValueError(f"line {line}: every job needs a title and a country")
+    display_pref = record.get("display_pref") or "Annual Salary"
+    display_pref = DISPLAY_PREFS.get(display_pref.lower(), display_pref)
+    if display_pref not in DISPLAY_PREFS.values():
+        raise ValueError(f"line {line}: display_pref must be 'Annual Salary' or 'Hourly Rate', got {display_pref!r}")
+    return Job(
+        title=title,
+        country=country,
+        region=record.get("region") or "",
+        city=record.get("city") or "",
+        display_pref=display_pref,
+        currency=(record.get("currency") or record.get("display_currency") or "USD").upper(),
+        description=record.get("description") or "",
+    )
+
+
+def read_jobs(path: pathlib.Path) -> list[Job]:
+    """Jobs from a .csv (header row) or .jsonl (one object per line) file."""
+    with path.open(encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            return [_job_from_record(r, i) for i, r in enumerate(csv.DictReader(f), start=2)]
+        return [_job_from_record(json.loads(l), i) for i, l in enumerate(f, start=1) if l.strip()]
+
+
+class _Checkpoint:
+    """Finished job keys -> summary, rewritten atomically after every job."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.done: dict[str, dict] = {}
+        if path.exists():
+            self.done = json.loads(path.read_text(encoding="utf-8")).get("done", {})
+
+    def mark_done(self, job: Job, summary: dict) -> None:
+        self.done[job.key] = summary
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"done": self.done}, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class _Sink:
+    """Streams each finished job's rows to JSONL (appended) or Parquet (one part file per job).
+
+    Output from a previous run is trimmed to the jobs in *done* (the
+    checkpoint's keys) first, so a job that crashed after writing but before
+    being checkpointed is not in the output twice once it is re-run.
+    """
+
+    def __init__(self, path: pathlib.Path, done: Iterable[str] = ()) -> None:
+        self.path = path
+        self.parquet = path.suffix.lower() == ".parquet"
+        done = set(done)
+        if self.parquet:
+            path.mkdir(parents=True, exist_ok=True)
+            self._drop_unfinished_parts(done)
+            self._file = None
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._drop_unfinished_lines(done)
+            self._file = path.open("a", encoding="utf-8")
+
+    def _drop_unfinished_parts(self, done: set[str]) -> None:
+        dropped = 0
+        for part in self.path.glob("job-*.parquet"):
+            if part.stem[len("job-"):] not in done:
+                part.unlink()
+                dropped += 1
+        if dropped:
+            print(f"[cli] Dropped {dropped} part file(s) of unfinished jobs from {self.path}")
+
+    def _drop_unfinished_lines(self, done: set[str]) -> None:
+        if not self.path.exists():
+            return
+        kept: list[str] = []
+        dropped = 0
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    finished = json.loads(line).get("job_key") in done
+                except ValueError:
+                    finished = False  # a line cut short by the crash
+                if finished:
+                    kept.append(line)
+                elif line.strip():
+                    dropped += 1
+        if not dropped:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text("".join(kept), encoding="utf-8")
+        os.replace(tmp, self.path)
+        print(f"[cli] Dropped {dropped} row(s) of unfinished jobs from {self.path}")
+
+    def write(self, job: Job, index: int, df: pd.DataFrame) -> None:
+        df = df.assign(job_key=job.key, job_index=index)
+        if self.parquet:
+            # Written under a temp name first so a crash never leaves a truncated part
+            part = self.path / f"job-{job.key}.parquet"
+            tmp = self.path / f".job-{job.key}.parquet.tmp"
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, part)
+            return
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+        for record in records:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+async def run_jobs(
+    jobs: list[Job],
+    sink: _Sink,
+    checkpoint: _Checkpoint,
+    serpapi_key: str,
+    anthropic_key: str,
+    exchangerate_key: str = "",
+    max_concurrent_jobs: int = CLI_MAX_CONCURRENT_JOBS,
+) -> dict:
+    """Run every job not yet in *checkpoint*; returns the throughput summary."""
+    import anthropic  # deferred: the SDK is by far the slowest import in the app
+
+    pending = [(i, job) for i, job in enumerate(jobs) if job.key not in checkpoint.done]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"[cli] Checkpoint: skipping {skipped} finished job(s), {len(pending)} to go")
+
+    shared = _BatchShared(
+        client=anthropic.Anthropic(api_key=anthropic_key),
+        limits=ConcurrencyLimiter(BATCH_MAX_CONCURRENT_REQUESTS, PER_HOST_CONCURRENCY, DEFAULT_PER_HOST_CONCURRENCY),
+    )
+    gate = asyncio.Semaphore(max(1, max_concurrent_jobs))
+    totals = {
+        "jobs_done": 0, "jobs_failed": 0, "rows": 0, "valid_rows": 0, "pages": 0,
+        "llm_calls": 0, "llm_tokens": 0, "llm_cost_usd": 0.0,
+    }
+    started = time.time()
+
+    async def _run_job(index: int, job: Job) -> None:
+        async with gate:
+            job_start = time.time()
+            df: pd.DataFrame | None = None
+            errors: list[str] = []
+            pages = 0
+            usage: dict = {}
+            agen = run_pipeline_async(
+                job.title, job.country, job.region, job.city, job.description,
+                job.display_pref, job.currency,
+                serpapi_key, anthropic_key, exchangerate_key,
+                shared=shared,
+            )
+            try:
+                async for event in agen:
+                    if event["type"] == "stats":
+                        df = event["df"]
+                    elif event["type"] == "health":
+                        pages += event.get("urls_fetched", 0)
+                    elif event["type"] == "llm_usage":
+                        usage = event["usage"]
+                    elif event["type"] == "error":
+                        errors.append(event["message"])
+            except Exception as e:
+                errors.append(str(e))
+            finally:
+                await agen.aclose()
+
+            totals["pages"] += pages
+            totals["llm_calls"] += usage.get("calls", 0)
+            totals["llm_tokens"] += usage.get("tokens", 0)
+            totals["llm_cost_usd"] += usage.get("cost_usd", 0.0)
+            if df is None:
+                totals["jobs_failed"] += 1
+                print(f"[cli] FAILED {job.label}: {'; '.join(errors) or 'no results'}")
+                return  # not checkpointed — retried on the next run
+            valid = int((df["valid"] == 1).sum())
+            sink.write(job, index, df)
+            checkpoint.mark_done(job, {
+                "title": job.title,
+                "location": _location_label(job.country, job.region, job.city),
+                "rows": len(df),
+                "valid_rows": valid,
+                "pages": pages,
+                "llm_tokens": usage.get("tokens", 0),
+                "llm_cost_usd": usage.get("cost_usd", 0.0),
+                "duration_seconds": round(time.time() - job_start, 2),
+            })
+            totals["jobs_done"] += 1
+            totals["rows"] += len(df)
+            totals["valid_rows"] += valid
+            print(
+                f"[cli] {skipped + totals['jobs_done']}/{len(jobs)} {job.label}: "
+                f"{valid} valid of {len(df)} rows in {time.time() - job_start:.1f}s"
+            )
+
+    try:
+        await asyncio.gather(*(_run_job(i, job) for i, job in pending))
+    finally:
+        shared.calls.close()
+        shared.limits.shutdown()
+
+    shared_usage = shared.usage.summary()
+    totals["llm_calls"] += shared_usage["calls"]
+    totals["llm_tokens"] += shared_usage["tokens"]
+    totals["llm_cost_usd"] += shared_usage["cost_usd"]
+
+    minutes = max(time.time() - started, 1e-9) / 60
+    attempted = totals["jobs_done"] + totals["jobs_failed"]
+    return {
+        **totals,
+        "llm_cost_usd": round(totals["llm_cost_usd"], 4),
+        "jobs_skipped": skipped,
+        "elapsed_seconds": round(minutes * 60, 1),
+        "jobs_per_minute": round(totals["jobs_done"] / minutes, 2),
+        "pages_per_minute": round(totals["pages"] / minutes, 1),
+        "llm_calls_per_job": round(totals["llm_calls"] / attempted, 1) if attempted else 0.0,
+        "shared_lookups_reused": shared.calls.hits,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("jobs", type=pathlib.Path, help="job list (.csv or .jsonl)")
+    parser.add_argument("--out", type=pathlib.Path, required=True, help="results (.jsonl or .parquet)")
+    parser.add_argument("--checkpoint", type=pathlib.Path, help="checkpoint file (default: <out>.checkpoint.json)")
+    parser.add_argument("--jobs", dest="max_jobs", type=int, default=CLI_MAX_CONCURRENT_JOBS, help="jobs run at once")
+    args = parser.parse_args(argv)
+
+    if args.out.suffix.lower() not in (".jsonl", ".parquet"):
+        parser.error("--out must end in .jsonl or .parquet")
+    if args.out.suffix.lower() == ".parquet":
+        try:
+            pd.io.parquet.get_engine("auto")
+        except ImportError as e:
+            parser.error(str(e))
+    serpapi_key = os.environ.get("SERPAPI_KEY", "")
+    anthropic_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    if not serpapi_key or not anthropic_key:
+        parser.error("set SERPAPI_KEY and ANTHROPIC_API_KEY in the environment")
+
+    try:
+        jobs = read_jobs(args.jobs)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    checkpoint = _Checkpoint(args.checkpoint or args.out.with_name(args.out.name + ".checkpoint.json"))
+    sink = _Sink(args.out, checkpoint.done)
+    try:
+        summary = asyncio.run(run_jobs(
+            jobs, sink, checkpoint, serpapi_key, anthropic_key, os.environ.get("EXCHANGERATE_KEY", ""), args.max_jobs,
+        ))
+    finally:
+        sink.close()
+
+    print(
+        f"[cli] {summary['jobs_done']} jobs done, {summary['jobs_failed']} failed, {summary['jobs_skipped']} skipped "
+        f"in {summary['elapsed_seconds']}s — {summary['jobs_per_minute']} jobs/min, "
+        f"{summary['pages_per_minute']} pages/min, {summary['llm_calls_per_job']} LLM calls/job, "
+        f"${summary['llm_cost_usd']:.2f} LLM cost "
+        f"({summary['valid_rows']} valid of {summary['rows']} rows)"
+    )
+    return 1 if summary["jobs_failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
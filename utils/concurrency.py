@@ -0,0 +1,324 @@
+"""Concurrency helpers for the async pipeline engine.
+
+The outbound clients (SerpAPI, Jina, Anthropic, BLS, frankfurter) are all
+blocking ``requests``/SDK calls.  ``ConcurrencyLimiter`` runs them on a
+dedicated thread pool from asyncio code while enforcing a global cap on
+in-flight calls plus a per-host cap, so many domains can be searched, fetched
+and extracted at once without hammering any single host.
+
+``MicroBatcher`` groups items submitted by many coroutines within a short
+window into one batched call (e.g. several fetched pages into one extraction
+request).
+
+``SingleFlight`` runs each keyed call once for all concurrent callers and
+keeps a bounded LRU of finished results for later ones (shared lookups across
+a multi-location batch).
+
+``iterate_async`` bridges an async generator back into a plain generator so
+synchronous callers (the Streamlit app) can keep consuming events as before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+class ConcurrencyLimiter:
+    """Run blocking callables off the event loop under global + per-host limits."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        per_host: dict[str, int] | None = None,
+        default_per_host: int = 3,
+    ) -> None:
+        self._max_concurrency = max_concurrency
+        self._per_host_limits = dict(per_host or {})
+        self._default_per_host = default_per_host
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="pipeline-io",
+        )
+        self._global: asyncio.Semaphore | None = None
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self._multi_slot: asyncio.Lock | None = None  # serialises multi-slot acquisitions
+
+    def _host_limit(self, host: str) -> int:
+        return max(1, self._per_host_limits.get(host, self._default_per_host))
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        sem = self._hosts.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self._host_limit(host))
+            self._hosts[host] = sem
+        return sem
+
+    async def run(self, host: str, fn: Callable[..., T], *args: Any, slots: int = 1, **kwargs: Any) -> T:
+        """Run ``fn(*args, **kwargs)`` in the pool once a slot for *host* is free.
+
+        The slots are released when the worker thread actually finishes, not
+        when the awaiting coroutine is cancelled (e.g. by ``asyncio.wait_for``),
+        so a timed-out call still counts against the limits until it returns.
+        *fn* runs in a copy of the caller's context, so context variables (the
+        run's span recorder) follow it onto the worker thread.
+
+        *slots* > 1 is for a callable that makes that many requests to *host*
+        at once (e.g. a raced extraction); it holds that many host and global
+        slots, capped at the host's limit.
+        """
+        if self._global is None:
+            self._global = asyncio.Semaphore(self._max_concurrency)
+            self._multi_slot = asyncio.Lock()
+        host_sem = self._host_semaphore(host)
+        global_sem = self._global
+        slots = max(1, min(slots, self._host_limit(host), self._max_concurrency))
+
+        held: list[asyncio.Semaphore] = []
+        try:
+            if slots == 1:
+                await host_sem.acquire()
+                held.append(host_sem)
+                await global_sem.acquire()
+                held.append(global_sem)
+            else:
+                # One multi-slot caller at a time, so two of them can never each
+                # hold part of what the other needs
+                async with self._multi_slot:
+                    for sem in [host_sem] * slots + [global_sem] * slots:
+                        await sem.acquire()
+                        held.append(sem)
+        except BaseException:
+            for sem in held:
+                sem.release()
+            raise
+
+        def _release(_fut: asyncio.Future) -> None:
+            for sem in held:
+                sem.release()
+
+        loop = asyncio.get_running_loop()
+        try:
+            fut = loop.run_in_executor(
+                self._executor, contextvars.copy_context().run, functools.partial(fn, *args, **kwargs),
+            )
+        except BaseException:
+            _release(None)  # type: ignore[arg-type]
+            raise
+        fut.add_done_callback(_release)
+        return await asyncio.shield(fut)
+
+    def shutdown(self) -> None:
+        """Stop accepting work; queued calls are cancelled, running ones finish in the background."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesce concurrent ``submit()`` calls into batched ``run_batch`` calls.
+
+    A batch is flushed once it holds *max_batch* items or *max_delay* seconds
+    after its first item arrived, whichever comes first.  ``run_batch`` must
+    return one result per item, in order; if it raises (or returns the wrong
+    number of results), every caller in that batch gets the exception.
+    ``close()`` cancels every caller still waiting.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[T]], Awaitable[list[R]]],
+        max_batch: int,
+        max_delay: float,
+    ) -> None:
+        self._run_batch = run_batch
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._pending: list[tuple[T, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: T) -> R:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((item, fut))
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._max_delay, self._flush)
+        return await fut
+
+    def flush(self) -> None:
+        """Send the pending partial batch now instead of waiting for *max_delay*."""
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that gave up (e.g. timed out) while waiting are not sent
+        batch = [(item, fut) for item, fut in self._pending if not fut.done()]
+        self._pending = []
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future]]) -> None:
+        try:
+            results = await self._run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"run_batch returned {len(results)} results for {len(batch)} items")
+        except asyncio.CancelledError:
+            # close() — callers must not wait for a batch that will never finish
+            for _, fut in batch:
+                fut.cancel()
+            raise
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, fut in self._pending:
+            fut.cancel()
+        self._pending = []
+        for task in self._tasks:
+            task.cancel()
+
+
+class SingleFlight:
+    """Collapse concurrent keyed coroutine calls into one run, and reuse recent results.
+
+    The first caller for a key runs it and callers arriving meanwhile await
+    that run.  Finished results go into an LRU of *max_results* entries for
+    later callers, unless the call's *keep* predicate rejects them (e.g. a
+    failure payload); a call that raises is never kept.  Callers are shielded
+    from each other's cancellation (e.g. one caller's ``asyncio.wait_for``
+    timing out).
+    """
+
+    def __init__(self, max_results: int = 256) -> None:
+        self._max_results = max_results
+        self._inflight: dict[Any, asyncio.Task] = {}
+        self._results: OrderedDict[Any, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def do(
+        self,
+        key: Any,
+        factory: Callable[[], Awaitable[R]],
+        keep: Callable[[R], bool] | None = None,
+    ) -> R:
+        if key in self._results:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return self._results[key]
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+
+            def _settle(t: asyncio.Task) -> None:
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                if t.cancelled() or t.exception() is not None:
+                    return
+                if keep is None or keep(t.result()):
+                    self._results[key] = t.result()
+                    self._results.move_to_end(key)
+                    while len(self._results) > self._max_results:
+                        self._results.popitem(last=False)
+
+            task.add_done_callback(_settle)
+        else:
+            self.hits += 1
+        return await asyncio.shield(task)
+
+    def close(self) -> None:
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+        self._results.clear()
+
+
+def iterate_async(agen: AsyncIterator[T]) -> Iterator[T]:
+    """Drive an async generator on a private event loop thread and yield its items.
+
+    Exceptions raised inside the async generator are re-raised in the caller.
+    Closing the returned generator early cancels the async side.
+    """
+    items: queue.Queue = queue.Queue()
+    loop = asyncio.new_event_loop()
+
+    async def _pump() -> None:
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except asyncio.CancelledError:
+            items.put((_DONE, None))
+            raise
+        except BaseException as e:
+            items.put((_DONE, e))
+            return
+        items.put((_DONE, None))
+
+    main = loop.create_task(_pump())
+
+    def _runner() -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(main)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            try:
+                # Like asyncio.run: let tasks the generator left behind (an early
+                # close) handle their cancellation before the loop goes away
+                leftover = asyncio.all_tasks(loop)
+                for task in leftover:
+                    task.cancel()
+                if leftover:
+                    loop.run_until_complete(asyncio.gather(*leftover, return_exceptions=True))
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                loop.close()
+
+    thread = threading.Thread(target=_runner, name="pipeline-async", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item, err = items.get()
+            if item is _DONE:
+                if err is not None:
+                    raise err
+                return
+            yield item
+    finally:
+        if thread.is_alive():
+            try:
+                loop.call_soon_threadsafe(main.cancel)
+            except RuntimeError:
+                pass  # loop already closed
@@ -1,15 +1,87 @@
+import functools
+import gzip
+import json
+import pathlib
+import threading
+
 import pycountry
-import geonamescache
 
 _gc = None
 
+# Compact on-disk copy of the city index so a cold start skips parsing geonamescache's full dataset
+CITY_SNAPSHOT_FILE = pathlib.Path("pipeline_cache") / "cities_index.json.gz"
+MAX_CITIES = 300
+
+# alpha-2 -> [(name, admin1code), ...] ordered by population, largest first
+_city_index: dict[str, list[tuple[str, str]]] | None = None
+_city_index_lock = threading.Lock()
+
+
 def _get_gc():
     global _gc
     if _gc is None:
+        import geonamescache  # only needed to (re)build the city index
+
         _gc = geonamescache.GeonamesCache()
     return _gc
 
 
+@functools.lru_cache(maxsize=None)
+def _snapshot_version() -> str:
+    """Installed geonamescache version, read from its package metadata without importing it."""
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("geonamescache")
+    except PackageNotFoundError:
+        return ""
+
+
+def _load_city_snapshot() -> dict[str, list[tuple[str, str]]] | None:
+    try:
+        with gzip.open(CITY_SNAPSHOT_FILE, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != _snapshot_version():
+            return None
+        return {a2: [tuple(c) for c in cities] for a2, cities in data["cities"].items()}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[countries] City snapshot unreadable, rebuilding: {e}")
+        return None
+
+
+def _save_city_snapshot(index: dict[str, list[tuple[str, str]]]) -> None:
+    try:
+        CITY_SNAPSHOT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = CITY_SNAPSHOT_FILE.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"version": _snapshot_version(), "cities": index}, f, separators=(",", ":"))
+        tmp.replace(CITY_SNAPSHOT_FILE)
+    except Exception as e:
+        print(f"[countries] City snapshot save error: {e}")
+
+
+def _get_city_index() -> dict[str, list[tuple[str, str]]]:
+    """Per-country city lists, built once from geonamescache (or the disk snapshot)."""
+    global _city_index
+    with _city_index_lock:
+        if _city_index is None:
+            index = _load_city_snapshot()
+            if index is None:
+                by_country: dict[str, list[dict]] = {}
+                for c in _get_gc().get_cities().values():
+                    by_country.setdefault(c["countrycode"], []).append(c)
+                index = {}
+                for a2, cities in by_country.items():
+                    cities.sort(key=lambda c: c.get("population", 0), reverse=True)
+                    index[a2] = [(c["name"], c.get("admin1code") or "") for c in cities]
+                _save_city_snapshot(index)
+            _city_index = index
+        return _city_index
+
+
+@functools.lru_cache(maxsize=None)
 def _alpha2(country_name: str) -> str | None:
     """Return ISO alpha-2 code for a country name, or None."""
     pc = pycountry.countries.get(name=country_name)
@@ -108,42 +180,53 @@ def get_display_currencies(country_name: str) -> list[str]:
 
 def get_regions(country_name: str) -> list[str]:
     """Return sorted top-level subdivision names (states/provinces) for a country."""
+    return list(_regions(country_name))
+
+
+@functools.lru_cache(maxsize=None)
+def _regions(country_name: str) -> tuple[str, ...]:
     a2 = _alpha2(country_name)
     if not a2:
-        return []
+        return ()
     try:
         subs = pycountry.subdivisions.get(country_code=a2)
         if not subs:
-            return []
+            return ()
         # Keep only top-level subdivisions (no parent)
         top = [s for s in subs if s.parent_code is None] or list(subs)
-        return sorted(set(s.name for s in top))
+        return tuple(sorted(set(s.name for s in top)))
     except Exception:
-        return []
+        return ()
+
+
+@functools.lru_cache(maxsize=None)
+def _admin1_code(a2: str, region_name: str) -> str | None:
+    """Map a pycountry subdivision name to its geonames admin1code."""
+    for s in pycountry.subdivisions.get(country_code=a2) or []:
+        if s.name == region_name:
+            return s.code.split("-")[-1]
+    return None
 
 
 def get_cities(country_name: str, region_name: str = "") -> list[str]:
     """Return sorted city names for a country, optionally filtered by region."""
+    return list(_cities(country_name, region_name))
+
+
+@functools.lru_cache(maxsize=None)
+def _cities(country_name: str, region_name: str) -> tuple[str, ...]:
     a2 = _alpha2(country_name)
     if not a2:
-        return []
+        return ()
     try:
-        gc = _get_gc()
-        cities = [c for c in gc.get_cities().values() if c["countrycode"] == a2]
+        cities = _get_city_index().get(a2, [])
 
         if region_name:
-            # Find the geonames admin1code that matches the region name
-            subs = pycountry.subdivisions.get(country_code=a2) or []
-            admin1 = None
-            for s in subs:
-                if s.name == region_name:
-                    admin1 = s.code.split("-")[-1]
-                    break
+            admin1 = _admin1_code(a2, region_name)
             if admin1:
-                cities = [c for c in cities if c.get("admin1code") == admin1]
+                cities = [c for c in cities if c[1] == admin1]
 
-        # Sort by population desc, cap at 300 to keep the list manageable
-        cities.sort(key=lambda c: c.get("population", 0), reverse=True)
-        return sorted(set(c["name"] for c in cities[:300]))
+        # Already ordered by population desc; cap at MAX_CITIES to keep the list manageable
+        return tuple(sorted(set(name for name, _ in cities[:MAX_CITIES])))
     except Exception:
-        return []
+        return ()
@@ -1,6 +1,138 @@
+"""Currency conversion from a process-wide table of ECB reference rates.
+
+frankfurter.app publishes every ECB rate for a base currency in one response,
+so the whole table is fetched with a single request and any pair is derived
+locally as a cross rate (``rate[to] / rate[from]``).  The table lives in memory
+for the process and in a small ``DiskCache`` with a daily TTL (ECB publishes
+once per working day), so a new process reuses today's rates without a call.
+
+When a refresh fails (offline, frankfurter down) the last known table is served
+stale — from memory or from disk — and the refresh is retried after
+FX_RETRY_SECONDS rather than on every conversion.
+"""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import threading
+import time
+from typing import Iterable
+
+import numpy as np
 import requests
 
+from utils import transport
+from utils.disk_cache import DiskCache
+
 FRANKFURTER_BASE = "https://api.frankfurter.app/latest"
+FX_BASE_CURRENCY = "EUR"            # ECB quotes everything against EUR
+FX_CACHE_FILE = pathlib.Path("pipeline_cache") / "fx_rates.sqlite"
+FX_CACHE_TTL_HOURS = 24
+FX_RETRY_SECONDS = 300              # after a failed refresh, keep serving stale rates this long
+
+_lock = threading.Lock()
+_table: dict[str, float] | None = None   # currency -> units per 1 FX_BASE_CURRENCY
+_table_fetched_at = 0.0
+_retry_after = 0.0
+_stats = {"fetches": 0, "fetch_errors": 0, "disk_loads": 0, "stale_served": 0}
+
+_fx_cache: DiskCache | None = None
+_fx_cache_lock = threading.Lock()
+
+
+def _get_fx_cache() -> DiskCache:
+    global _fx_cache
+    with _fx_cache_lock:
+        if _fx_cache is None:
+            _fx_cache = DiskCache(FX_CACHE_FILE, ttl_seconds=FX_CACHE_TTL_HOURS * 3600, max_bytes=1024 * 1024)
+        return _fx_cache
+
+
+def get_fx_stats() -> dict[str, int]:
+    with _lock:
+        return dict(_stats)
+
+
+# ---------------------------------------------------------------------------
+# Rate table
+# ---------------------------------------------------------------------------
+
+def _fetch_table() -> dict[str, float] | None:
+    """One request for every ECB rate against FX_BASE_CURRENCY."""
+    try:
+        resp = transport.get(FRANKFURTER_BASE, params={"from": FX_BASE_CURRENCY}, timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
+        rates = {code.upper(): float(rate) for code, rate in (data.get("rates") or {}).items()}
+        if not rates:
+            print(f"[currency] Rate table fetch returned no rates: {data}")
+            return None
+        rates[FX_BASE_CURRENCY] = 1.0
+        return rates
+    except requests.exceptions.HTTPError as e:
+        print(f"[currency] HTTP error fetching rate table: {e}")
+        return None
+    except Exception as e:
+        print(f"[currency] Error fetching rate table: {e}")
+        return None
+
+
+def get_rate_table() -> dict[str, float] | None:
+    """The current rate table (currency -> units per EUR), refreshing it when a day old.
+
+    Falls back to the newest stale table when the refresh fails; None only when
+    no table has ever been fetched.  After a failure nothing is fetched again
+    for FX_RETRY_SECONDS, with or without a table to serve.
+    """
+    global _table, _table_fetched_at, _retry_after
+    with _lock:
+        now = time.time()
+        if _table is not None and now - _table_fetched_at <= FX_CACHE_TTL_HOURS * 3600:
+            return _table
+        if now < _retry_after:
+            # A refresh failed recently — don't retry (and block callers) until the backoff ends
+            if _table is not None:
+                _stats["stale_served"] += 1
+            return _table
+
+        cache = _get_fx_cache()
+        key = f"ecb:{FX_BASE_CURRENCY}"
+        entry = cache.get(key)
+        if entry is not None:
+            _table, _table_fetched_at = json.loads(entry.value), entry.stored_at
+            _stats["disk_loads"] += 1
+            return _table
+
+        _stats["fetches"] += 1
+        fetched = _fetch_table()
+        if fetched is not None:
+            cache.set(key, json.dumps(fetched))
+            _table, _table_fetched_at = fetched, now
+            return _table
+
+        _stats["fetch_errors"] += 1
+        _retry_after = now + FX_RETRY_SECONDS
+        if _table is None:
+            stale = cache.get(key, allow_stale=True)
+            if stale is not None:
+                _table, _table_fetched_at = json.loads(stale.value), stale.stored_at
+        if _table is not None:
+            age_hours = (now - _table_fetched_at) / 3600
+            print(f"[currency] Serving stale rates ({age_hours:.1f}h old)")
+            _stats["stale_served"] += 1
+        return _table
+
+
+def get_rate(from_code: str, to_code: str) -> float | None:
+    """Units of *to_code* per unit of *from_code*; None if either is not an ECB currency."""
+    from_code, to_code = from_code.upper(), to_code.upper()
+    if from_code == to_code:
+        return 1.0
+    table = get_rate_table()
+    if table is None or from_code not in table or to_code not in table:
+        return None
+    return table[to_code] / table[from_code]
 
 
 def convert_currency(
@@ -9,7 +141,7 @@ def convert_currency(
     to_code: str,
     api_key: str = "",  # unused — frankfurter.app requires no API key
 ) -> float | None:
-    """Convert amount from one currency to another using frankfurter.app (ECB rates, no key needed)."""
+    """Convert amount from one currency to another using ECB rates (frankfurter.app, no key needed)."""
 
     if from_code == to_code:
         return amount
@@ -17,28 +149,22 @@ def convert_currency(
     if amount is None or amount == 0:
         return None
 
-    params = {
-        "from": from_code.upper(),
-        "to": to_code.upper(),
-        "amount": amount,
-    }
-
-    try:
-        resp = requests.get(FRANKFURTER_BASE, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+    rate = get_rate(from_code, to_code)
+    if rate is None:
+        print(f"[currency] Conversion failed for {from_code}->{to_code}: no rate")
+        return None
+    return amount * rate
 
-        rates = data.get("rates", {})
-        result = rates.get(to_code.upper())
-        if result is not None:
-            return float(result)
 
-        print(f"[currency] Conversion failed for {from_code}->{to_code}: {data}")
-        return None
+def convert_many(amounts: Iterable[float | None], from_codes: Iterable[str | None], to_code: str) -> np.ndarray:
+    """Convert many amounts to *to_code* at once; NaN where the amount or its currency is unusable.
 
-    except requests.exceptions.HTTPError as e:
-        print(f"[currency] HTTP error for {from_code}->{to_code}: {e}")
-        return None
-    except Exception as e:
-        print(f"[currency] Error for {from_code}->{to_code}: {e}")
-        return None
+    One table lookup per distinct currency, then a single vectorised multiply.
+    """
+    amounts = np.asarray(list(amounts) if not isinstance(amounts, np.ndarray) else amounts, dtype=float)
+    codes = [(c or "").upper() for c in from_codes]
+    if len(codes) != len(amounts):
+        raise ValueError(f"convert_many: {len(amounts)} amounts but {len(codes)} currency codes")
+    rates = {c: (get_rate(c, to_code) if c else None) for c in set(codes)}
+    factors = np.array([np.nan if rates[c] is None else rates[c] for c in codes], dtype=float)
+    return amounts * factors
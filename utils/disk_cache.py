@@ -0,0 +1,148 @@
+"""SQLite-backed key/value cache with TTL and size-bounded LRU eviction.
+
+Shared by the page cache (``jina_client``) and the extraction cache
+(``claude_client``).  Values are strings; each entry also carries a small JSON
+``meta`` dict (e.g. ETag / Last-Modified validators).  Expired entries are
+kept until evicted so callers can revalidate them (``get(..., allow_stale=True)``).
+
+One connection per cache, guarded by a lock, so it is safe to share across the
+pipeline's worker threads.
+"""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class CacheEntry:
+    value: str
+    meta: dict = field(default_factory=dict)
+    stored_at: float = 0.0
+    fresh: bool = True
+
+
+class DiskCache:
+    """Persistent LRU cache; ``max_bytes`` bounds the total size of stored values."""
+
+    def __init__(self, path: str | pathlib.Path, ttl_seconds: float, max_bytes: int) -> None:
+        self.path = pathlib.Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " meta TEXT,"
+                " size INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str, allow_stale: bool = False) -> CacheEntry | None:
+        """Return the entry for *key*; expired entries only when *allow_stale*."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, meta, stored_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                value, meta, stored_at = row
+                fresh = (time.time() - stored_at) <= self.ttl_seconds
+                if not fresh and not allow_stale:
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                if fresh:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                return CacheEntry(value=value, meta=json.loads(meta or "{}"), stored_at=stored_at, fresh=fresh)
+        except sqlite3.Error as e:
+            print(f"[cache] {self.path.name} read error: {e}")
+            return None
+
+    def set(self, key: str, value: str, meta: dict | None = None) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, meta, size, stored_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, value, json.dumps(meta or {}), size, now, now),
+                )
+                self._evict(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[cache] {self.path.name} write error: {e}")
+
+    def touch(self, key: str, meta: dict | None = None) -> None:
+        """Mark an entry fresh again (e.g. after a 304 Not Modified)."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                if meta is None:
+                    conn.execute(
+                        "UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key)
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE entries SET stored_at = ?, accessed_at = ?, meta = ? WHERE key = ?",
+                        (now, now, json.dumps(meta), key),
+                    )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[cache] {self.path.name} write error: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least-recently-used entries until the store fits in max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+            }
@@ -1,8 +1,26 @@
-import time
+import pathlib
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 import requests
-from bs4 import BeautifulSoup
+
+from utils import transport
+from utils.disk_cache import DiskCache
+from utils.ratelimit import get_limiter, parse_retry_after
+from utils.tracing import span
 
 JINA_BASE = "https://r.jina.ai/"
+_JINA_HOST = "r.jina.ai"
+
+# Shared Jina quota across all fetch threads (token bucket, adaptive on 429)
+JINA_RATE_LIMIT_PER_MINUTE = 60
+JINA_BURST = 5
+
+# Persistent page cache (post-preprocessing text keyed by normalized URL)
+PAGE_CACHE_FILE = pathlib.Path("pipeline_cache") / "pages.sqlite"
+PAGE_CACHE_TTL_HOURS = 72
+PAGE_CACHE_MAX_MB = 200
+PAGE_VALIDATOR_HEAD_TIMEOUT = 5  # seconds for the origin HEAD that picks up a Jina page's validators
 
 # Strings that indicate the page is a bot/auth wall, not real content
 _BLOCK_SIGNALS = [
@@ -25,6 +43,15 @@ _LOGIN_SIGNALS = [
     "Please sign in",
 ]
 
+_BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+}
+
 _SALARY_SIGNALS = [
     "$", "£", "€", "per hour", "per year", "/hr", "/yr",
     "salary", "compensation", "pay rate", "wage", "hourly",
@@ -70,6 +97,8 @@ def _parse_salary_html(html: str) -> str:
     Parse raw HTML, targeting salary-relevant structured content first,
     falling back to full text extraction with salary-focused filtering.
     """
+    from bs4 import BeautifulSoup  # only needed when the direct-HTTP fallback kicks in
+
     soup = BeautifulSoup(html, "html.parser")
 
     # Remove noise tags
@@ -127,40 +156,64 @@ def _parse_salary_html(html: str) -> str:
     return _extract_salary_focused_lines(full_text)
 
 
-def _fetch_direct_http(url: str) -> tuple[str | None, str | None]:
+def _validators(resp) -> dict:
+    """Pull HTTP cache validators (ETag / Last-Modified) off an origin response."""
+    validators = {}
+    if resp.headers.get("ETag"):
+        validators["etag"] = resp.headers["ETag"]
+    if resp.headers.get("Last-Modified"):
+        validators["last_modified"] = resp.headers["Last-Modified"]
+    return validators
+
+
+def _origin_validators(url: str) -> dict:
+    """ETag / Last-Modified for a page Jina served, from a HEAD against the origin ({} if it has none)."""
+    with span("fetch.head") as attrs:
+        try:
+            resp = transport.request(
+                "HEAD", url, headers=_BROWSER_HEADERS, timeout=PAGE_VALIDATOR_HEAD_TIMEOUT, allow_redirects=True,
+            )
+        except Exception:
+            attrs["ok"] = False
+            return {}
+        attrs["ok"] = resp.status_code == 200
+    return _validators(resp) if resp.status_code == 200 else {}
+
+
+def _fetch_direct_http(url: str) -> tuple[str | None, str | None, dict]:
     """
     Attempt to fetch the URL directly using a browser-like User-Agent,
     then parse salary-relevant content from the HTML.
-    Returns (content, error_message).
+    Returns (content, error_message, validators).
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-    }
+    with span("fetch.direct") as attrs:
+        content, error, validators = _fetch_direct_http_untimed(url)
+        attrs["ok"] = content is not None
+    return content, error, validators
+
+
+def _fetch_direct_http_untimed(url: str) -> tuple[str | None, str | None, dict]:
     try:
-        resp = requests.get(url, headers=headers, timeout=12, allow_redirects=True)
+        resp = transport.get(url, headers=_BROWSER_HEADERS, timeout=12, allow_redirects=True)
         if resp.status_code != 200:
-            return None, f"NETWORK:Direct HTTP failed (HTTP {resp.status_code})"
+            return None, f"NETWORK:Direct HTTP failed (HTTP {resp.status_code})", {}
         content = _parse_salary_html(resp.text)
         if not content or len(content) < 50:
-            return None, "NETWORK:Direct HTTP returned insufficient content"
+            return None, "NETWORK:Direct HTTP returned insufficient content", {}
         print(f"[jina] Direct HTTP fallback succeeded: {url}")
-        return content, None
+        return content, None, _validators(resp)
     except requests.exceptions.Timeout:
-        return None, "NETWORK:Direct HTTP timed out"
+        return None, "NETWORK:Direct HTTP timed out", {}
     except Exception as e:
-        return None, f"NETWORK:Direct HTTP error: {e}"
+        return None, f"NETWORK:Direct HTTP error: {e}", {}
 
 
-def fetch_page(url: str) -> tuple[str | None, str | None]:
+def _fetch_page_uncached(url: str) -> tuple[str | None, str | None, dict]:
     """
     Fetch a page via Jina Reader, with direct HTTP fallback on failure.
-    Returns (content, error_message).
-    content is None on failure; error_message describes what went wrong.
+    Returns (content, error_message, validators).  The validators come from
+    the origin response for the direct-HTTP fallback, or from a HEAD against
+    the origin for Jina content, so either can be revalidated once stale.
     """
     jina_url = JINA_BASE + url
     headers = {
@@ -174,27 +227,36 @@ def fetch_page(url: str) -> tuple[str | None, str | None]:
         "X-With-Images-Summary": "false",
     }
 
+    limiter = get_limiter(_JINA_HOST, JINA_RATE_LIMIT_PER_MINUTE / 60, JINA_BURST)
+
     try:
-        resp = requests.get(jina_url, headers=headers, timeout=15)
-        if resp.status_code == 429:
-            print(f"[jina] HTTP 429 rate limit — waiting 10s and retrying: {url}")
-            time.sleep(10)
-            resp = requests.get(jina_url, headers=headers, timeout=15)
+        with span("fetch.jina"):
+            limiter.acquire()
+            resp = transport.get(jina_url, headers=headers, timeout=15)
+            if resp.status_code == 429:
+                backoff = limiter.on_throttle(parse_retry_after(resp.headers.get("Retry-After")))
+                print(f"[jina] HTTP 429 rate limit — backing off {backoff:.1f}s and retrying: {url}")
+                limiter.acquire()
+                resp = transport.get(jina_url, headers=headers, timeout=15)
+                if resp.status_code == 429:
+                    limiter.on_throttle(parse_retry_after(resp.headers.get("Retry-After")))
+        if resp.status_code == 200:
+            limiter.on_success()
         if resp.status_code != 200:
             msg = f"NETWORK:Page fetch failed (HTTP {resp.status_code})"
             print(f"[jina] {msg}: {url}")
             print(f"[jina] Jina failed ({msg}), trying direct HTTP fallback: {url}")
-            direct_content, direct_error = _fetch_direct_http(url)
+            direct_content, direct_error, validators = _fetch_direct_http(url)
             if direct_content:
-                return direct_content, None
-            return None, msg
+                return direct_content, None, validators
+            return None, msg, {}
 
         text = resp.text.strip()
         if not text:
             msg = "NETWORK:Empty page content returned"
             print(f"[jina] {msg}: {url}")
             # Empty content — direct HTTP unlikely to help, return as-is
-            return None, msg
+            return None, msg, {}
 
         # Scoring-based wall detection on first 3000 chars
         text_sample = text[:3000].lower()
@@ -205,10 +267,10 @@ def fetch_page(url: str) -> tuple[str | None, str | None]:
             msg = "WALL:Blocked by bot/Cloudflare protection — page content unavailable"
             print(f"[jina] {msg}: {url}")
             print(f"[jina] Jina failed ({msg}), trying direct HTTP fallback: {url}")
-            direct_content, direct_error = _fetch_direct_http(url)
+            direct_content, direct_error, validators = _fetch_direct_http(url)
             if direct_content:
-                return direct_content, None
-            return None, msg
+                return direct_content, None, validators
+            return None, msg, {}
 
         # Scoring-based login wall detection
         login_signals_found = any(signal.lower() in text_sample for signal in _LOGIN_SIGNALS)
@@ -216,41 +278,147 @@ def fetch_page(url: str) -> tuple[str | None, str | None]:
             msg = "WALL:Login wall — sign-in required to view this page"
             print(f"[jina] {msg}: {url}")
             print(f"[jina] Jina failed ({msg}), trying direct HTTP fallback: {url}")
-            direct_content, direct_error = _fetch_direct_http(url)
+            direct_content, direct_error, validators = _fetch_direct_http(url)
             if direct_content:
-                return direct_content, None
-            return None, msg
+                return direct_content, None, validators
+            return None, msg, {}
 
         # Also catch Jina's inline warning for blocked targets
         if "Target URL returned error 403" in text or "Target URL returned error 401" in text:
             msg = "WALL:Blocked by bot/Cloudflare protection — page content unavailable"
             print(f"[jina] {msg}: {url}")
             print(f"[jina] Jina failed ({msg}), trying direct HTTP fallback: {url}")
-            direct_content, direct_error = _fetch_direct_http(url)
+            direct_content, direct_error, validators = _fetch_direct_http(url)
             if direct_content:
-                return direct_content, None
-            return None, msg
+                return direct_content, None, validators
+            return None, msg, {}
 
         # Salary-focused preprocessing for longer texts
         if len(text) > 4000:
-            return _extract_salary_focused_lines(text), None
-        return text, None
+            text = _extract_salary_focused_lines(text)
+        return text, None, _origin_validators(url)
 
     except requests.exceptions.Timeout:
         msg = "NETWORK:Request timed out (>15s)"
         print(f"[jina] {msg}: {url}")
         print(f"[jina] Jina failed ({msg}), trying direct HTTP fallback: {url}")
-        direct_content, direct_error = _fetch_direct_http(url)
+        direct_content, direct_error, validators = _fetch_direct_http(url)
         if direct_content:
-            return direct_content, None
-        return None, msg
+            return direct_content, None, validators
+        return None, msg, {}
     except Exception as e:
         msg = f"NETWORK:Page fetch error: {e}"
         print(f"[jina] {msg}: {url}")
         print(f"[jina] Jina failed ({msg}), trying direct HTTP fallback: {url}")
-        direct_content, direct_error = _fetch_direct_http(url)
+        direct_content, direct_error, validators = _fetch_direct_http(url)
         if direct_content:
-            return direct_content, None
-        return None, msg
-    finally:
-        time.sleep(1)
+            return direct_content, None, validators
+        return None, msg, {}
+
+
+# ---------------------------------------------------------------------------
+# Persistent page cache
+# ---------------------------------------------------------------------------
+
+_TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "msclkid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical cache key: lowercase host without www., no fragment or tracking
+    params, sorted query, no trailing slash."""
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", netloc, path, urlencode(query), ""))
+
+
+_page_cache: DiskCache | None = None
+_page_cache_lock = threading.Lock()
+
+
+def _get_page_cache() -> DiskCache:
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = DiskCache(
+                PAGE_CACHE_FILE,
+                ttl_seconds=PAGE_CACHE_TTL_HOURS * 3600,
+                max_bytes=PAGE_CACHE_MAX_MB * 1024 * 1024,
+            )
+        return _page_cache
+
+
+def _revalidate(url: str, validators: dict) -> tuple[str, str | None, dict] | None:
+    """
+    Conditional GET against the origin using stored validators.
+    Returns ("not_modified", None, validators), ("updated", content, validators),
+    or None when the origin gave nothing usable.
+    """
+    headers = dict(_BROWSER_HEADERS)
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        resp = transport.get(url, headers=headers, timeout=12, allow_redirects=True)
+    except Exception as e:
+        print(f"[jina] Revalidation error: {e}: {url}")
+        return None
+    if resp.status_code == 304:
+        return "not_modified", None, _validators(resp) or validators
+    if resp.status_code == 200:
+        content = _parse_salary_html(resp.text)
+        if content and len(content) >= 50:
+            return "updated", content, _validators(resp)
+    return None
+
+
+def fetch_page(url: str) -> tuple[str | None, str | None]:
+    """
+    Fetch a page via Jina Reader, with direct HTTP fallback on failure.
+    Returns (content, error_message).
+    content is None on failure; error_message describes what went wrong.
+
+    Successful fetches are kept in a persistent page cache keyed by the
+    normalized URL. Expired entries with ETag/Last-Modified validators are
+    revalidated against the origin before falling back to a full fetch.
+    """
+    with span("fetch", domain=urlsplit(url).netloc) as attrs:
+        content, error, attrs["source"] = _fetch_page_cached(url)
+    return content, error
+
+
+def _fetch_page_cached(url: str) -> tuple[str | None, str | None, str]:
+    """fetch_page plus where the content came from: "cache" | "revalidated" | "refreshed" | "network"."""
+    cache = _get_page_cache()
+    key = normalize_url(url)
+    entry = cache.get(key, allow_stale=True)
+    if entry is not None:
+        if entry.fresh:
+            return entry.value, None, "cache"
+        if entry.meta:
+            outcome = _revalidate(url, entry.meta)
+            if outcome is not None:
+                status, content, validators = outcome
+                if status == "not_modified":
+                    print(f"[jina] Page cache revalidated (304): {url}")
+                    cache.touch(key, validators)
+                    return entry.value, None, "revalidated"
+                print(f"[jina] Page cache refreshed from origin: {url}")
+                cache.set(key, content, validators)
+                return content, None, "refreshed"
+
+    content, error, validators = _fetch_page_uncached(url)
+    if content:
+        cache.set(key, content, validators)
+    return content, error, "network"
+
+
+def get_page_cache_stats() -> dict:
+    return _get_page_cache().stats()
@@ -0,0 +1,220 @@
+"""Token and cost accounting for Anthropic calls.
+
+Every call goes through ``create_message``, which times ``messages.create``
+and hands the response to ``record_usage``.  That splits the input side of the
+``usage`` block into uncached tokens, cache reads and cache writes (no
+prompt is marked for caching today, so the latter two stay 0 — see
+``claude_client``), per call site
+("extract", "extract_batch", "critique", "validate", "summary",
+"classify_niche", "suggest_sources", "soc_lookup"), and prices the call from
+MODEL_PRICES_PER_MTOK.
+
+Process-wide counters back ``get_llm_usage_stats``.  Each pipeline run also
+has a ``RunUsage``, found through a context variable like the tracing
+recorder, which counts only that run's calls (concurrent batch / CLI runs stay
+separate) and enforces its token budget.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from utils.tracing import record_span
+
+MAX_CALL_RECORDS = 500  # most recent per-call records kept for inspection
+
+# USD per million tokens (input, output), matched by model-name prefix
+MODEL_PRICES_PER_MTOK: dict[str, tuple[float, float]] = {
+    "claude-haiku-4-5": (1.00, 5.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "claude-opus-4": (15.00, 75.00),
+}
+CACHE_WRITE_PRICE_FACTOR = 1.25  # 5-minute cache writes, relative to the input price
+CACHE_READ_PRICE_FACTOR = 0.10
+BATCH_PRICE_FACTOR = 0.50  # Message Batches bill every token at half the interactive price
+
+_TOTAL_KEYS = (
+    "calls",
+    "input_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+    "output_tokens",
+    "latency_seconds",
+    "cost_usd",
+)
+
+
+@dataclass
+class CallUsage:
+    kind: str
+    model: str
+    input_tokens: int                  # uncached input tokens
+    cache_read_input_tokens: int       # served from the prompt cache
+    cache_creation_input_tokens: int   # written to the prompt cache
+    output_tokens: int
+    latency_seconds: float
+    cost_usd: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return (
+            self.input_tokens + self.cache_read_input_tokens
+            + self.cache_creation_input_tokens + self.output_tokens
+        )
+
+
+def _call_cost(call: CallUsage) -> float:
+    """USD cost of one call; 0.0 for a model missing from MODEL_PRICES_PER_MTOK."""
+    prices = next((p for prefix, p in MODEL_PRICES_PER_MTOK.items() if call.model.startswith(prefix)), None)
+    if prices is None:
+        return 0.0
+    input_price, output_price = prices
+    return (
+        call.input_tokens * input_price
+        + call.cache_creation_input_tokens * input_price * CACHE_WRITE_PRICE_FACTOR
+        + call.cache_read_input_tokens * input_price * CACHE_READ_PRICE_FACTOR
+        + call.output_tokens * output_price
+    ) / 1_000_000
+
+
+def _add_to_totals(totals: dict[str, dict[str, float]], call: CallUsage) -> None:
+    t = totals.setdefault(call.kind, dict.fromkeys(_TOTAL_KEYS, 0))
+    t["calls"] += 1
+    for key in _TOTAL_KEYS[1:]:
+        t[key] += getattr(call, key)
+
+
+def _rounded(totals: dict[str, float]) -> dict[str, float]:
+    return {**totals, "latency_seconds": round(totals["latency_seconds"], 2), "cost_usd": round(totals["cost_usd"], 6)}
+
+
+# ---------------------------------------------------------------------------
+# Per-run usage and token budget
+# ---------------------------------------------------------------------------
+
+class RunUsage:
+    """Token usage of one pipeline run, with an optional token budget.
+
+    Every token of a call counts towards the budget (uncached input, cache
+    reads and writes, output).
+    """
+
+    def __init__(self, budget_tokens: int | None = None) -> None:
+        self.budget_tokens = budget_tokens
+        self._lock = threading.Lock()
+        self._totals: dict[str, dict[str, float]] = {}
+        self._tokens = 0
+        self._cost = 0.0
+
+    def add(self, call: CallUsage) -> None:
+        with self._lock:
+            _add_to_totals(self._totals, call)
+            self._tokens += call.tokens
+            self._cost += call.cost_usd
+
+    @property
+    def tokens(self) -> int:
+        return self._tokens
+
+    @property
+    def budget_exhausted(self) -> bool:
+        return self.budget_tokens is not None and self._tokens >= self.budget_tokens
+
+    def by_kind(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {kind: _rounded(t) for kind, t in self._totals.items()}
+
+    def summary(self) -> dict[str, Any]:
+        by_kind = self.by_kind()
+        return {
+            "by_kind": by_kind,
+            "calls": sum(t["calls"] for t in by_kind.values()),
+            "input_tokens": sum(t["input_tokens"] for t in by_kind.values()),
+            "cache_read_input_tokens": sum(t["cache_read_input_tokens"] for t in by_kind.values()),
+            "cache_creation_input_tokens": sum(t["cache_creation_input_tokens"] for t in by_kind.values()),
+            "output_tokens": sum(t["output_tokens"] for t in by_kind.values()),
+            "tokens": self._tokens,
+            "cost_usd": round(self._cost, 4),
+            "budget_tokens": self.budget_tokens,
+            "budget_exhausted": self.budget_exhausted,
+        }
+
+
+_run_usage: contextvars.ContextVar[RunUsage | None] = contextvars.ContextVar("run_usage", default=None)
+
+
+def current_run_usage() -> RunUsage | None:
+    return _run_usage.get()
+
+
+def set_run_usage(usage: RunUsage | None) -> contextvars.Token:
+    """Make *usage* the active run's counter for this context (and tasks / copied contexts started from it)."""
+    return _run_usage.set(usage)
+
+
+def reset_run_usage(token: contextvars.Token) -> None:
+    try:
+        _run_usage.reset(token)
+    except ValueError:
+        pass  # reset from a different context
+
+
+# ---------------------------------------------------------------------------
+# Process-wide counters
+# ---------------------------------------------------------------------------
+
+_lock = threading.Lock()
+_calls: deque[CallUsage] = deque(maxlen=MAX_CALL_RECORDS)
+_totals: dict[str, dict[str, float]] = {}
+
+
+def create_message(client: Any, kind: str, **params: Any) -> Any:
+    """``client.messages.create(**params)``, with its usage and latency recorded under *kind*."""
+    started = time.time()
+    response = client.messages.create(**params)
+    record_usage(kind, params.get("model", ""), response, time.time() - started)
+    return response
+
+
+def record_usage(kind: str, model: str, response: Any, latency_seconds: float, price_factor: float = 1.0) -> None:
+    """Record the usage block of one Anthropic response (and an ``llm.<kind>`` timing span).
+
+    *price_factor* scales the cost, e.g. BATCH_PRICE_FACTOR for a Message Batches result.
+    """
+    record_span(f"llm.{kind}", latency_seconds, model=model)
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    call = CallUsage(
+        kind=kind,
+        model=model,
+        input_tokens=getattr(usage, "input_tokens", 0) or 0,
+        cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+        cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        output_tokens=getattr(usage, "output_tokens", 0) or 0,
+        latency_seconds=latency_seconds,
+    )
+    call.cost_usd = _call_cost(call) * price_factor
+    with _lock:
+        _calls.append(call)
+        _add_to_totals(_totals, call)
+    run_usage = _run_usage.get()
+    if run_usage is not None:
+        run_usage.add(call)
+
+
+def get_llm_usage_stats() -> dict[str, dict[str, float]]:
+    """Per call kind: token counters, cost and latency."""
+    with _lock:
+        return {kind: _rounded(t) for kind, t in _totals.items()}
+
+
+def get_recent_calls(limit: int = 50) -> list[dict]:
+    with _lock:
+        calls = list(_calls)[-limit:]
+    return [asdict(c) for c in calls]
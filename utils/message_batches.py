@@ -0,0 +1,343 @@
+"""Offline bulk mode: extraction and validation through Anthropic Message Batches.
+
+For overnight re-runs of large title lists.  Instead of one synchronous
+Messages call per page, every extraction prompt for the whole job list is
+queued into a Message Batch, then the low-confidence critiques into a second
+one, then each job's validation chunks into a third.  Prompts, parsing and
+row building are the same code the interactive pipeline uses
+(``claude_client`` params/parsers, ``_coerce_numeric_fields``, ``_build_row``,
+``_normalize_rows``), so results are interchangeable — and each finished
+extraction is written to the extraction cache for later interactive runs.
+
+Every succeeded request's usage is recorded like an interactive call, under
+"bulk_extract" / "bulk_critique" / "bulk_validate" and priced at the batch
+discount; it counts against the active RunUsage (if any), and each
+``run_bulk`` appends one "bulk" entry to the run log.
+
+The client is injectable: anything with ``messages.batches.create / retrieve /
+results`` works, e.g. ``anthropic.Anthropic(base_url=...)`` pointed at a local
+fake batch server.
+
+    jobs = [BulkJob("Data Engineer", "Canada", pages=pages_from_store("Data Engineer", "Canada", ""))]
+    rows_per_job = run_bulk(jobs, anthropic.Anthropic(api_key=...))
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from utils.claude_client import (
+    _build_critique_prompt,
+    _build_extraction_prompt,
+    _build_validation_prompt,
+    _coerce_numeric_fields,
+    _empty_extraction,
+    _extraction_cache_key,
+    _extraction_params,
+    _extraction_target,
+    _get_extraction_cache,
+    _parse_extraction,
+    _parse_validation,
+    _pay_rate_stats,
+    _validation_chunks,
+    _validation_fallback,
+    _validation_params,
+    _with_path,
+)
+from utils.countries import get_country_currency
+from utils.currency import get_rate
+from utils.jina_client import _get_page_cache, normalize_url
+from utils.llm_usage import BATCH_PRICE_FACTOR, RunUsage, current_run_usage, record_usage, reset_run_usage, set_run_usage
+from utils.pre_extract import pre_extract
+from utils.pipeline import (
+    _apply_validation, _build_row, _get_cache_key, _get_run_log, _get_run_store, _normalize_rows,
+)
+from utils.serpapi_client import get_source_type
+
+BATCH_POLL_SECONDS = 30          # how often to check a batch's processing_status
+BATCH_TIMEOUT_SECONDS = 24 * 3600  # batches expire after 24h on the API side
+MAX_REQUESTS_PER_BATCH = 10_000  # well under the API's per-batch request / size limits
+
+
+@dataclass
+class BulkPage:
+    url: str
+    domain: str
+    page_text: str
+    source_type: str | None = None
+
+
+@dataclass
+class BulkJob:
+    job_title: str
+    country: str
+    region: str = ""
+    city: str = ""
+    display_pref: str = "Annual Salary"
+    display_currency: str = "USD"
+    niche_level: str = "common"
+    title_variants: list[str] = field(default_factory=list)
+    pages: list[BulkPage] = field(default_factory=list)
+
+
+def pages_from_store(job_title: str, country: str, region: str) -> list[BulkPage]:
+    """Pages fetched by earlier runs of this query, read back from the run store and page cache."""
+    page_cache = _get_page_cache()
+    pages = []
+    for row in _get_run_store().load_rows(_get_cache_key(job_title, country, region)):
+        url = row.get("web_search_result_url")
+        domain = row.get("country_specific_site_url")
+        if not url or not domain or domain == "bls.gov":
+            continue
+        entry = page_cache.get(normalize_url(url), allow_stale=True)
+        if entry is not None and entry.value:
+            pages.append(BulkPage(url=url, domain=domain, page_text=entry.value, source_type=get_source_type(domain)))
+    return pages
+
+
+# ---------------------------------------------------------------------------
+# Batch plumbing
+# ---------------------------------------------------------------------------
+
+def _result_text(entry: Any) -> str | None:
+    """Text of a succeeded batch result; None for errored / canceled / expired requests."""
+    result = entry.result
+    if getattr(result, "type", None) != "succeeded":
+        print(f"[batches] {entry.custom_id}: {getattr(result, 'type', 'unknown')}")
+        return None
+    try:
+        return result.message.content[0].text.strip()
+    except (AttributeError, IndexError) as e:
+        print(f"[batches] {entry.custom_id}: no text content ({e})")
+        return None
+
+
+def run_message_batch(
+    client: Any,
+    requests: list[dict],
+    poll_interval: float = BATCH_POLL_SECONDS,
+    timeout: float = BATCH_TIMEOUT_SECONDS,
+    sleep: Callable[[float], None] = time.sleep,
+    kind: str = "bulk",
+) -> dict[str, str | None]:
+    """Submit ``[{"custom_id", "params"}, ...]`` as Message Batches and wait for them.
+
+    Returns custom_id -> response text (None when that request did not succeed).
+    Each succeeded request's usage is recorded under *kind* at BATCH_PRICE_FACTOR,
+    with the batch's turnaround as its latency.
+    """
+    texts: dict[str, str | None] = {}
+    for start in range(0, len(requests), MAX_REQUESTS_PER_BATCH):
+        chunk = requests[start:start + MAX_REQUESTS_PER_BATCH]
+        models = {req["custom_id"]: req["params"].get("model", "") for req in chunk}
+        submitted = time.time()
+        batch = client.messages.batches.create(requests=chunk)
+        print(f"[batches] Submitted {batch.id} ({len(chunk)} requests)")
+
+        deadline = time.time() + timeout
+        while batch.processing_status != "ended":
+            if time.time() > deadline:
+                client.messages.batches.cancel(batch.id)
+                raise TimeoutError(f"Message batch {batch.id} did not finish within {timeout}s")
+            sleep(poll_interval)
+            batch = client.messages.batches.retrieve(batch.id)
+        print(f"[batches] {batch.id} ended: {batch.request_counts}")
+
+        turnaround = time.time() - submitted
+        for entry in client.messages.batches.results(batch.id):
+            texts[entry.custom_id] = _result_text(entry)
+            if getattr(entry.result, "type", None) == "succeeded":
+                record_usage(
+                    kind, models.get(entry.custom_id, ""), entry.result.message, turnaround,
+                    price_factor=BATCH_PRICE_FACTOR,
+                )
+        for req in chunk:
+            texts.setdefault(req["custom_id"], None)
+    return texts
+
+
+# ---------------------------------------------------------------------------
+# Bulk extraction + validation
+# ---------------------------------------------------------------------------
+
+def run_bulk(
+    jobs: list[BulkJob],
+    client: Any,
+    poll_interval: float = BATCH_POLL_SECONDS,
+    timeout: float = BATCH_TIMEOUT_SECONDS,
+    sleep: Callable[[float], None] = time.sleep,
+) -> list[list[dict]]:
+    """Extract and validate every page of every job; returns the rows for each job, in order.
+
+    Usage is counted on the active RunUsage, or a fresh one; once its budget is
+    spent the critique pass is skipped.
+    """
+    usage = current_run_usage()
+    token = None
+    if usage is None:
+        usage = RunUsage()
+        token = set_run_usage(usage)
+    try:
+        return _run_bulk(jobs, client, usage, poll_interval, timeout, sleep)
+    finally:
+        if token is not None:
+            reset_run_usage(token)
+
+
+def _run_bulk(
+    jobs: list[BulkJob],
+    client: Any,
+    usage: RunUsage,
+    poll_interval: float,
+    timeout: float,
+    sleep: Callable[[float], None],
+) -> list[list[dict]]:
+    started = time.time()
+
+    def _run(requests: list[dict], kind: str) -> dict[str, str | None]:
+        if not requests:
+            return {}
+        return run_message_batch(client, requests, poll_interval, timeout, sleep, kind=kind)
+
+    cache = _get_extraction_cache()
+    targets = []
+    for job in jobs:
+        country_currency = get_country_currency(job.country)
+        location_str, currency_hint = _extraction_target(job.country, job.region, job.city, country_currency)
+        targets.append((country_currency, location_str, currency_hint))
+
+    # Pass 1: first extraction for every page not already cached or resolved locally
+    extracted: dict[tuple[int, int], dict] = {}
+    cache_keys: dict[tuple[int, int], str] = {}
+    resolved_locally = 0
+    requests = []
+    for j, job in enumerate(jobs):
+        country_currency, location_str, currency_hint = targets[j]
+        for p, page in enumerate(job.pages):
+            key = _extraction_cache_key(page.page_text, job.job_title, location_str, currency_hint, page.source_type)
+            cached = cache.get(key)
+            if cached is not None:
+                extracted[(j, p)] = _with_path(json.loads(cached.value), "cache")
+                continue
+            local = pre_extract(page.page_text, job.job_title, country_currency)
+            if local is not None:
+                extracted[(j, p)] = _with_path(local, "local")
+                resolved_locally += 1
+                continue
+            cache_keys[(j, p)] = key
+            instructions, tail = _build_extraction_prompt(
+                job.job_title, location_str, currency_hint, page.page_text, page.source_type,
+            )
+            requests.append({"custom_id": f"x-{j}-{p}", "params": _extraction_params(instructions, tail)})
+
+    first_pass = _run(requests, "bulk_extract")
+    critiques = []
+    for (j, p) in list(cache_keys):
+        result = _safe_parse_extraction(first_pass.get(f"x-{j}-{p}"))
+        if result is None:
+            extracted[(j, p)] = _with_path(_empty_extraction(), "failed")
+            del cache_keys[(j, p)]  # failed requests are not cached, as in extract_salary
+            continue
+        result = _coerce_numeric_fields(result)
+        extracted[(j, p)] = result
+        if result.get("confidence") == "low":
+            job, page = jobs[j], jobs[j].pages[p]
+            instructions, tail = _build_critique_prompt(job.job_title, targets[j][1], page.page_text, result)
+            critiques.append({"custom_id": f"c-{j}-{p}", "params": _extraction_params(instructions, tail)})
+
+    # Pass 2: critique low-confidence extractions (same 2-call cap as extract_salary)
+    if critiques and usage.budget_exhausted:
+        print(f"[batches] LLM token budget spent — skipping {len(critiques)} critiques")
+        critiques = []
+    print(f"[batches] {len(requests)} extractions, {len(critiques)} critiques")
+    critiqued: set[tuple[int, int]] = set()
+    for custom_id, text in _run(critiques, "bulk_critique").items():
+        retry = _safe_parse_extraction(text)
+        if retry is not None:
+            _, j, p = custom_id.split("-")
+            extracted[(int(j), int(p))] = _coerce_numeric_fields(retry)
+            critiqued.add((int(j), int(p)))
+
+    for jp, key in cache_keys.items():
+        cache.set(key, json.dumps(extracted[jp]))
+        _with_path(extracted[jp], "critique" if jp in critiqued else "first")
+
+    # Build and normalise rows exactly like the interactive pipeline
+    rows_per_job: list[list[dict]] = []
+    pending_per_job: list[list[dict]] = []
+    for j, job in enumerate(jobs):
+        rows = [
+            _build_row(
+                page.domain, page.url, extracted[(j, p)],
+                job.job_title, job.country, job.region, job.city, job.display_currency, page.source_type,
+            )
+            for p, page in enumerate(job.pages)
+        ]
+        rows_per_job.append(rows)
+        pending_per_job.append(
+            _normalize_rows(rows, job.display_pref, job.display_currency, targets[j][0], get_rate)
+        )
+
+    # Pass 3: validation requests per job, chunked like validate_rows_batch
+    to_validate: dict[int, list[dict]] = {}
+    requests = []
+    for j, job in enumerate(jobs):
+        with_data = pending_per_job[j]
+        if not with_data:
+            continue
+        to_validate[j] = with_data
+        pay_stats = _pay_rate_stats(with_data)
+        for c, chunk in enumerate(_validation_chunks(with_data)):
+            instructions, tail = _build_validation_prompt(
+                chunk, job.job_title, job.country, job.region, job.city, job.niche_level, job.title_variants,
+                pay_stats,
+            )
+            requests.append({"custom_id": f"v-{j}-{c}", "params": _validation_params(instructions, tail)})
+
+    validated = _run(requests, "bulk_validate")
+    for j, with_data in to_validate.items():
+        results = []
+        for c, chunk in enumerate(_validation_chunks(with_data)):
+            text = validated.get(f"v-{j}-{c}")
+            try:
+                results += _parse_validation(text, len(chunk)) if text is not None else _validation_fallback(chunk)
+            except Exception as e:
+                print(f"[batches] validation parse error for job {j} chunk {c}: {e}")
+                results += _validation_fallback(chunk)
+        for row, vr in zip(with_data, results):
+            _apply_validation(row, vr)
+
+    for job, rows in zip(jobs, rows_per_job):
+        valid = sum(1 for r in rows if r.get("valid") == 1)
+        print(f"[batches] {job.job_title} / {job.country}: {valid} valid of {len(rows)} rows")
+
+    summary = usage.summary()
+    print(f"[batches] LLM total: {summary['calls']} requests, {summary['tokens']} tokens, ${summary['cost_usd']:.4f}")
+    _get_run_log().append({
+        "run_id": str(uuid.uuid4()),
+        "mode": "bulk",
+        "jobs": [f"{job.job_title} / {job.country}" for job in jobs],
+        "rows_extracted": sum(len(rows) for rows in rows_per_job),
+        "rows_valid": sum(1 for rows in rows_per_job for r in rows if r.get("valid") == 1),
+        "llm_usage": summary["by_kind"],
+        "llm_tokens": summary["tokens"],
+        "llm_cost_usd": summary["cost_usd"],
+        "llm_budget_exhausted": summary["budget_exhausted"],
+        "llm_calls_avoided": resolved_locally,
+        "duration_seconds": round(time.time() - started, 2),
+    })
+    return rows_per_job
+
+
+def _safe_parse_extraction(text: str | None) -> dict | None:
+    if text is None:
+        return None
+    try:
+        return _parse_extraction(text)
+    except json.JSONDecodeError as e:
+        print(f"[batches] extraction parse error: {e}")
+        return None
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import json
 import pathlib
@@ -7,23 +8,60 @@ import time
 import uuid
 import pandas as pd
 import numpy as np
-from typing import Generator, Any
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
-import anthropic
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Callable, Generator, Any
 
 from utils.serpapi_client import discover_top_sites, search_site, classify_job_niche, get_source_type, SALARY_SITE_WHITELIST
-from utils.jina_client import fetch_page
-from utils.claude_client import extract_salary, validate_rows_batch, generate_summary
-from utils.currency import convert_currency
+from utils.jina_client import fetch_page, get_page_cache_stats, normalize_url
+from utils.claude_client import (
+    extract_salary, extract_salary_batch, critique_extraction, validate_rows_batch, generate_summary,
+    get_extraction_cache_stats, _validation_chunks,
+)
+from utils.currency import get_fx_stats, get_rate, get_rate_table
 from utils.countries import get_country_currency
 from utils.bls_client import get_bls_wage_data
 from utils.blocklist import get_full_blocklist, add_to_dynamic_blocklist
+from utils.concurrency import ConcurrencyLimiter, MicroBatcher, SingleFlight, iterate_async
+from utils.scheduler import DomainState, FetchScheduler, SearchPrefetcher
+from utils.transport import get_run_transport_totals
+from utils.llm_usage import RunUsage, current_run_usage, reset_run_usage, set_run_usage
+from utils.pre_extract import get_run_pre_extract_stats, likely_low_confidence
+from utils.run_log import RunLog
+from utils.run_store import RunStore
+from utils.tracing import Span, SpanRecorder, current_recorder, reset_recorder, set_recorder, span
 
 HOURS_PER_YEAR = 2080
-FETCH_BATCH_SIZE = 3
 URL_FETCH_TIMEOUT = 35       # seconds per individual URL fetch
 DOMAIN_WALL_CLOCK_TIMEOUT = 90  # seconds for the entire domain block
 
+# Async engine concurrency limits
+MAX_CONCURRENT_SEARCHES = 4     # SerpAPI searches in flight at the same time
+SEARCH_PREFETCH_DEPTH = 6       # domains searched ahead of the fetch stage
+FETCH_WORKERS = 8               # scheduler worker pool shared by all domains
+PER_DOMAIN_FETCH_CONCURRENCY = 3  # max in-flight fetches against one domain
+FETCH_QUEUE_LOW_WATER = 2 * FETCH_WORKERS  # search more domains below this many queued URLs
+MAX_CONCURRENT_REQUESTS = 16    # global cap on in-flight blocking client calls
+LLM_TOKEN_BUDGET_PER_RUN = 2_000_000  # all LLM tokens one run may spend before extraction stops (None = no limit)
+BATCH_MAX_CONCURRENT_LOCATIONS = 4  # locations of a batch run processed at the same time
+BATCH_MAX_CONCURRENT_REQUESTS = 32  # global in-flight cap shared by all locations of a batch run
+BATCH_SHARED_RESULTS_MAX = 512  # finished shared lookups (pages, searches, ...) kept for later locations, LRU
+EXTRACTION_BATCH_SIZE = 4       # fetched pages packed into one extraction call
+EXTRACTION_BATCH_WINDOW = 0.3   # seconds to wait for more pages before sending a partial batch
+EXTRACTION_CRITIQUE_MODE = "sequential"  # "sequential" | "speculative" | "race", see extract_salary
+VALIDATION_STREAM_BATCH_SIZE = 8  # rows validated together while fetching is still running
+VALIDATION_STREAM_WINDOW = 1.5    # seconds to wait for more rows before validating a partial batch
+DEFAULT_PER_HOST_CONCURRENCY = PER_DOMAIN_FETCH_CONCURRENCY  # per salary site
+_SERPAPI_HOST = "serpapi.com"
+_ANTHROPIC_HOST = "api.anthropic.com"
+_BLS_HOST = "api.bls.gov"
+_FX_HOST = "api.frankfurter.app"
+PER_HOST_CONCURRENCY = {
+    _SERPAPI_HOST: 4,
+    _ANTHROPIC_HOST: 8,
+    _BLS_HOST: 1,
+    _FX_HOST: 2,
+}
+
 # Adaptive target data-point counts by job niche level
 TARGET_BY_NICHE = {
     "common": 80,       # Plenty of pages exist — aim high
@@ -47,16 +85,20 @@ SCHEMA = [
     "city",
     "remote_ok",
     "source_type",
+    "extraction_path",
     "valid",
     "error_message",
     "validation_reason",
 ]
 
-# File-based result cache
+# Incremental result store — raw rows are persisted as they are produced
 CACHE_DIR = pathlib.Path("pipeline_cache")
+RUN_STORE_FILE = CACHE_DIR / "runs.sqlite"
 CACHE_TTL_HOURS = 24
-MAX_LOG_ENTRIES = 50
-LOG_FILE = "pipeline_run_log.json"
+MIN_VALID_FOR_REUSE = 5  # a finished run with this many valid rows is reused outright
+RUN_LOG_FILE = CACHE_DIR / "run_log.sqlite"
+RUN_LOG_DETAIL_DAYS = 90  # full entries kept this long; older ones keep only their indexed summary
+LEGACY_LOG_FILE = "pipeline_run_log.json"  # imported into RUN_LOG_FILE on first use
 
 # Bail-out limits differentiated by failure type
 BAIL_LIMITS = {
@@ -79,6 +121,9 @@ QUALITY_SWITCH_THRESHOLD = 0.30
 # Module-level helpers
 # ---------------------------------------------------------------------------
 
+_NO_SALARY_DATA = "No salary data found on page"  # extract-stage reason for a page read fine but empty
+
+
 def _make_error(stage: str, reason: str, recoverable: bool = False) -> str:
     """Return a JSON-encoded structured error string."""
     return json.dumps({"stage": stage, "reason": reason, "recoverable": recoverable})
@@ -123,53 +168,22 @@ def _get_cache_key(job_title: str, country: str, region: str) -> str:
     return hashlib.md5(normalized.encode()).hexdigest()
 
 
-def _load_cache(cache_key: str) -> list[dict] | None:
-    CACHE_DIR.mkdir(exist_ok=True)
-    path = CACHE_DIR / f"{cache_key}.json"
-    if not path.exists():
-        return None
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-        age_hours = (time.time() - data.get("timestamp", 0)) / 3600
-        if age_hours > CACHE_TTL_HOURS:
-            print(f"[pipeline] Cache expired ({age_hours:.1f}h > {CACHE_TTL_HOURS}h): {cache_key}")
-            return None
-        print(f"[pipeline] Cache hit ({age_hours:.1f}h old): {cache_key}")
-        return data.get("rows", [])
-    except Exception as e:
-        print(f"[pipeline] Cache load error: {e}")
-        return None
+_run_store: RunStore | None = None
+_run_log: RunLog | None = None
 
 
-def _save_cache(cache_key: str, rows: list[dict]) -> None:
-    try:
-        CACHE_DIR.mkdir(exist_ok=True)
-        path = CACHE_DIR / f"{cache_key}.json"
-        path.write_text(
-            json.dumps({"timestamp": time.time(), "rows": rows}, default=str),
-            encoding="utf-8",
-        )
-        print(f"[pipeline] Cache saved: {cache_key} ({len(rows)} rows)")
-    except Exception as e:
-        print(f"[pipeline] Cache save error: {e}")
+def _get_run_store() -> RunStore:
+    global _run_store
+    if _run_store is None:
+        _run_store = RunStore(RUN_STORE_FILE, ttl_seconds=CACHE_TTL_HOURS * 3600)
+    return _run_store
 
 
-def _append_log(log_entry: dict) -> None:
-    try:
-        path = pathlib.Path(LOG_FILE)
-        entries: list = []
-        if path.exists():
-            try:
-                entries = json.loads(path.read_text(encoding="utf-8"))
-                if not isinstance(entries, list):
-                    entries = []
-            except Exception:
-                entries = []
-        entries.append(log_entry)
-        entries = entries[-MAX_LOG_ENTRIES:]
-        path.write_text(json.dumps(entries, indent=2, default=str), encoding="utf-8")
-    except Exception as e:
-        print(f"[pipeline] Log append error: {e}")
+def _get_run_log() -> RunLog:
+    global _run_log
+    if _run_log is None:
+        _run_log = RunLog(RUN_LOG_FILE, detail_days=RUN_LOG_DETAIL_DAYS, legacy_json=LEGACY_LOG_FILE)
+    return _run_log
 
 
 def _classify_fetch_error(error_msg: str | None) -> str:
@@ -218,6 +232,58 @@ def _pre_sort_domains(domains: list[str], country: str) -> list[str]:
 # Main pipeline
 # ---------------------------------------------------------------------------
 
+@dataclass
+class _RunState:
+    """Mutable state shared by the concurrent domain workers of one run.
+
+    Every mutation happens on the event loop thread, so no locking is needed.
+    """
+    target: int
+    niche_level: str
+    rows: list[dict] = field(default_factory=list)
+    seen_urls: set[str] = field(default_factory=set)  # dedup — never fetch the same URL twice
+    covered_domains: set[str] = field(default_factory=set)  # finished by an earlier run of this query
+    domain_yield: dict[str, dict] = field(default_factory=dict)  # domain -> {"valid_rows", "urls_fetched"}
+    sites_queue: list[str] = field(default_factory=list)
+    active_blocklist: set[str] = field(default_factory=set)
+    next_domain_idx: int = 0
+    source_pay_count: int = 0  # rows with a pay figure, before validation
+    valid_count: int = 0       # rows the validator accepted — drives the TARGET stop
+    domain_valid: dict[str, int] = field(default_factory=dict)  # domain -> validated valid rows
+    seen_pay_keys: dict[tuple, str] = field(default_factory=dict)  # (domain, annual pay) -> first URL
+    urls_fetched: int = 0
+    domains_processed: int = 0
+    force_continue: bool = False  # overrides TARGET check when floor condition fires
+    pages_per_second: float = 0.0  # fetch throughput measured by the scheduler
+    usage: RunUsage = field(default_factory=RunUsage)  # this run's LLM tokens, cost and budget
+
+    def target_reached(self) -> bool:
+        return self.valid_count >= self.target and not self.force_continue
+
+    def stop_fetching(self) -> bool:
+        """No further URLs or domains: the target is reached or the LLM token budget is spent."""
+        return self.target_reached() or self.usage.budget_exhausted
+
+    def record_validated(self, row: dict) -> None:
+        """Count a freshly validated row towards the target and its domain's yield."""
+        if row.get("valid") != 1:
+            return
+        self.valid_count += 1
+        domain = row.get("country_specific_site_url")
+        self.domain_valid[domain] = self.domain_valid.get(domain, 0) + 1
+        if domain in self.domain_yield:
+            self.domain_yield[domain]["valid_rows"] = self.domain_valid[domain]
+
+
+@dataclass
+class _BatchShared:
+    """Client, limits and deduplicated lookups shared by every location of one batch run."""
+    client: Any
+    limits: ConcurrencyLimiter
+    calls: SingleFlight = field(default_factory=lambda: SingleFlight(BATCH_SHARED_RESULTS_MAX))
+    usage: RunUsage = field(default_factory=RunUsage)  # LLM usage of the shared lookups — no location's
+
+
 def run_pipeline(
     job_title: str,
     country: str,
@@ -231,590 +297,979 @@ def run_pipeline(
     exchangerate_key: str,
 ) -> Generator[dict[str, Any], None, None]:
     """
-    Orchestrates the full pipeline. Yields progress events as dicts:
+    Synchronous adapter over run_pipeline_async. Yields progress events as dicts:
     {"type": "progress", "value": float (0-1), "text": str}
     {"type": "row", "row": dict}
+    {"type": "row_validated", "row": dict}   (same row, with display_pay_rate / valid filled in)
+    {"type": "health", "domain": str, ...}
     {"type": "stats", "df": pd.DataFrame}
     {"type": "summary", "data": dict}
+    {"type": "llm_usage", "usage": dict}   (tokens and cost by call site, see RunUsage.summary)
     {"type": "error", "message": str}
+    {"type": "timing", "name": str, "start": float, "seconds": float, ...}   (one per span, see utils.tracing)
     {"type": "complete"}
     """
+    yield from iterate_async(run_pipeline_async(
+        job_title, country, region, city, description,
+        display_pref, display_currency,
+        serpapi_key, anthropic_key, exchangerate_key,
+    ))
 
-    client = anthropic.Anthropic(api_key=anthropic_key)
-    rows: list[dict] = []
-    pipeline_start_time = time.time()
-    urls_fetched = 0
-    domains_processed = 0
-
-    # Classify job title niche before anything else — drives TARGET and search strategy
-    niche_level, title_variants = classify_job_niche(job_title, anthropic_client=client)
-    TARGET_SOURCE_PAY_COUNT = TARGET_BY_NICHE[niche_level]
-    print(f"[pipeline] Job niche: {niche_level} | TARGET={TARGET_SOURCE_PAY_COUNT} | variants={title_variants}")
-
-    # Cache check — if we have fresh results, skip discovery + fetch entirely
-    cache_key = _get_cache_key(job_title, country, region)
-    cached_rows = _load_cache(cache_key)
-    _from_cache = False
-    if cached_rows:
-        rows = [dict(r) for r in cached_rows]
-        _from_cache = True
-        yield {
-            "type": "progress",
-            "value": 0.80,
-            "text": f"Loaded {len(rows)} cached results (< {CACHE_TTL_HOURS}h old) — recalculating...",
-        }
 
-    if not _from_cache:
-        # Step 0: Kick off BLS data fetch in background (US only)
-        bls_future = None
-        if _country_to_key(country) == "US":
-            bls_executor = ThreadPoolExecutor(max_workers=1)
-            bls_api_key = None
+async def run_pipeline_async(
+    job_title: str,
+    country: str,
+    region: str,
+    city: str,
+    description: str,
+    display_pref: str,
+    display_currency: str,
+    serpapi_key: str,
+    anthropic_key: str,
+    exchangerate_key: str,
+    shared: _BatchShared | None = None,
+) -> AsyncGenerator[dict[str, Any], None]:
+    """
+    Async pipeline engine — yields the same events as run_pipeline.
+
+    Searches for the next SEARCH_PREFETCH_DEPTH domains run ahead in a
+    SearchPrefetcher; each domain's URLs then feed one FetchScheduler, whose FETCH_WORKERS pull the next-best URL across all
+    domains. Every blocking client call runs through a ConcurrencyLimiter,
+    which caps in-flight calls globally and per host.
+
+    Rows are normalised and validated in micro-batches while fetching is still
+    running, so the TARGET stop and domain reordering use validated yield.
+
+    *shared* is set by run_pipeline_batch_async: the client and limits come
+    from the batch, and location-independent lookups are made once per batch.
+
+    Stage and client-call spans (niche, discover, search, fetch, LLM calls,
+    validate, summary) are collected on a SpanRecorder and yielded as
+    ``timing`` events just before the event that follows them.  The log's
+    HTTP pool and local pre-extraction counts are per-run counters on the same
+    recorder (a batch lookup shared between locations counts once, for the
+    location whose call made the request).  LLM usage is counted on a RunUsage
+    the same way; once LLM_TOKEN_BUDGET_PER_RUN tokens are spent no further
+    pages are fetched for extraction.
+    """
+    recorder = SpanRecorder()
+    usage = RunUsage(LLM_TOKEN_BUDGET_PER_RUN)
+    agen = _run_pipeline_events(
+        job_title, country, region, city, description,
+        display_pref, display_currency,
+        serpapi_key, anthropic_key, exchangerate_key,
+        shared=shared,
+    )
+    try:
+        while True:
+            # The recorder is active only while the engine runs, so interleaved
+            # runs in one task (and the tasks each one starts) keep their own
+            token = set_recorder(recorder)
+            usage_token = set_run_usage(usage)
             try:
-                import streamlit as _st
-                bls_api_key = _st.secrets.get("BLS_API_KEY")
-            except Exception:
-                pass
-            bls_future = bls_executor.submit(get_bls_wage_data, job_title, client, bls_api_key)
-
-        # Step 1: Discover top sites (5%)
-        yield {
-            "type": "progress",
-            "value": 0.05,
-            "text": (
-                f"Discovering top salary sites for {country} "
-                f"[{niche_level} title, target {TARGET_SOURCE_PAY_COUNT} data points]..."
-            ),
-        }
+                event = await agen.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                reset_run_usage(usage_token)
+                reset_recorder(token)
+            for s in recorder.drain():
+                yield _timing_event(s)
+            yield event
+        for s in recorder.drain():
+            yield _timing_event(s)
+    finally:
+        await agen.aclose()
 
-        try:
-            sites = discover_top_sites(
-                country, serpapi_key,
-                job_title=job_title,
-                anthropic_client=client,
+
+def _timing_event(s: Span) -> dict[str, Any]:
+    return {"type": "timing", "name": s.name, "start": s.start, "seconds": s.seconds, **s.attrs}
+
+
+async def _run_pipeline_events(
+    job_title: str,
+    country: str,
+    region: str,
+    city: str,
+    description: str,
+    display_pref: str,
+    display_currency: str,
+    serpapi_key: str,
+    anthropic_key: str,
+    exchangerate_key: str,
+    shared: _BatchShared | None = None,
+) -> AsyncGenerator[dict[str, Any], None]:
+    """The pipeline itself; run_pipeline_async adds the timing events."""
+
+    if shared is not None:
+        client, limits = shared.client, shared.limits
+    else:
+        import anthropic  # deferred: the SDK is by far the slowest import in the app
+
+        client = anthropic.Anthropic(api_key=anthropic_key)
+        limits = ConcurrencyLimiter(
+            MAX_CONCURRENT_REQUESTS, PER_HOST_CONCURRENCY, DEFAULT_PER_HOST_CONCURRENCY,
+        )
+
+    async def _run_once(
+        key: tuple, host: str, fn: Callable, *args: Any, keep: Callable[[Any], bool] | None = None, **kwargs: Any,
+    ) -> Any:
+        """limits.run, made once per *key* across the locations of a batch run.
+
+        A result *keep* rejects is shared with concurrent callers only, so a
+        later location makes the call again.
+        """
+        if shared is None:
+            return await limits.run(host, fn, *args, **kwargs)
+
+        async def _shared_call() -> Any:
+            # Runs in SingleFlight's own task, so this charges the batch rather than
+            # whichever location happened to ask first, and leaks into no other context
+            set_run_usage(shared.usage)
+            return await limits.run(host, fn, *args, **kwargs)
+
+        return await shared.calls.do(key, _shared_call, keep)
+
+    validator: MicroBatcher | None = None
+    validation_tasks: set[asyncio.Task] = set()
+    try:
+        pipeline_start_time = time.time()
+
+        # Classify job title niche before anything else — drives TARGET and search strategy
+        with span("niche"):
+            niche_level, title_variants = await _run_once(
+                ("niche", job_title), _ANTHROPIC_HOST, classify_job_niche, job_title, anthropic_client=client,
             )
-        except Exception as e:
-            yield {"type": "error", "message": f"Site discovery failed: {e}"}
-            return
+        TARGET_SOURCE_PAY_COUNT = TARGET_BY_NICHE[niche_level]
+        print(f"[pipeline] Job niche: {niche_level} | TARGET={TARGET_SOURCE_PAY_COUNT} | variants={title_variants}")
 
-        if not sites:
-            yield {"type": "error", "message": "No salary sites discovered. Check your SerpAPI key."}
-            return
+        state = _RunState(
+            target=TARGET_SOURCE_PAY_COUNT, niche_level=niche_level, usage=current_run_usage() or RunUsage(),
+        )
+        rows = state.rows
+
+        run_id = str(uuid.uuid4())
+        store = _get_run_store()
+        cache_key = _get_cache_key(job_title, country, region)
+        store.start_run(run_id, cache_key)
+
+        # Cache check — a finished run with enough valid rows skips discovery + fetch entirely
+        _from_cache = False
+        resumed_rows = 0
+        last_run = store.last_complete_run(cache_key)
+        if last_run is not None and last_run.valid_count >= MIN_VALID_FOR_REUSE:
+            cached_rows = store.load_rows(cache_key, valid_only=True)
+            if cached_rows:
+                age_hours = (time.time() - last_run.finished_at) / 3600
+                print(f"[pipeline] Cache hit ({age_hours:.1f}h old): {cache_key}")
+                rows.extend(cached_rows)
+                _from_cache = True
+                yield {
+                    "type": "progress",
+                    "value": 0.80,
+                    "text": f"Loaded {len(rows)} cached results (< {CACHE_TTL_HOURS}h old) — recalculating...",
+                }
 
         # Resolve the country's native currency once — used as a fallback when Claude
         # extracts a pay number but fails to identify the currency code.
         country_currency = get_country_currency(country)
 
-        # Collect BLS results if the background fetch completed
-        if bls_future is not None:
+        async def _prefetch_rates() -> None:
+            """Load the shared rate table off the event loop (one request, then in-memory for the day)."""
+            await limits.run(_FX_HOST, get_rate_table)
+
+        async def _validate_rows(batch: list[dict]) -> list[dict]:
+            """Normalise, dedupe and validate *batch* in place; returns it."""
+            await _prefetch_rates()
+            pending = _normalize_rows(
+                batch, display_pref, display_currency, country_currency, get_rate, state.seen_pay_keys,
+            )
+            if pending:
+                # One limiter slot per validation call: large (cached / resumed) sets are
+                # chunked here rather than fanned out inside validate_rows_batch
+                context_rows = [r for r in rows if r.get("display_pay_rate") is not None]
+                chunks = _validation_chunks(pending)
+                with span("validate", rows=len(pending)):
+                    chunk_results = await asyncio.gather(*(
+                        limits.run(
+                            _ANTHROPIC_HOST, validate_rows_batch,
+                            chunk, job_title, country, region, city, client,
+                            niche_level=state.niche_level, title_variants=title_variants,
+                            context_rows=context_rows,
+                        )
+                        for chunk in chunks
+                    ))
+                for chunk, results in zip(chunks, chunk_results):
+                    for row, vr in zip(chunk, results):
+                        _apply_validation(row, vr)
+            return batch
+
+        # Rows are validated in small batches as they are produced
+        events: asyncio.Queue = asyncio.Queue()
+        validator = MicroBatcher(_validate_rows, VALIDATION_STREAM_BATCH_SIZE, VALIDATION_STREAM_WINDOW)
+        health_reported: set[str] = set()  # domains whose health event is out
+
+        def _health_update(row: dict) -> dict | None:
+            """A health_update event when a validation changed a reported domain's valid_rows."""
+            domain = row.get("country_specific_site_url")
+            if row.get("valid") != 1 or domain not in health_reported:
+                return None
+            return {"type": "health_update", "domain": domain, "valid_rows": state.domain_valid.get(domain, 0)}
+
+        async def _await_validation(row: dict) -> None:
             try:
-                bls_rows = bls_future.result(timeout=20)
-                for bls_row in bls_rows:
-                    bls_row["display_currency"] = display_currency
-                    rows.append(bls_row)
-                    yield {"type": "row", "row": bls_row}
-                if bls_rows:
-                    print(f"[pipeline] Injected {len(bls_rows)} BLS row(s) into data pool")
+                await validator.submit(row)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"[pipeline] BLS fetch failed (non-blocking): {e}")
-
-        # Steps 2 & 3: Search + fetch per site (10%–80%)
-        source_pay_count = 0
-        # TARGET_SOURCE_PAY_COUNT is already set adaptively above based on niche_level
-
-        domain_yield: dict[str, dict] = {}  # domain -> {"valid_rows": int, "urls_fetched": int}
-        _force_continue = False  # overrides TARGET check when floor condition fires
-        seen_urls: set[str] = set()  # dedup — never fetch the same URL twice
-
-        def _fetch_and_extract(url: str, src_type: str | None = None) -> tuple:
-            """Fetch a single URL and run extraction. Returns (url, page_text, fetch_error, extracted)."""
-            page_text, fetch_error = fetch_page(url)
-            if not page_text:
-                return url, None, fetch_error, None
-            extracted = extract_salary(page_text, job_title, country, region, city, client, country_currency, source_type=src_type)
-            return url, page_text, None, extracted
-
-        # Pre-sort domains before the main loop: high-priority sources first.
-        sites_queue = _pre_sort_domains(list(sites), country)
-        active_blocklist = get_full_blocklist()
-        i = 0
-
-        while i < len(sites_queue):
-            domain = sites_queue[i]
-
-            # Skip permanently blocked domains
-            if domain in active_blocklist:
-                i += 1
-                continue
-
-            if (source_pay_count >= TARGET_SOURCE_PAY_COUNT) and not _force_continue:
-                break
+                print(f"[pipeline] Streaming validation error: {e}")
+                return  # left unvalidated — picked up by _validate_leftovers
+            state.record_validated(row)
+            events.put_nowait({"type": "row_validated", "row": row})
+            update = _health_update(row)
+            if update is not None:
+                events.put_nowait(update)
+
+        def _stream_validate(row: dict) -> None:
+            task = asyncio.ensure_future(_await_validation(row))
+            validation_tasks.add(task)
+            task.add_done_callback(validation_tasks.discard)
+
+        async def _validate_leftovers() -> AsyncGenerator[dict[str, Any], None]:
+            """Validate every row the streaming validator has not settled (cached, failed, second pass)."""
+            leftover = [r for r in rows if r.get("valid") is None]
+            if not leftover:
+                return
+            await _validate_rows(leftover)
+            for row in leftover:
+                state.record_validated(row)
+                yield {"type": "row_validated", "row": row}
+                update = _health_update(row)
+                if update is not None:
+                    yield update
+
+        if not _from_cache:
+            # Resume — reuse every row already extracted for this query and skip the
+            # domains an earlier (possibly crashed or short) run already worked through.
+            # A URL whose fetch / extraction failed transiently on a domain that is not
+            # covered yet is left out, so this run fetches it again.
+            covered = store.covered_domains(cache_key)
+            stored_rows = [
+                r for r in store.load_rows(cache_key)
+                if _is_settled(r) or r.get("country_specific_site_url") in covered
+            ]
+            if stored_rows or covered:
+                for row in stored_rows:
+                    row["display_currency"] = display_currency
+                    rows.append(row)
+                    yield {"type": "row", "row": row}
+                    _stream_validate(row)
+                resumed_rows = len(stored_rows)
+                state.seen_urls.update(r["web_search_result_url"] for r in stored_rows)
+                state.source_pay_count = sum(1 for r in stored_rows if _has_data(r))
+                state.covered_domains.update(covered)
+                state.domain_yield.update(covered)
+                print(f"[pipeline] Resuming {cache_key}: {resumed_rows} stored rows, {len(covered)} domains covered")
+                yield {
+                    "type": "progress",
+                    "value": 0.05,
+                    "text": f"Reusing {resumed_rows} results from earlier runs ({len(covered)} sites already covered)...",
+                }
+
+            # Step 0: Kick off BLS data fetch in background (US only)
+            bls_task = None
+            if _country_to_key(country) == "US" and "bls.gov" not in state.covered_domains:
+                bls_api_key = None
+                try:
+                    import streamlit as _st
+                    bls_api_key = _st.secrets.get("BLS_API_KEY")
+                except Exception:
+                    pass
+                bls_task = asyncio.ensure_future(
+                    _run_once(("bls", job_title), _BLS_HOST, get_bls_wage_data, job_title, client, bls_api_key)
+                )
 
-            progress = 0.10 + (min(i, len(sites)) / max(len(sites), 1)) * 0.70
+            # Step 1: Discover top sites (5%)
             yield {
                 "type": "progress",
-                "value": progress,
-                "text": f"Searching {domain} ({i+1}/{len(sites_queue)}, {source_pay_count}/{TARGET_SOURCE_PAY_COUNT} data points)...",
+                "value": 0.05,
+                "text": (
+                    f"Discovering top salary sites for {country} "
+                    f"[{niche_level} title, target {TARGET_SOURCE_PAY_COUNT} data points]..."
+                ),
             }
 
             try:
-                urls = search_site(domain, job_title, country, region, city, description, serpapi_key, title_variants or None)
+                with span("discover"):
+                    sites = await _run_once(
+                        ("sites", country, job_title), _SERPAPI_HOST, discover_top_sites,
+                        country, serpapi_key,
+                        job_title=job_title,
+                        anthropic_client=client,
+                    )
             except Exception as e:
-                print(f"[pipeline] search_site({domain}) error: {e}")
-                i += 1
-                domains_processed += 1
-                continue
-
-            if not urls:
-                i += 1
-                domains_processed += 1
-                continue
-
-            # Deduplicate URLs — skip any already fetched this session
-            urls = [u for u in urls if u not in seen_urls]
-
-            # Per-domain state
-            domain_had_valid = domain_yield.get(domain, {}).get("valid_rows", 0) > 0
-            bail_limit = 5 if domain_had_valid else 4  # stricter bail-out for untested domains
-            consecutive_wall = 0
-            consecutive_network = 0
-            consecutive_no_data = 0
-            domain_valid_rows = 0
-            domain_urls_fetched = 0
-            domain_wall_hits = 0
-            domain_network_errors = 0
-            domain_start_time = time.time()
-
-            # Get source type for this domain
-            current_source_type = get_source_type(domain)
-
-            # Process URLs in concurrent batches
-            url_idx = 0
-            while url_idx < len(urls):
-                if (source_pay_count >= TARGET_SOURCE_PAY_COUNT) and not _force_continue:
-                    break
-
-                should_bail = (
-                    consecutive_wall >= BAIL_LIMITS["wall"] or
-                    consecutive_network >= BAIL_LIMITS["network"] or
-                    consecutive_no_data >= bail_limit
+                yield {"type": "error", "message": f"Site discovery failed: {e}"}
+                return
+
+            if not sites:
+                yield {"type": "error", "message": "No salary sites discovered. Check your SerpAPI key."}
+                return
+
+            # Collect BLS results if the background fetch completed
+            if bls_task is not None:
+                try:
+                    bls_rows = [dict(r) for r in await asyncio.wait_for(bls_task, timeout=20)]
+                    for bls_row in bls_rows:
+                        bls_row["display_currency"] = display_currency
+                        rows.append(bls_row)
+                        store.add_row(run_id, cache_key, bls_row)
+                        yield {"type": "row", "row": bls_row}
+                        _stream_validate(bls_row)
+                    store.mark_domain_done(run_id, cache_key, "bls.gov", len(bls_rows), len(bls_rows))
+                    if bls_rows:
+                        print(f"[pipeline] Injected {len(bls_rows)} BLS row(s) into data pool")
+                except Exception as e:
+                    print(f"[pipeline] BLS fetch failed (non-blocking): {e}")
+
+            # Steps 2 & 3: Search domains and feed their URLs to the cross-domain
+            # fetch scheduler (10%–80%)
+            # TARGET_SOURCE_PAY_COUNT is already set adaptively above based on niche_level
+            async def _extract_one(page: tuple[str, str | None]) -> dict:
+                page_text, src_type = page
+                return await limits.run(
+                    _ANTHROPIC_HOST, extract_salary,
+                    page_text, job_title, country, region, city, client, country_currency,
+                    source_type=src_type, critique_mode=EXTRACTION_CRITIQUE_MODE,
+                    slots=_extraction_slots(page_text, job_title),
+                )
+
+            async def _extract_batch(pages: list[tuple[str, str | None]]) -> list[dict]:
+                # Pages whose critique starts early go alone, so their two calls can overlap
+                solo = [i for i, (page_text, _) in enumerate(pages) if _extraction_slots(page_text, job_title) > 1]
+                batched = [i for i in range(len(pages)) if i not in solo]
+                if len(batched) == 1:
+                    solo, batched = solo + batched, []
+
+                async def _run_batched() -> list[dict]:
+                    if not batched:
+                        return []
+                    results = await limits.run(
+                        _ANTHROPIC_HOST, extract_salary_batch,
+                        [pages[i] for i in batched], job_title, country, region, city, client, country_currency,
+                        critique_mode=EXTRACTION_CRITIQUE_MODE, defer_critique=True,
+                    )
+                    # Low-confidence pages get their critiques concurrently, each under the limiter
+                    flagged = [k for k, r in enumerate(results) if r.get("_needs_critique")]
+                    critiqued = await asyncio.gather(*(
+                        limits.run(
+                            _ANTHROPIC_HOST, critique_extraction,
+                            results[k], pages[batched[k]][0], job_title, country, region, city, client,
+                            country_currency, source_type=pages[batched[k]][1],
+                        )
+                        for k in flagged
+                    ))
+                    for k, result in zip(flagged, critiqued):
+                        results[k] = result
+                    return results
+
+                batch_results, *solo_results = await asyncio.gather(
+                    _run_batched(), *(_extract_one(pages[i]) for i in solo),
+                )
+                results: list[dict] = [{}] * len(pages)
+                for i, r in zip(batched, batch_results):
+                    results[i] = r
+                for i, r in zip(solo, solo_results):
+                    results[i] = r
+                return results
+
+            # Pages fetched close together share one extraction call
+            extractor = MicroBatcher(_extract_batch, EXTRACTION_BATCH_SIZE, EXTRACTION_BATCH_WINDOW)
+
+            async def _fetch_and_extract(url: str, domain: str, src_type: str | None = None) -> tuple:
+                """Fetch a single URL and run extraction. Returns (url, page_text, fetch_error, extracted)."""
+                page_text, fetch_error = await _run_once(
+                    ("page", normalize_url(url)), domain, fetch_page, url, keep=_page_fetched,
                 )
-                if should_bail:
-                    print(f"[pipeline] Bailing on {domain}: wall={consecutive_wall}, network={consecutive_network}, no_data={consecutive_no_data}")
-                    break
+                if not page_text:
+                    return url, None, fetch_error, None
+                extracted = await extractor.submit((page_text, src_type))
+                return url, page_text, None, extracted
 
-                # 90-second wall-clock timeout per domain
-                if time.time() - domain_start_time > DOMAIN_WALL_CLOCK_TIMEOUT:
-                    yield {
+            async def _fetch_with_timeout(url: str, dstate: DomainState) -> tuple:
+                try:
+                    return await asyncio.wait_for(
+                        _fetch_and_extract(url, dstate.domain, dstate.source_type), timeout=URL_FETCH_TIMEOUT,
+                    )
+                except asyncio.TimeoutError:
+                    return url, None, _make_error("fetch", "URL fetch timed out (35s)"), None
+                except Exception as e:
+                    return url, None, _make_error("fetch", str(e)), None
+
+            def _domain_progress(rank: int) -> float:
+                return 0.10 + (min(rank, len(sites)) / max(len(sites), 1)) * 0.70
+
+            def _on_result(dstate: DomainState, result: tuple) -> str:
+                """Turn one fetch result into a row event; return its bail-out outcome."""
+                url, page_text, fetch_error, extracted = result
+                state.urls_fetched += 1
+
+                if page_text is None:
+                    row = _empty_row(dstate.domain, url, display_currency, fetch_error)
+                    rows.append(row)
+                    store.add_row(run_id, cache_key, row)
+                    events.put_nowait({"type": "row", "row": row})
+                    _stream_validate(row)
+                    error_class = _classify_fetch_error(fetch_error)
+                    return "no_data" if error_class == "default" else error_class
+
+                row = _build_row(dstate.domain, url, extracted, job_title, country, region, city, display_currency, dstate.source_type)
+                rows.append(row)
+                store.add_row(run_id, cache_key, row)
+                events.put_nowait({"type": "row", "row": row})
+                _stream_validate(row)
+                if _has_data(row):
+                    state.source_pay_count += 1
+                    return "data"
+                return "no_data"
+
+            finished_domains: dict[str, int] = {}  # domain -> URLs fetched, for the final yield update
+
+            def _on_domain_done(dstate: DomainState) -> None:
+                domain = dstate.domain
+                progress = _domain_progress(dstate.rank)
+
+                if dstate.closed_reason == "timeout":
+                    events.put_nowait({
                         "type": "progress",
                         "value": progress,
-                        "text": f"{domain} timed out (90s wall-clock), moving on",
-                    }
-                    break
-
-                batch = urls[url_idx:url_idx + FETCH_BATCH_SIZE]
-                url_idx += FETCH_BATCH_SIZE
-                batch_results: list = [None] * len(batch)
-
-                with ThreadPoolExecutor(max_workers=FETCH_BATCH_SIZE) as executor:
-                    future_to_idx = {
-                        executor.submit(_fetch_and_extract, url, current_source_type): idx
-                        for idx, url in enumerate(batch)
-                    }
-                    for future, idx in future_to_idx.items():
-                        try:
-                            batch_results[idx] = future.result(timeout=URL_FETCH_TIMEOUT)
-                        except FuturesTimeoutError:
-                            batch_results[idx] = (
-                                batch[idx], None,
-                                _make_error("fetch", "URL fetch timed out (35s)"),
-                                None,
-                            )
-                        except Exception as e:
-                            batch_results[idx] = (
-                                batch[idx], None,
-                                _make_error("fetch", str(e)),
-                                None,
-                            )
-
-                # Yield results in original URL order
-                for result in batch_results:
-                    if result is None:
-                        continue
-                    url, page_text, fetch_error, extracted = result
-                    seen_urls.add(url)
-                    urls_fetched += 1
-                    domain_urls_fetched += 1
-
-                    if page_text is None:
-                        row = _empty_row(domain, url, display_currency, fetch_error)
-                        rows.append(row)
-                        yield {"type": "row", "row": row}
-                        error_class = _classify_fetch_error(fetch_error)
-                        if error_class == "wall":
-                            consecutive_wall += 1
-                            consecutive_network = 0
-                            consecutive_no_data = 0
-                            domain_wall_hits += 1
-                        elif error_class == "network":
-                            consecutive_network += 1
-                            consecutive_wall = 0
-                            consecutive_no_data = 0
-                            domain_network_errors += 1
-                        else:
-                            consecutive_no_data += 1
-                            consecutive_wall = 0
-                            consecutive_network = 0
-                    else:
-                        row = _build_row(domain, url, extracted, job_title, country, region, city, display_currency, current_source_type)
-                        rows.append(row)
-                        yield {"type": "row", "row": row}
-                        if _has_data(row):
-                            source_pay_count += 1
-                            consecutive_wall = 0
-                            consecutive_network = 0
-                            consecutive_no_data = 0
-                            domain_valid_rows += 1
-                        else:
-                            consecutive_no_data += 1
-                            consecutive_wall = 0
-                            consecutive_network = 0
-
-                    # Check bail-out after each individual result (not just per batch)
-                    should_bail = (
-                        consecutive_wall >= BAIL_LIMITS["wall"] or
-                        consecutive_network >= BAIL_LIMITS["network"] or
-                        consecutive_no_data >= bail_limit
+                        "text": f"{domain} timed out ({DOMAIN_WALL_CLOCK_TIMEOUT}s wall-clock), moving on",
+                    })
+
+                # Record domain yield stats — validated rows; later validations keep this current
+                state.domain_yield[domain] = {
+                    "valid_rows": state.domain_valid.get(domain, 0),
+                    "urls_fetched": dstate.urls_fetched,
+                }
+                # A domain cut short because the target was hit still has URLs left for later runs
+                if dstate.closed_reason != "stopped":
+                    finished_domains[domain] = dstate.urls_fetched
+                    store.mark_domain_done(run_id, cache_key, domain, dstate.urls_fetched, state.domain_valid.get(domain, 0))
+
+                # Emit health event for this domain — valid_rows counts validated rows so far,
+                # and health_update events follow as the rest of its rows are validated
+                health_reported.add(domain)
+                events.put_nowait({
+                    "type": "health",
+                    "domain": domain,
+                    "urls_fetched": dstate.urls_fetched,
+                    "rows_with_data": dstate.valid_rows,
+                    "valid_rows": state.domain_valid.get(domain, 0),
+                    "wall_hits": dstate.wall_hits,
+                    "network_errors": dstate.network_errors,
+                    "source_type": get_source_type(domain),
+                    "seconds": round(time.time() - dstate.started_at, 2) if dstate.started_at else None,
+                })
+
+                # Add to dynamic blocklist if domain hit the wall bail limit
+                if dstate.wall_hits >= BAIL_LIMITS["wall"]:
+                    add_to_dynamic_blocklist(domain)
+                    state.active_blocklist = get_full_blocklist()  # refresh
+
+                state.domains_processed += 1
+                _after_domain(progress)
+
+            def _after_domain(progress: float) -> None:
+                """Run-level checks after each finished domain (quality switch, floor, reorder)."""
+                # Quality strategy switch at domain 10 — share of validated rows with data that passed
+                if state.domains_processed == QUALITY_SWITCH_DOMAINS:
+                    total_with_data_so_far = sum(
+                        1 for r in rows if r.get("valid") is not None and r.get("display_pay_rate") is not None
                     )
-                    if should_bail:
-                        break
-
-            # Record domain yield stats
-            domain_yield[domain] = {
-                "valid_rows": domain_valid_rows,
-                "urls_fetched": domain_urls_fetched,
-            }
+                    if total_with_data_so_far > 0 and state.valid_count / total_with_data_so_far < QUALITY_SWITCH_THRESHOLD:
+                        old_niche = state.niche_level
+                        if state.niche_level == "niche":
+                            state.niche_level = "specialized"
+                        elif state.niche_level == "specialized":
+                            state.niche_level = "common"
+                        if state.niche_level != old_niche:
+                            print(f"[pipeline] Quality switch: {old_niche} → {state.niche_level} (only {state.valid_count}/{total_with_data_so_far} rows valid)")
+                            events.put_nowait({"type": "progress", "value": progress, "text": f"Low data quality detected — expanding search scope..."})
+
+                # Minimum floor: if fewer than 20 valid data points after 15 domains, force continuation
+                if state.domains_processed == MINIMUM_VALID_FLOOR_DOMAINS and state.valid_count < MINIMUM_VALID_FLOOR:
+                    state.force_continue = True
+                    print(f"[pipeline] Floor triggered: only {state.valid_count} valid data points after {MINIMUM_VALID_FLOOR_DOMAINS} domains, forcing continuation")
+
+                # Reorder domains not yet claimed by yield rate, and re-queue their
+                # outstanding searches in the new order
+                if state.next_domain_idx < len(state.sites_queue):
+                    remaining = state.sites_queue[state.next_domain_idx:]
+                    state.sites_queue[state.next_domain_idx:] = _reorder_domains_by_yield(remaining, state.domain_yield)
+                    prefetcher.prefetch(_upcoming_domains())
+
+            scheduler = FetchScheduler(
+                fetch=_fetch_with_timeout,
+                on_result=_on_result,
+                on_domain_done=_on_domain_done,
+                should_stop=state.stop_fetching,
+                workers=FETCH_WORKERS,
+                per_domain=PER_DOMAIN_FETCH_CONCURRENCY,
+                bail_limits=BAIL_LIMITS,
+                domain_timeout=DOMAIN_WALL_CLOCK_TIMEOUT,
+            )
 
-            # Emit health event for this domain
-            yield {
-                "type": "health",
-                "domain": domain,
-                "urls_fetched": domain_urls_fetched,
-                "valid_rows": domain_valid_rows,
-                "wall_hits": domain_wall_hits,
-                "network_errors": domain_network_errors,
-                "source_type": get_source_type(domain),
-            }
+            async def _search(domain: str) -> list[str]:
+                try:
+                    return await _run_once(
+                        ("search", domain, job_title, country, region, city, description, tuple(title_variants)),
+                        _SERPAPI_HOST, search_site,
+                        domain, job_title, country, region, city, description, serpapi_key, title_variants or None,
+                    )
+                except Exception as e:
+                    print(f"[pipeline] search_site({domain}) error: {e}")
+                    return []
+
+            prefetcher = SearchPrefetcher(_search, depth=SEARCH_PREFETCH_DEPTH, concurrency=MAX_CONCURRENT_SEARCHES)
+
+            def _upcoming_domains() -> list[str]:
+                return [
+                    d for d in state.sites_queue[state.next_domain_idx:]
+                    if d not in state.active_blocklist and d not in state.covered_domains
+                ]
+
+            async def _feed_scheduler() -> None:
+                """Claim domains in queue order and hand their (prefetched) URLs to the scheduler."""
+                while True:
+                    # Only claim further domains when the fetch queue is running low
+                    await scheduler.wait_for_room(FETCH_QUEUE_LOW_WATER)
+                    if state.stop_fetching() or state.next_domain_idx >= len(state.sites_queue):
+                        return
+                    i = state.next_domain_idx
+                    domain = state.sites_queue[i]
+                    state.next_domain_idx += 1
+
+                    # Skip permanently blocked domains and ones an earlier run already covered
+                    if domain in state.active_blocklist or domain in state.covered_domains:
+                        continue
 
-            # Add to dynamic blocklist if domain hit the wall bail limit
-            if domain_wall_hits >= BAIL_LIMITS["wall"]:
-                add_to_dynamic_blocklist(domain)
-                active_blocklist = get_full_blocklist()  # refresh
-
-            i += 1
-            domains_processed += 1
-
-            # Quality strategy switch at domain 10
-            if domains_processed == QUALITY_SWITCH_DOMAINS:
-                total_with_data_so_far = sum(1 for r in rows if _has_data(r))
-                if total_with_data_so_far > 0 and source_pay_count / total_with_data_so_far < QUALITY_SWITCH_THRESHOLD:
-                    old_niche = niche_level
-                    if niche_level == "niche":
-                        niche_level = "specialized"
-                    elif niche_level == "specialized":
-                        niche_level = "common"
-                    if niche_level != old_niche:
-                        print(f"[pipeline] Quality switch: {old_niche} → {niche_level} (only {source_pay_count}/{total_with_data_so_far} rows valid)")
-                        yield {"type": "progress", "value": progress, "text": f"Low data quality detected — expanding search scope..."}
-
-            # Minimum floor: if fewer than 20 data points after 15 domains, force continuation
-            if domains_processed == MINIMUM_VALID_FLOOR_DOMAINS and source_pay_count < MINIMUM_VALID_FLOOR:
-                _force_continue = True
-                print(f"[pipeline] Floor triggered: only {source_pay_count} data points after {MINIMUM_VALID_FLOOR_DOMAINS} domains, forcing continuation")
-
-            # Reorder remaining domains by yield rate
-            if i < len(sites_queue):
-                remaining = sites_queue[i:]
-                sites_queue[i:] = _reorder_domains_by_yield(remaining, domain_yield)
+                    events.put_nowait({
+                        "type": "progress",
+                        "value": _domain_progress(i),
+                        "text": f"Searching {domain} ({i+1}/{len(state.sites_queue)}, {state.valid_count}/{TARGET_SOURCE_PAY_COUNT} valid data points)...",
+                    })
+
+                    # Claim this domain's search first so re-queueing the window below
+                    # cannot cancel or drop it, then keep the next domains' searches running
+                    search = prefetcher.claim(domain)
+                    prefetcher.prefetch(_upcoming_domains())
+                    urls = await search
+
+                    # Deduplicate URLs — skip any already fetched (or queued) this session
+                    new_urls = [u for u in urls if u not in state.seen_urls]
+                    if not new_urls:
+                        if urls:
+                            store.mark_domain_done(run_id, cache_key, domain, 0, 0)
+                        state.domains_processed += 1
+                        _after_domain(_domain_progress(i))
+                        continue
+                    urls = new_urls
+                    state.seen_urls.update(urls)
 
-    else:
-        # When loaded from cache, resolve country_currency and seen_urls for second-pass use
-        country_currency = get_country_currency(country)
-        seen_urls: set[str] = set(r.get("web_search_result_url", "") for r in rows if r.get("web_search_result_url"))
-        source_pay_count = sum(1 for r in rows if _has_data(r))
-        sites = []
+                    domain_had_valid = state.domain_yield.get(domain, {}).get("valid_rows", 0) > 0
+                    bail_limit = 5 if domain_had_valid else 4  # stricter bail-out for untested domains
+                    scheduler.add_domain(domain, urls, rank=i, source_type=get_source_type(domain), bail_limit=bail_limit)
 
-    if not rows:
-        yield {"type": "error", "message": "No search results found. Try a different job title or location."}
-        return
+            async def _drive() -> None:
+                try:
+                    await _feed_scheduler()
+                    await scheduler.join()
+                    await asyncio.sleep(0)  # let just-created validation tasks submit their rows
+                    validator.flush()
+                    await asyncio.gather(*list(validation_tasks))
+                except Exception as e:
+                    print(f"[pipeline] Fetch stage error: {e}")
+                finally:
+                    events.put_nowait(None)  # stage finished
+
+            # Pre-sort domains before the main loop: high-priority sources first.
+            state.sites_queue = _pre_sort_domains(list(sites), country)
+            state.active_blocklist = get_full_blocklist()
+
+            prefetcher.prefetch(_upcoming_domains())
+            scheduler.start()
+            driver = asyncio.ensure_future(_drive())
+            try:
+                while True:
+                    event = await events.get()
+                    if event is None:
+                        break
+                    yield event
+            finally:
+                driver.cancel()
+                prefetcher.close()
+                scheduler.close()
+                extractor.close()
+                validator.close()
+
+            # Domain yields recorded at domain end may have been missing late validations
+            for domain, urls_fetched in finished_domains.items():
+                store.mark_domain_done(run_id, cache_key, domain, urls_fetched, state.domain_valid.get(domain, 0))
+
+            state.pages_per_second = scheduler.pages_per_second()
+            print(f"[pipeline] Fetch throughput: {scheduler.pages_done} pages at {state.pages_per_second:.2f} pages/s")
+            print(f"[pipeline] Search prefetch: {prefetcher.hits} ready, {prefetcher.misses} waited")
+            print(f"[pipeline] Page cache: {get_page_cache_stats()}")
+            print(f"[pipeline] Extraction cache: {get_extraction_cache_stats()}")
+            print(f"[pipeline] FX rate table: {get_fx_stats()}")
+            print(f"[pipeline] Extraction batching: {extractor.items} pages in {extractor.batches} calls")
+            print(f"[pipeline] Streaming validation: {validator.items} rows in {validator.batches} batches, {state.valid_count} valid")
+            niche_level = state.niche_level
 
-    # Step 4: Normalize hourly <-> annual (82%)
-    yield {"type": "progress", "value": 0.82, "text": "Calculating hourly \u2194 annual equivalents..."}
+        else:
+            # When loaded from cache, resolve seen_urls for second-pass use
+            state.seen_urls.update(r.get("web_search_result_url", "") for r in rows if r.get("web_search_result_url"))
+            state.source_pay_count = sum(1 for r in rows if _has_data(r))
+            sites = []
 
-    for row in rows:
-        annual = row.get("found_annual_pay")
-        hourly = row.get("found_hourly_pay")
+        if not rows:
+            yield {"type": "error", "message": "No search results found. Try a different job title or location."}
+            return
 
-        if hourly and not annual:
-            row["found_annual_pay"] = hourly * HOURS_PER_YEAR
-        elif annual and not hourly:
-            row["found_hourly_pay"] = annual / HOURS_PER_YEAR
+        # Steps 4–6: normalise, convert and validate whatever the streaming validator
+        # has not already settled (cached runs, rows whose batch failed)
+        yield {"type": "progress", "value": 0.86, "text": "Converting currencies and validating results..."}
+        async for event in _validate_leftovers():
+            yield event
 
-    # Step 5: Currency conversion (86%)
-    yield {"type": "progress", "value": 0.86, "text": "Converting currencies..."}
+        valid_df = pd.DataFrame(rows, columns=SCHEMA)
+        valid_df = valid_df[valid_df["valid"] == 1].copy()
+        valid_count = len(valid_df)
 
-    # Cache exchange rates — one API call per unique currency pair per pipeline run
-    rate_cache: dict[tuple[str, str], float | None] = {}
+        if state.usage.budget_exhausted:
+            print(
+                f"[pipeline] LLM token budget spent ({state.usage.tokens} of {state.usage.budget_tokens} tokens) "
+                f"— extraction stopped early"
+            )
 
-    def _get_rate(from_code: str, to_code: str) -> float | None:
-        if from_code == to_code:
-            return 1.0
-        key = (from_code.upper(), to_code.upper())
-        if key not in rate_cache:
-            rate_cache[key] = convert_currency(1.0, from_code, to_code)
-        return rate_cache[key]
+        # Second pass: if insufficient valid data, retry with title variants + relaxed geo
+        if valid_count < 7 and not _from_cache and title_variants and not state.usage.budget_exhausted:
+            yield {
+                "type": "progress",
+                "value": 0.92,
+                "text": f"Only {valid_count} valid rows — running second pass with expanded search...",
+            }
+            print(f"[pipeline] Second pass triggered: {valid_count} valid rows, trying {len(title_variants)} title variants")
+
+            second_pass_domains = _pre_sort_domains(list(sites)[:10], country)
+            blocklist = get_full_blocklist()
+            sp_searches = [
+                (variant_title, sp_domain)
+                for variant_title in title_variants[:3]
+                for sp_domain in second_pass_domains[:5]
+                if sp_domain not in blocklist
+            ]
+
+            async def _sp_search(variant_title: str, sp_domain: str) -> list[str]:
+                try:
+                    return await _run_once(
+                        ("search", sp_domain, variant_title, country, "", "", description, ()),
+                        _SERPAPI_HOST, search_site,
+                        sp_domain, variant_title, country, "", "",
+                        description, serpapi_key, title_variants=None,
+                    )
+                except Exception:
+                    return []
 
-    for row in rows:
-        found_currency = row.get("found_currency")
+            async def _sp_fetch(variant_title: str, sp_domain: str, sp_url: str) -> dict | None:
+                try:
+                    page_text, fetch_error = await _run_once(
+                        ("page", normalize_url(sp_url)), sp_domain, fetch_page, sp_url, keep=_page_fetched,
+                    )
+                    if not page_text:
+                        return None
+                    sp_source_type = get_source_type(sp_domain)
+                    sp_extracted = await limits.run(
+                        _ANTHROPIC_HOST, extract_salary,
+                        page_text, variant_title, country, "", "", client,
+                        country_currency, source_type=sp_source_type, critique_mode=EXTRACTION_CRITIQUE_MODE,
+                        slots=_extraction_slots(page_text, variant_title),
+                    )
+                    return _build_row(sp_domain, sp_url, sp_extracted, variant_title, country, "", "", display_currency, sp_source_type)
+                except Exception as e:
+                    print(f"[pipeline] Second pass fetch error ({sp_url}): {e}")
+                    return None
+
+            sp_url_lists = await asyncio.gather(*(_sp_search(v, d) for v, d in sp_searches))
+            sp_jobs = []
+            for (variant_title, sp_domain), sp_urls in zip(sp_searches, sp_url_lists):
+                for sp_url in sp_urls[:2]:
+                    if sp_url in state.seen_urls:
+                        continue
+                    state.seen_urls.add(sp_url)
+                    sp_jobs.append(_sp_fetch(variant_title, sp_domain, sp_url))
+
+            for next_row in asyncio.as_completed(sp_jobs):
+                sp_row = await next_row
+                if sp_row is not None:
+                    rows.append(sp_row)
+                    store.add_row(run_id, cache_key, sp_row)
+                    yield {"type": "row", "row": sp_row}
+
+            # Normalise, convert and validate the new rows
+            async for event in _validate_leftovers():
+                yield event
+
+            # Recount valid rows
+            valid_df = pd.DataFrame(rows, columns=SCHEMA)
+            valid_df = valid_df[valid_df["valid"] == 1].copy()
+            valid_count = len(valid_df)
+            print(f"[pipeline] Second pass complete: {valid_count} total valid rows")
+
+        # Record validation outcomes; the next run reuses this one if valid_count >= MIN_VALID_FOR_REUSE
+        if not _from_cache:
+            store.finish_run(run_id, cache_key, rows)
+            print(f"[pipeline] Run stored: {cache_key} ({valid_count} valid of {len(rows)} rows)")
+
+        # Build DataFrame (after all second pass processing)
+        df = pd.DataFrame(rows, columns=SCHEMA)
+        yield {"type": "stats", "df": df}
+
+        # Step 7: Generate AI Summary with quality gate (95%)
+        yield {"type": "progress", "value": 0.95, "text": "Generating AI summary..."}
+
+        valid_df = df[df["valid"] == 1].copy() if len(df) > 0 else pd.DataFrame()
+        valid_count = len(valid_df)
 
-        if display_pref == "Annual Salary":
-            source_amount = row.get("found_annual_pay")
+        if valid_count < 5:
+            # Insufficient data — return a stub instead of calling the model
+            rejection_reasons = list({
+                r.get("validation_reason") or r.get("error_message") or "unknown"
+                for r in rows
+                if r.get("valid") != 1 and (r.get("validation_reason") or r.get("error_message"))
+            })[:10]
+            summary_data = _build_summary_stub(valid_count, rejection_reasons)
+        elif valid_count < 10:
+            # Moderate confidence — instruct Sonnet to caveat its output
+            try:
+                with span("summary", rows=valid_count):
+                    summary_data = await limits.run(
+                        _ANTHROPIC_HOST, generate_summary,
+                        job_title=job_title, country=country, region=region, city=city,
+                        display_pref=display_pref, display_currency=display_currency,
+                        valid_rows_df=valid_df, client=client, moderate_confidence=True,
+                    )
+            except Exception as e:
+                print(f"[pipeline] generate_summary error: {e}")
+                summary_data = _build_summary_stub(valid_count, [f"summary_error: {e}"])
         else:
-            source_amount = row.get("found_hourly_pay")
+            try:
+                with span("summary", rows=valid_count):
+                    summary_data = await limits.run(
+                        _ANTHROPIC_HOST, generate_summary,
+                        job_title=job_title, country=country, region=region, city=city,
+                        display_pref=display_pref, display_currency=display_currency,
+                        valid_rows_df=valid_df, client=client,
+                    )
+            except Exception as e:
+                print(f"[pipeline] generate_summary error: {e}")
+                summary_data = _build_summary_stub(valid_count, [f"summary_error: {e}"])
 
-        if source_amount is None:
-            row["display_pay_rate"] = None
-            continue
+        yield {"type": "summary", "data": summary_data}
 
-        if not found_currency:
-            inferred = country_currency
-            if inferred:
-                found_currency = inferred
-                row["found_currency"] = inferred
-                if not row.get("error_message"):
-                    row["error_message"] = _make_error(
-                        "currency", f"Currency inferred from country ({inferred})", recoverable=True
-                    )
-            else:
-                row["display_pay_rate"] = None
-                row["error_message"] = _make_error("currency", "Currency code missing — cannot convert")
-                continue
+        llm_usage = state.usage.summary()
+        yield {"type": "llm_usage", "usage": llm_usage}
 
-        rate = _get_rate(found_currency, display_currency)
-        if rate is not None:
-            row["display_pay_rate"] = source_amount * rate
-        else:
-            row["display_pay_rate"] = None
-            row["error_message"] = _make_error(
-                "currency", f"Currency conversion failed ({found_currency} → {display_currency})"
+        # Write session log
+        rows_with_data = [r for r in rows if r.get("display_pay_rate") is not None]
+        http_pool = get_run_transport_totals()
+        print(
+            f"[pipeline] HTTP pool: {http_pool['requests']} requests, {http_pool['pool_hits']} reused, "
+            f"{http_pool['pool_misses']} new connections ({http_pool['tls_handshakes']} TLS handshakes)"
+        )
+        for kind, u in llm_usage["by_kind"].items():
+            print(
+                f"[pipeline] LLM {kind}: {u['calls']} calls, input {u['input_tokens']} uncached / "
+                f"{u['cache_read_input_tokens']} cache read / {u['cache_creation_input_tokens']} cache write, "
+                f"output {u['output_tokens']}, ${u['cost_usd']:.4f}, {u['latency_seconds']}s"
             )
+        print(
+            f"[pipeline] LLM total: {llm_usage['calls']} calls, {llm_usage['tokens']} tokens "
+            f"(budget {llm_usage['budget_tokens']}), ${llm_usage['cost_usd']:.4f}"
+        )
+        pre_extract = get_run_pre_extract_stats()
+        print(
+            f"[pipeline] Local pre-extraction: {pre_extract['llm_calls_avoided']} of {pre_extract['pages']} pages "
+            f"resolved without the LLM ({pre_extract['json_ld']} JSON-LD, {pre_extract['pattern']} pattern)"
+        )
+        recorder = current_recorder()
+        timings = recorder.stats() if recorder is not None else {}
+        if timings:
+            print("[pipeline] Time by stage: " + ", ".join(
+                f"{name} {t['count']}x p50 {t['p50']}s p95 {t['p95']}s"
+                for name, t in timings.items()
+            ))
+        try:
+            log = {
+                "run_id": run_id,
+                "job_title": job_title,
+                "country": country,
+                "niche_level": niche_level,
+                "title_variants": title_variants,
+                "domains_tried": state.domains_processed,
+                "urls_fetched": state.urls_fetched,
+                "pages_per_second": round(state.pages_per_second, 3),
+                "http_pool": http_pool,
+                "llm_usage": llm_usage["by_kind"],
+                "llm_tokens": llm_usage["tokens"],
+                "llm_cost_usd": llm_usage["cost_usd"],
+                "llm_budget_exhausted": llm_usage["budget_exhausted"],
+                "llm_calls_avoided": pre_extract["llm_calls_avoided"],
+                "timings": timings,
+                "rows_extracted": len(rows),
+                "rows_resumed": resumed_rows,
+                "rows_validated": len(rows_with_data),
+                "rows_valid": valid_count,
+                "domain_yield": {d: y for d, y in state.domain_yield.items() if d not in state.covered_domains},
+                "from_cache": _from_cache,
+                "duration_seconds": round(time.time() - pipeline_start_time, 2),
+                "confidence_level": "High" if valid_count >= 10 else "Moderate" if valid_count >= 5 else "Limited",
+            }
+            _get_run_log().append(log)
+            print(f"[pipeline] Session log appended: {log['run_id']}")
+        except Exception as e:
+            print(f"[pipeline] Failed to write session log: {e}")
 
-    # Step 6: Validation (90%)
-    yield {"type": "progress", "value": 0.90, "text": "Validating results..."}
+        # Complete
+        yield {"type": "progress", "value": 1.0, "text": "Complete"}
+        yield {"type": "complete"}
 
-    # Deduplicate rows with identical (domain, found_annual_pay) before validation
-    # to avoid the same data point being counted multiple times (e.g. levels.fyi)
-    seen_pay_keys: set[tuple] = set()
-    for row in rows:
-        if row.get("display_pay_rate") is not None:
-            key = (row.get("country_specific_site_url"), row.get("found_annual_pay"))
-            if key in seen_pay_keys:
-                row["display_pay_rate"] = None
-                row["valid"] = 0
-                row["validation_reason"] = "duplicate data point"
-            else:
-                seen_pay_keys.add(key)
+    finally:
+        if validator is not None:
+            validator.close()
+        for task in list(validation_tasks):  # a consumer that stopped early leaves these waiting
+            task.cancel()
+        if shared is None:
+            limits.shutdown()
 
-    rows_with_data = [r for r in rows if r.get("display_pay_rate") is not None]
 
-    if rows_with_data:
-        validation_results = validate_rows_batch(
-            rows_with_data, job_title, country, region, city, client,
-            niche_level=niche_level, title_variants=title_variants,
-        )
+def _extraction_slots(page_text: str, job_title: str) -> int:
+    """Anthropic requests extract_salary makes at once for this page under EXTRACTION_CRITIQUE_MODE."""
+    if EXTRACTION_CRITIQUE_MODE == "race" or (
+        EXTRACTION_CRITIQUE_MODE == "speculative" and likely_low_confidence(page_text, job_title)
+    ):
+        return 2
+    return 1
 
-        valid_idx = 0
-        for row in rows:
-            if row.get("display_pay_rate") is not None:
-                if valid_idx < len(validation_results):
-                    vr = validation_results[valid_idx]
-                    row["valid"] = vr.get("valid", 0)
-                    row["validation_reason"] = vr.get("validation_reason")
-                    if row["valid"] == 0 and vr.get("validation_reason"):
-                        row["error_message"] = vr["validation_reason"]
-                else:
-                    row["valid"] = 0
-                    row["validation_reason"] = "missing from response"
-                valid_idx += 1
-            else:
-                row["valid"] = 0
-                row["validation_reason"] = "null pay rate"
-    else:
-        for row in rows:
-            row["valid"] = 0
-            row["validation_reason"] = "null pay rate"
 
-    valid_df = pd.DataFrame(rows, columns=SCHEMA)
-    valid_df = valid_df[valid_df["valid"] == 1].copy()
-    valid_count = len(valid_df)
+def _page_fetched(result: tuple[str | None, str | None]) -> bool:
+    """Whether a fetch_page result is worth sharing with later locations (not a failure)."""
+    page_text, _error = result
+    return bool(page_text)
 
-    # Second pass: if insufficient valid data, retry with title variants + relaxed geo
-    if valid_count < 7 and not _from_cache and title_variants:
-        yield {
-            "type": "progress",
-            "value": 0.92,
-            "text": f"Only {valid_count} valid rows — running second pass with expanded search...",
-        }
-        print(f"[pipeline] Second pass triggered: {valid_count} valid rows, trying {len(title_variants)} title variants")
 
-        second_pass_domains = _pre_sort_domains(list(sites)[:10], country)
+def _location_label(country: str, region: str, city: str) -> str:
+    return ", ".join(part for part in (city, region, country) if part)
 
-        for variant_title in title_variants[:3]:
-            for sp_domain in second_pass_domains[:5]:
-                if sp_domain in get_full_blocklist():
-                    continue
-                try:
-                    sp_urls = search_site(
-                        sp_domain, variant_title, country, "", "",
-                        description, serpapi_key, title_variants=None,
-                    )
-                except Exception:
-                    continue
-                for sp_url in sp_urls[:2]:
-                    if sp_url in seen_urls:
-                        continue
-                    page_text, fetch_error = fetch_page(sp_url)
-                    seen_urls.add(sp_url)
-                    if page_text:
-                        sp_source_type = get_source_type(sp_domain)
-                        sp_extracted = extract_salary(
-                            page_text, variant_title, country, "", "", client,
-                            country_currency, source_type=sp_source_type,
-                        )
-                        sp_row = _build_row(sp_domain, sp_url, sp_extracted, variant_title, country, "", "", display_currency, sp_source_type)
-                        rows.append(sp_row)
-                        yield {"type": "row", "row": sp_row}
-
-        # Re-run normalization and currency conversion on new rows only
-        for row in rows:
-            if row.get("display_pay_rate") is not None:
-                continue  # already processed
-            annual = row.get("found_annual_pay")
-            hourly = row.get("found_hourly_pay")
-            if hourly and not annual:
-                row["found_annual_pay"] = hourly * HOURS_PER_YEAR
-            elif annual and not hourly:
-                row["found_hourly_pay"] = annual / HOURS_PER_YEAR
-
-            found_currency = row.get("found_currency") or country_currency
-            if found_currency:
-                row["found_currency"] = found_currency
-
-            if display_pref == "Annual Salary":
-                source_amount = row.get("found_annual_pay")
-            else:
-                source_amount = row.get("found_hourly_pay")
 
-            if source_amount is not None and found_currency:
-                rate = _get_rate(found_currency, display_currency)
-                if rate is not None:
-                    row["display_pay_rate"] = source_amount * rate
+def run_pipeline_batch(
+    job_title: str,
+    locations: list[tuple[str, str, str]],
+    description: str,
+    display_pref: str,
+    display_currency: str,
+    serpapi_key: str,
+    anthropic_key: str,
+    exchangerate_key: str,
+) -> Generator[dict[str, Any], None, None]:
+    """Synchronous adapter over run_pipeline_batch_async."""
+    yield from iterate_async(run_pipeline_batch_async(
+        job_title, locations, description,
+        display_pref, display_currency,
+        serpapi_key, anthropic_key, exchangerate_key,
+    ))
 
-        # Re-validate all rows with data (including new ones)
-        all_rows_with_data = [r for r in rows if r.get("display_pay_rate") is not None and r.get("valid") is None]
-        if all_rows_with_data:
-            sp_validation = validate_rows_batch(
-                all_rows_with_data, job_title, country, region, city, client,
-                niche_level=niche_level, title_variants=title_variants,
-            )
-            vsp_idx = 0
-            for row in rows:
-                if row.get("display_pay_rate") is not None and row.get("valid") is None:
-                    if vsp_idx < len(sp_validation):
-                        vr = sp_validation[vsp_idx]
-                        row["valid"] = vr.get("valid", 0)
-                        row["validation_reason"] = vr.get("validation_reason")
-                    vsp_idx += 1
-
-        # Recount valid rows
-        valid_df = pd.DataFrame(rows, columns=SCHEMA)
-        valid_df = valid_df[valid_df["valid"] == 1].copy()
-        valid_count = len(valid_df)
-        print(f"[pipeline] Second pass complete: {valid_count} total valid rows")
-
-    # Save to cache after validation if valid_count >= 5
-    if valid_count >= 5 and not _from_cache:
-        valid_rows_for_cache = [r for r in rows if r.get("valid") == 1]
-        _save_cache(cache_key, valid_rows_for_cache)
-
-    # Build DataFrame (after all second pass processing)
-    df = pd.DataFrame(rows, columns=SCHEMA)
-    yield {"type": "stats", "df": df}
-
-    # Step 7: Generate AI Summary with quality gate (95%)
-    yield {"type": "progress", "value": 0.95, "text": "Generating AI summary..."}
-
-    valid_df = df[df["valid"] == 1].copy() if len(df) > 0 else pd.DataFrame()
-    valid_count = len(valid_df)
-
-    if valid_count < 5:
-        # Insufficient data — return a stub instead of calling the model
-        rejection_reasons = list({
-            r.get("validation_reason") or r.get("error_message") or "unknown"
-            for r in rows
-            if r.get("valid") != 1 and (r.get("validation_reason") or r.get("error_message"))
-        })[:10]
-        summary_data = _build_summary_stub(valid_count, rejection_reasons)
-    elif valid_count < 10:
-        # Moderate confidence — instruct Sonnet to caveat its output
-        try:
-            summary_data = generate_summary(
-                job_title=job_title, country=country, region=region, city=city,
-                display_pref=display_pref, display_currency=display_currency,
-                valid_rows_df=valid_df, client=client, moderate_confidence=True,
-            )
-        except Exception as e:
-            print(f"[pipeline] generate_summary error: {e}")
-            summary_data = _build_summary_stub(valid_count, [f"summary_error: {e}"])
-    else:
-        try:
-            summary_data = generate_summary(
-                job_title=job_title, country=country, region=region, city=city,
-                display_pref=display_pref, display_currency=display_currency,
-                valid_rows_df=valid_df, client=client,
+
+async def run_pipeline_batch_async(
+    job_title: str,
+    locations: list[tuple[str, str, str]],
+    description: str,
+    display_pref: str,
+    display_currency: str,
+    serpapi_key: str,
+    anthropic_key: str,
+    exchangerate_key: str,
+) -> AsyncGenerator[dict[str, Any], None]:
+    """
+    Price one job title in several (country, region, city) locations at once.
+
+    Each location runs the normal pipeline, BATCH_MAX_CONCURRENT_LOCATIONS at a
+    time, on one Anthropic client and one ConcurrencyLimiter, so per-host caps
+    hold across the whole batch.  Lookups that do not depend on the exact
+    location are made once: niche classification, BLS SOC mapping, site
+    discovery (incl. AI source suggestions) per country, identical searches
+    (e.g. the national second-pass ones) and page fetches by URL — a
+    national-level page found for two cities of a country is fetched once.
+
+    Yields every location's run_pipeline events with "location" (label) and
+    "location_index" added, then {"type": "batch_complete", "locations": [...],
+    "shared_llm_usage": {...}}.  Each location's llm_usage (and token budget)
+    covers only its own calls; the shared lookups are reported once, in
+    shared_llm_usage.
+    """
+
+    import anthropic  # deferred: the SDK is by far the slowest import in the app
+
+    shared = _BatchShared(
+        client=anthropic.Anthropic(api_key=anthropic_key),
+        limits=ConcurrencyLimiter(BATCH_MAX_CONCURRENT_REQUESTS, PER_HOST_CONCURRENCY, DEFAULT_PER_HOST_CONCURRENCY),
+    )
+    labels = [_location_label(*loc) for loc in locations]
+    events: asyncio.Queue = asyncio.Queue()
+    gate = asyncio.Semaphore(BATCH_MAX_CONCURRENT_LOCATIONS)
+
+    async def _run_location(i: int, country: str, region: str, city: str) -> None:
+        tag = {"location": labels[i], "location_index": i}
+        async with gate:
+            agen = run_pipeline_async(
+                job_title, country, region, city, description,
+                display_pref, display_currency,
+                serpapi_key, anthropic_key, exchangerate_key,
+                shared=shared,
             )
-        except Exception as e:
-            print(f"[pipeline] generate_summary error: {e}")
-            summary_data = _build_summary_stub(valid_count, [f"summary_error: {e}"])
+            try:
+                async for event in agen:
+                    events.put_nowait({**event, **tag})
+            except Exception as e:
+                print(f"[pipeline] Batch location {labels[i]} failed: {e}")
+                events.put_nowait({"type": "error", "message": f"{labels[i]}: {e}", **tag})
+            finally:
+                await agen.aclose()
 
-    yield {"type": "summary", "data": summary_data}
+    async def _drive() -> None:
+        try:
+            await asyncio.gather(*(_run_location(i, *loc) for i, loc in enumerate(locations)))
+        finally:
+            events.put_nowait(None)
 
-    # Write session log
-    rows_with_data = [r for r in rows if r.get("display_pay_rate") is not None]
+    batch_start = time.time()
+    driver = asyncio.ensure_future(_drive())
     try:
-        log = {
-            "run_id": str(uuid.uuid4()),
-            "job_title": job_title,
-            "country": country,
-            "niche_level": niche_level,
-            "title_variants": title_variants,
-            "domains_tried": domains_processed,
-            "urls_fetched": urls_fetched,
-            "rows_extracted": len(rows),
-            "rows_validated": len(rows_with_data),
-            "rows_valid": valid_count,
-            "from_cache": _from_cache,
-            "duration_seconds": round(time.time() - pipeline_start_time, 2),
-            "confidence_level": "High" if valid_count >= 10 else "Moderate" if valid_count >= 5 else "Limited",
-        }
-        _append_log(log)
-        print(f"[pipeline] Session log appended: {log['run_id']}")
-    except Exception as e:
-        print(f"[pipeline] Failed to write session log: {e}")
-
-    # Complete
-    yield {"type": "progress", "value": 1.0, "text": "Complete"}
-    yield {"type": "complete"}
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+    finally:
+        driver.cancel()
+        shared.calls.close()
+        shared.limits.shutdown()
+
+    print(
+        f"[pipeline] Batch of {len(locations)} locations in {time.time() - batch_start:.1f}s: "
+        f"{shared.calls.hits} shared lookups reused, {shared.calls.misses} made "
+        f"({shared.usage.tokens} LLM tokens)"
+    )
+    yield {"type": "batch_complete", "locations": labels, "shared_llm_usage": shared.usage.summary()}
 
 
 # ---------------------------------------------------------------------------
@@ -873,7 +1328,7 @@ def _build_row(
     )
     extraction_error = extracted.get("_error") if all_null else None
     if all_null and not extraction_error:
-        extraction_error = "No salary data found on page"
+        extraction_error = _NO_SALARY_DATA
     return {
         "country_specific_site_url": domain,
         "web_search_result_url": url,
@@ -890,6 +1345,7 @@ def _build_row(
         "city": extracted.get("found_city") or city,
         "remote_ok": extracted.get("remote_ok", 0),
         "source_type": source_type,
+        "extraction_path": extracted.get("_extraction_path"),
         "valid": None,
         "error_message": _make_error("extract", extraction_error) if extraction_error else None,
         "validation_reason": None,
@@ -898,6 +1354,101 @@ def _build_row(
     }
 
 
+def _apply_validation(row: dict, vr: dict) -> None:
+    """Copy one validate_rows_batch result onto its row."""
+    row["valid"] = vr.get("valid", 0)
+    row["validation_reason"] = vr.get("validation_reason")
+    if row["valid"] == 0 and vr.get("validation_reason"):
+        row["error_message"] = vr["validation_reason"]
+
+
+def _normalize_rows(
+    rows: list[dict],
+    display_pref: str,
+    display_currency: str,
+    country_currency: str | None,
+    get_rate: Callable[[str, str], float | None],
+    seen_pay_keys: dict[tuple, str] | None = None,
+) -> list[dict]:
+    """Steps 4 & 5 plus dedupe: updates the rows in place, returns the ones still to validate.
+
+    Fills hourly <-> annual, infers a missing currency from the country, and
+    converts the display_pref figure into display_currency (one get_rate call
+    per distinct currency).  Rows left without a display_pay_rate are settled
+    as "null pay rate", and a repeated (domain, found_annual_pay) pair as
+    "duplicate data point" (e.g. levels.fyi) — across calls too when
+    *seen_pay_keys* (key -> first URL) is shared.
+    """
+    rates: dict[str, float | None] = {}
+    seen = seen_pay_keys if seen_pay_keys is not None else {}
+    pending = []
+    for row in rows:
+        annual = row.get("found_annual_pay")
+        hourly = row.get("found_hourly_pay")
+        if hourly and not annual:
+            row["found_annual_pay"] = annual = hourly * HOURS_PER_YEAR
+        elif annual and not hourly:
+            row["found_hourly_pay"] = hourly = annual / HOURS_PER_YEAR
+
+        source_amount = annual if display_pref == "Annual Salary" else hourly
+        row["display_pay_rate"] = None
+        if source_amount is not None:
+            found_currency = row.get("found_currency")
+            if not found_currency and country_currency:
+                found_currency = row["found_currency"] = country_currency
+                if not row.get("error_message"):
+                    row["error_message"] = _make_error(
+                        "currency", f"Currency inferred from country ({country_currency})", recoverable=True
+                    )
+            if not found_currency:
+                row["error_message"] = _make_error("currency", "Currency code missing — cannot convert")
+            else:
+                if found_currency not in rates:
+                    rates[found_currency] = get_rate(found_currency, display_currency)
+                rate = rates[found_currency]
+                if rate is not None:
+                    row["display_pay_rate"] = source_amount * rate
+                else:
+                    row["error_message"] = _make_error(
+                        "currency", f"Currency conversion failed ({found_currency} → {display_currency})"
+                    )
+
+        if row["display_pay_rate"] is None:
+            row["valid"] = 0
+            row["validation_reason"] = "null pay rate"
+            continue
+        url = row.get("web_search_result_url")
+        if seen.setdefault((row.get("country_specific_site_url"), annual), url) != url:
+            row["display_pay_rate"] = None
+            row["valid"] = 0
+            row["validation_reason"] = "duplicate data point"
+            continue
+        pending.append(row)
+    return pending
+
+
+def _is_settled(row: dict) -> bool:
+    """Whether a stored row is a final answer for its URL, rather than a transient failure worth retrying.
+
+    Rows with pay data, pages that had none, and walled pages are settled;
+    network / timeout fetch failures and failed extraction calls are not.
+    """
+    if _has_data(row):
+        return True
+    try:
+        error = json.loads(row.get("error_message") or "null")
+    except ValueError:
+        return True  # a validation reason, not a pipeline error
+    if not isinstance(error, dict):
+        return True
+    reason = error.get("reason") or ""
+    if error.get("stage") == "fetch":
+        return _classify_fetch_error(reason) == "wall"
+    if error.get("stage") == "extract":
+        return reason == _NO_SALARY_DATA
+    return True
+
+
 def _has_data(row: dict) -> bool:
     """
     Count a source URL as one data point if it has a usable pay rate.
@@ -928,6 +1479,7 @@ def _empty_row(domain: str, url: str, display_currency: str, error_message: str
         "city": None,
         "remote_ok": 0,
         "source_type": None,
+        "extraction_path": None,
         "valid": 0,
         "error_message": _make_error("fetch", error_message or "Page fetch failed") if error_message else None,
         "validation_reason": None,
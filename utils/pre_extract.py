@@ -0,0 +1,308 @@
+"""Deterministic salary pre-extractor that runs before any LLM call.
+
+Two cheap local passes over the fetched page text:
+
+1. JSON-LD — ``JobPosting`` objects with a ``baseSalary`` (``_parse_salary_html``
+   keeps ld+json blocks in the page text).  A posting whose title matches the
+   search gives a "high" confidence result.
+2. Salary patterns — an explicit currency amount or range with a pay period,
+   e.g. "$38.46 - $63.46 per hour" or "Salary: £45K-£55K a year".  Accepted only
+   when the page shows exactly one distinct figure and mentions the job title;
+   the result is "medium" confidence.
+
+``pre_extract`` returns a dict in the ``extract_salary`` schema, or None when
+the page is inconclusive and should go to Haiku.  Counters record how many
+pages were resolved locally, i.e. how many LLM calls were avoided.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+
+from utils.tracing import count, current_recorder
+
+# schema.org unitText -> (field, multiplier to reach that field's unit)
+_PERIODS = {
+    "HOUR": ("hourly", 1),
+    "DAY": ("annual", 260),
+    "WEEK": ("annual", 52),
+    "MONTH": ("annual", 12),
+    "YEAR": ("annual", 1),
+}
+_DOLLAR_CURRENCIES = {"USD", "CAD", "AUD", "NZD", "SGD", "HKD"}
+_SYMBOL_CURRENCIES = {"£": "GBP", "€": "EUR"}
+
+# Plausibility bounds per unit; anything outside is left to the LLM
+_BOUNDS = {"hourly": (5, 1_000), "annual": (5_000, 5_000_000)}
+
+_SALARY_RE = re.compile(
+    r"(?P<sym>[$£€])\s?(?P<a>\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s?(?P<ak>[kK])?"
+    r"(?:\s*(?:-|–|—|to)\s*[$£€]?\s?(?P<b>\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s?(?P<bk>[kK])?)?"
+    r"\s*(?:/|per\s+|an?\s+)(?P<unit>hour|hr|year|yr|annum|month|week)\b",
+    re.IGNORECASE,
+)
+# Loose "money on the page" signal for the low-confidence pre-screen
+_MONEY_RE = re.compile(
+    r"(?:[$£€¥₹]|\b(?:USD|CAD|AUD|GBP|EUR|CHF|PLN|SEK|NOK|DKK|JPY|INR|zł|kr)\b)\s?\d"
+    r"|\d[\d,.]*\s?(?:[kK]\b|zł|kr\b|€|(?:USD|CAD|AUD|GBP|EUR|CHF|PLN|SEK|NOK|DKK|JPY|INR)\b)",
+)
+_UNIT_WORDS = {"hour": "HOUR", "hr": "HOUR", "year": "YEAR", "yr": "YEAR", "annum": "YEAR", "month": "MONTH", "week": "WEEK"}
+
+_lock = threading.Lock()
+_stats = {"pages": 0, "json_ld": 0, "pattern": 0, "inconclusive": 0}
+
+
+def _record(key: str) -> None:
+    with _lock:
+        _stats["pages"] += 1
+        _stats[key] += 1
+    count("pre_extract.pages")
+    count(f"pre_extract.{key}")
+
+
+def get_pre_extract_stats() -> dict[str, int]:
+    """Pages seen, resolved via JSON-LD / pattern, and left to the LLM.
+
+    llm_calls_avoided counts first-pass extraction calls; low-confidence
+    pages would have cost a second (critique) call on top.
+    """
+    with _lock:
+        stats = dict(_stats)
+    stats["llm_calls_avoided"] = stats["json_ld"] + stats["pattern"]
+    return stats
+
+
+def get_run_pre_extract_stats() -> dict[str, int]:
+    """get_pre_extract_stats for the pages of the active run only."""
+    recorder = current_recorder()
+    counted = recorder.counters("pre_extract.") if recorder is not None else {}
+    stats = {key: counted.get(key, 0) for key in _stats}
+    stats["llm_calls_avoided"] = stats["json_ld"] + stats["pattern"]
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _title_words(title: str) -> list[str]:
+    return [w[:4] for w in re.findall(r"[a-z]+", title.lower()) if len(w) >= 3]
+
+
+def _title_matches(job_title: str, text: str) -> bool:
+    """Every significant word of the job title (by 4-letter stem) appears in *text*."""
+    words = _title_words(job_title)
+    haystack = text.lower()
+    return bool(words) and all(w in haystack for w in words)
+
+
+def _to_number(value) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.replace(",", "").strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _result(
+    unit_field: str,
+    low: float | None,
+    high: float | None,
+    mid: float,
+    currency: str,
+    job_title_found: str | None,
+    confidence: str,
+    reasoning: str,
+) -> dict | None:
+    lo_bound, hi_bound = _BOUNDS[unit_field]
+    if not lo_bound <= mid <= hi_bound:
+        return None
+    return {
+        "job_title_found": job_title_found,
+        "found_currency": currency,
+        "found_annual_pay": mid if unit_field == "annual" else None,
+        "found_hourly_pay": mid if unit_field == "hourly" else None,
+        "found_pay_low": low,
+        "found_pay_high": high,
+        "remote_ok": 0,
+        "found_country": None,
+        "found_region": None,
+        "found_city": None,
+        "confidence": confidence,
+        "reasoning": reasoning,
+    }
+
+
+# ---------------------------------------------------------------------------
+# JSON-LD
+# ---------------------------------------------------------------------------
+
+def _json_objects(text: str) -> list:
+    """Decode every top-level JSON value that starts at a '{' or '[' in *text*."""
+    decoder = json.JSONDecoder()
+    found = []
+    pos = 0
+    while True:
+        starts = [i for i in (text.find("{", pos), text.find("[", pos)) if i != -1]
+        if not starts:
+            return found
+        start = min(starts)
+        try:
+            obj, end = decoder.raw_decode(text, start)
+        except ValueError:
+            pos = start + 1
+            continue
+        found.append(obj)
+        pos = end
+
+
+def _job_postings(obj) -> list[dict]:
+    if isinstance(obj, list):
+        return [p for item in obj for p in _job_postings(item)]
+    if not isinstance(obj, dict):
+        return []
+    postings = []
+    types = obj.get("@type")
+    types = types if isinstance(types, list) else [types]
+    if "JobPosting" in types and obj.get("baseSalary"):
+        postings.append(obj)
+    for key in ("@graph", "itemListElement", "item", "mainEntity"):
+        if key in obj:
+            postings.extend(_job_postings(obj[key]))
+    return postings
+
+
+def _from_json_ld(text: str, job_title: str) -> dict | None:
+    if "baseSalary" not in text:
+        return None
+    for posting in (p for obj in _json_objects(text) for p in _job_postings(obj)):
+        title = str(posting.get("title") or "")
+        if not _title_matches(job_title, title):
+            continue
+        salary = posting["baseSalary"]
+        if not isinstance(salary, dict):
+            continue
+        currency = salary.get("currency") or posting.get("salaryCurrency")
+        value = salary.get("value")
+        if isinstance(value, dict):
+            unit = str(value.get("unitText") or salary.get("unitText") or "").upper()
+            low, high = _to_number(value.get("minValue")), _to_number(value.get("maxValue"))
+            point = _to_number(value.get("value"))
+        else:
+            unit = str(salary.get("unitText") or "").upper()
+            low = high = None
+            point = _to_number(value)
+        if not currency or unit not in _PERIODS:
+            continue
+        unit_field, mult = _PERIODS[unit]
+        if point is None and low is not None and high is not None:
+            point = (low + high) / 2
+        if point is None:
+            point = low if low is not None else high
+        if point is None:
+            continue
+        result = _result(
+            unit_field,
+            low * mult if low is not None else None,
+            high * mult if high is not None else None,
+            point * mult,
+            str(currency).upper(),
+            title,
+            "high",
+            f"JobPosting JSON-LD baseSalary ({unit.lower()}) parsed locally",
+        )
+        if result is None:
+            continue
+        if posting.get("jobLocationType") == "TELECOMMUTE":
+            result["remote_ok"] = 1
+        location = posting.get("jobLocation")
+        location = location[0] if isinstance(location, list) and location else location
+        address = location.get("address") if isinstance(location, dict) else None
+        if isinstance(address, dict):
+            country = address.get("addressCountry")
+            if isinstance(country, dict):
+                country = country.get("name")
+            # ISO codes ("CA") would replace the country name on the row; keep only full names
+            result["found_country"] = country if isinstance(country, str) and len(country) > 3 else None
+            result["found_region"] = address.get("addressRegion") or None
+            result["found_city"] = address.get("addressLocality") or None
+        return result
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Salary patterns
+# ---------------------------------------------------------------------------
+
+def _pattern_amount(number: str, k: str | None) -> float:
+    value = float(number.replace(",", ""))
+    return value * 1000 if k else value
+
+
+def _from_patterns(text: str, job_title: str, country_currency: str | None) -> dict | None:
+    if not _title_matches(job_title, text):
+        return None
+    figures = {}
+    for m in _SALARY_RE.finditer(text):
+        a = _pattern_amount(m.group("a"), m.group("ak"))
+        b = _pattern_amount(m.group("b"), m.group("bk") or m.group("ak")) if m.group("b") else None
+        figures.setdefault((m.group("sym"), a, b, _UNIT_WORDS[m.group("unit").lower()]), m.group(0))
+        if len(figures) > 1:
+            return None  # several different figures — let the LLM pick the right one
+    if not figures:
+        return None
+
+    (sym, a, b, unit), matched = next(iter(figures.items()))
+    if sym == "$":
+        if country_currency and country_currency not in _DOLLAR_CURRENCIES:
+            return None  # "$" on a non-dollar market is ambiguous
+        currency = country_currency or "USD"
+    else:
+        currency = _SYMBOL_CURRENCIES[sym]
+
+    unit_field, mult = _PERIODS[unit]
+    low, high = (a, b) if b is not None else (None, None)
+    if low is not None and high is not None and low > high:
+        return None
+    mid = (a + b) / 2 if b is not None else a
+    return _result(
+        unit_field,
+        low * mult if low is not None else None,
+        high * mult if high is not None else None,
+        mid * mult,
+        currency,
+        None,
+        "medium",
+        f"Single explicit salary figure on the page ({matched.strip()}) parsed locally",
+    )
+
+
+def likely_low_confidence(page_text: str, job_title: str) -> bool:
+    """Pre-screen: will a first-pass extraction of this page probably come back low confidence?
+
+    True when the part of the page the LLM sees (first 15000 chars) has no
+    currency amount at all, or does not mention the job title.
+    """
+    text = page_text[:15000]
+    return not _MONEY_RE.search(text) or not _title_matches(job_title, text)
+
+
+def pre_extract(page_text: str, job_title: str, country_currency: str | None = None) -> dict | None:
+    """Try to extract salary data without an LLM; None means inconclusive."""
+    result = _from_json_ld(page_text, job_title)
+    if result is not None:
+        _record("json_ld")
+        return result
+    result = _from_patterns(page_text, job_title, country_currency)
+    if result is not None:
+        _record("pattern")
+        return result
+    _record("inconclusive")
+    return None
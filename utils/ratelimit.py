@@ -0,0 +1,121 @@
+"""Thread-safe per-host token-bucket rate limiting with adaptive backoff.
+
+Callers ``acquire()`` before each request and report the outcome:
+``on_success()`` lets the rate recover towards its base value, while
+``on_throttle(retry_after)`` (a 429) halves the rate and holds every thread
+for that host until the ``Retry-After`` window has passed.  Workers only wait
+when the host's quota actually demands it.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+DEFAULT_BACKOFF_SECONDS = 2.0   # first backoff when a 429 carries no Retry-After
+MAX_BACKOFF_SECONDS = 30.0      # never park workers longer than this on one 429
+RECOVERY_STEP = 0.1             # fraction of the base rate regained per success
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket shared by every thread talking to one host."""
+
+    def __init__(self, rate_per_second: float, capacity: float, min_rate_per_second: float | None = None) -> None:
+        self.base_rate = rate_per_second
+        self.min_rate = min_rate_per_second if min_rate_per_second is not None else rate_per_second / 8
+        self.capacity = capacity
+        self._rate = rate_per_second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_throttles = 0
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Take one token, sleeping only as long as needed. Returns seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Reserve the token now (tokens may go negative) and sleep outside the lock
+            self._tokens -= 1
+            wait = max(0.0, -self._tokens / self._rate, self._blocked_until - now)
+            self.acquired += 1
+            self.waited_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._consecutive_throttles = 0
+            if self._rate < self.base_rate:
+                self._refill(time.monotonic())
+                self._rate = min(self.base_rate, self._rate + self.base_rate * RECOVERY_STEP)
+
+    def on_throttle(self, retry_after: float | None = None) -> float:
+        """Record a 429; returns the backoff (seconds) every caller will now observe."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._consecutive_throttles += 1
+            self.throttled += 1
+            if retry_after is None:
+                retry_after = DEFAULT_BACKOFF_SECONDS * (2 ** (self._consecutive_throttles - 1))
+            backoff = min(retry_after, MAX_BACKOFF_SECONDS)
+            self._blocked_until = max(self._blocked_until, now + backoff)
+            self._rate = max(self.min_rate, self._rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            return backoff
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_second": round(self._rate, 3),
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited_seconds, 2),
+            }
+
+
+_limiters: dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(host: str, rate_per_second: float, capacity: float) -> TokenBucket:
+    """Return the process-wide bucket for *host*, creating it on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = TokenBucket(rate_per_second, capacity)
+            _limiters[host] = limiter
+        return limiter
+
+
+def get_rate_limit_stats() -> dict[str, dict]:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {host: limiter.stats() for host, limiter in limiters.items()}
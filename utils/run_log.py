@@ -0,0 +1,264 @@
+"""Append-only SQLite log of finished pipeline runs.
+
+Replaces ``pipeline_run_log.json``, which was read in full, appended to,
+truncated to the last 50 entries and rewritten on every run — O(n) per run,
+lossy, and racy when several Streamlit sessions finished at once.  Here each
+run is one INSERT into a WAL-mode database, so concurrent writers queue on
+SQLite's lock instead of overwriting each other, and history is kept
+indefinitely.
+
+Every entry is stored whole (as JSON) next to a few indexed columns — niche
+level, country, duration, valid rows, cache use — and one row per domain the
+run worked through, which is what the query helpers aggregate over:
+
+- ``duration_percentiles(by)`` — p50 / p95 / max run duration
+- ``hit_rates(by)`` — share of runs served from the result cache, and of
+  pages resolved without an LLM call
+- ``valid_yield(by)`` — valid rows per URL fetched, by niche level, country
+  or domain
+
+Compaction drops the full JSON of entries older than ``detail_days`` (the
+indexed columns and domain rows stay, so the helpers still cover them) and
+checkpoints the WAL; it runs at most once a day, when the log is opened.
+An existing JSON log is imported on first open and renamed to ``*.migrated``.
+"""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from utils.tracing import _percentile
+
+COMPACT_INTERVAL_SECONDS = 24 * 3600
+_GROUP_COLUMNS = {"niche_level", "country"}  # run columns the helpers can group by
+
+
+class RunLog:
+    """One row per finished run, plus its per-domain yield."""
+
+    def __init__(
+        self,
+        path: str | pathlib.Path,
+        detail_days: float | None = None,
+        legacy_json: str | pathlib.Path | None = None,
+    ) -> None:
+        self.path = pathlib.Path(path)
+        self.detail_days = detail_days
+        self.legacy_json = pathlib.Path(legacy_json) if legacy_json else None
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " run_id TEXT PRIMARY KEY,"
+                " logged_at REAL NOT NULL,"
+                " job_title TEXT,"
+                " country TEXT,"
+                " niche_level TEXT,"
+                " from_cache INTEGER NOT NULL DEFAULT 0,"
+                " duration_seconds REAL,"
+                " urls_fetched INTEGER,"
+                " rows_extracted INTEGER,"
+                " rows_valid INTEGER,"
+                " llm_calls_avoided INTEGER,"
+                " entry TEXT);"
+                "CREATE INDEX IF NOT EXISTS idx_runs_logged ON runs(logged_at);"
+                "CREATE INDEX IF NOT EXISTS idx_runs_niche ON runs(niche_level, logged_at);"
+                "CREATE INDEX IF NOT EXISTS idx_runs_country ON runs(country, logged_at);"
+                "CREATE TABLE IF NOT EXISTS run_domains ("
+                " run_id TEXT NOT NULL,"
+                " domain TEXT NOT NULL,"
+                " urls_fetched INTEGER NOT NULL,"
+                " valid_rows INTEGER NOT NULL,"
+                " PRIMARY KEY (run_id, domain));"
+                "CREATE INDEX IF NOT EXISTS idx_run_domains_domain ON run_domains(domain);"
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            )
+            self._conn = conn
+            self._migrate_json(conn)
+            self._compact_if_due(conn)
+        return self._conn
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        try:
+            with self._lock:
+                return self._connect().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"[run_log] read error: {e}")
+            return []
+
+    # -- writes -------------------------------------------------------------
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, entry: dict, logged_at: float, replace: bool = True) -> None:
+        run_id = entry.get("run_id")
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        cur = conn.execute(
+            f"{verb} INTO runs (run_id, logged_at, job_title, country, niche_level, from_cache,"
+            " duration_seconds, urls_fetched, rows_extracted, rows_valid, llm_calls_avoided, entry)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_id, logged_at, entry.get("job_title"), entry.get("country"), entry.get("niche_level"),
+                int(bool(entry.get("from_cache"))), entry.get("duration_seconds"), entry.get("urls_fetched"),
+                entry.get("rows_extracted"), entry.get("rows_valid"), entry.get("llm_calls_avoided"),
+                json.dumps(entry, default=str),
+            ),
+        )
+        if not cur.rowcount:
+            return  # already imported
+        conn.executemany(
+            "INSERT OR REPLACE INTO run_domains (run_id, domain, urls_fetched, valid_rows) VALUES (?, ?, ?, ?)",
+            [
+                (run_id, domain, y.get("urls_fetched", 0), y.get("valid_rows", 0))
+                for domain, y in (entry.get("domain_yield") or {}).items()
+            ],
+        )
+
+    def append(self, entry: dict) -> None:
+        """Log one finished run (needs a ``run_id``); ``domain_yield`` fills the per-domain table."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    self._insert(conn, entry, time.time())
+        except sqlite3.Error as e:
+            print(f"[run_log] write error: {e}")
+
+    def _migrate_json(self, conn: sqlite3.Connection) -> None:
+        """Import the old JSON log once, then rename it out of the way."""
+        if self.legacy_json is None or not self.legacy_json.exists():
+            return
+        try:
+            entries = json.loads(self.legacy_json.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[run_log] Could not read legacy log {self.legacy_json}: {e}")
+            return
+        if not isinstance(entries, list):
+            entries = []
+        # Old entries carry no timestamp; keep their order with distinct, older logged_at values
+        base = self.legacy_json.stat().st_mtime - len(entries)
+        with conn:
+            for i, entry in enumerate(entries):
+                if isinstance(entry, dict) and entry.get("run_id"):
+                    self._insert(conn, entry, base + i, replace=False)
+        try:
+            self.legacy_json.rename(self.legacy_json.with_name(self.legacy_json.name + ".migrated"))
+        except OSError:
+            pass  # another process migrated it at the same time
+        print(f"[run_log] Migrated {len(entries)} entries from {self.legacy_json}")
+
+    def _compact_if_due(self, conn: sqlite3.Connection) -> None:
+        found = conn.execute("SELECT value FROM meta WHERE key = 'compacted_at'").fetchone()
+        if found is not None and time.time() - float(found[0]) < COMPACT_INTERVAL_SECONDS:
+            return
+        self._compact(conn)
+
+    def _compact(self, conn: sqlite3.Connection) -> None:
+        with conn:
+            if self.detail_days is not None:
+                cutoff = time.time() - self.detail_days * 86400
+                cur = conn.execute("UPDATE runs SET entry = NULL WHERE logged_at < ? AND entry IS NOT NULL", (cutoff,))
+                if cur.rowcount:
+                    print(f"[run_log] Compacted {cur.rowcount} entries older than {self.detail_days} days")
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('compacted_at', ?)", (str(time.time()),),
+            )
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def compact(self) -> None:
+        """Compact now, regardless of when it last ran."""
+        try:
+            with self._lock:
+                self._compact(self._connect())
+        except sqlite3.Error as e:
+            print(f"[run_log] compaction error: {e}")
+
+    # -- reads --------------------------------------------------------------
+
+    def recent(self, limit: int = 50) -> list[dict]:
+        """Newest full entries first (compacted entries are skipped)."""
+        found = self._query(
+            "SELECT entry FROM runs WHERE entry IS NOT NULL ORDER BY logged_at DESC LIMIT ?", (limit,),
+        )
+        return [json.loads(r[0]) for r in found]
+
+    @staticmethod
+    def _group_expr(by: str | None) -> str:
+        if by is None:
+            return "'all'"
+        if by not in _GROUP_COLUMNS:
+            raise ValueError(f"cannot group runs by {by!r}; choose from {sorted(_GROUP_COLUMNS)}")
+        return f"COALESCE({by}, 'unknown')"
+
+    def duration_percentiles(self, by: str | None = None, since: float = 0.0) -> dict[str, dict[str, float]]:
+        """Group -> run count and p50 / p95 / max duration in seconds (runs logged after *since*)."""
+        found = self._query(
+            f"SELECT {self._group_expr(by)}, duration_seconds FROM runs"
+            " WHERE logged_at >= ? AND duration_seconds IS NOT NULL",
+            (since,),
+        )
+        by_group: dict[str, list[float]] = {}
+        for group, seconds in found:
+            by_group.setdefault(group, []).append(seconds)
+        return {
+            group: {
+                "runs": len(values),
+                "p50": _percentile(sorted(values), 50),
+                "p95": _percentile(sorted(values), 95),
+                "max": round(max(values), 3),
+            }
+            for group, values in sorted(by_group.items())
+        }
+
+    def hit_rates(self, by: str | None = None, since: float = 0.0) -> dict[str, dict[str, float]]:
+        """Group -> share of runs served from the result cache and of pages resolved without the LLM."""
+        found = self._query(
+            f"SELECT {self._group_expr(by)}, COUNT(*), SUM(from_cache),"
+            " SUM(COALESCE(llm_calls_avoided, 0)), SUM(COALESCE(urls_fetched, 0))"
+            " FROM runs WHERE logged_at >= ? GROUP BY 1 ORDER BY 1",
+            (since,),
+        )
+        return {
+            group: {
+                "runs": runs,
+                "result_cache_hit_rate": round(cached / runs, 3) if runs else 0.0,
+                "llm_avoided_rate": round(avoided / fetched, 3) if fetched else 0.0,
+            }
+            for group, runs, cached, avoided, fetched in found
+        }
+
+    def valid_yield(self, by: str = "domain", since: float = 0.0) -> dict[str, dict[str, float]]:
+        """Group -> URLs fetched, valid rows and valid rows per URL; *by* is "domain", "niche_level" or "country"."""
+        if by == "domain":
+            found = self._query(
+                "SELECT d.domain, COUNT(*), SUM(d.urls_fetched), SUM(d.valid_rows)"
+                " FROM run_domains d JOIN runs r ON r.run_id = d.run_id"
+                " WHERE r.logged_at >= ? GROUP BY d.domain ORDER BY d.domain",
+                (since,),
+            )
+        else:
+            found = self._query(
+                f"SELECT {self._group_expr(by)}, COUNT(*), SUM(COALESCE(urls_fetched, 0)), SUM(COALESCE(rows_valid, 0))"
+                " FROM runs WHERE logged_at >= ? AND from_cache = 0 GROUP BY 1 ORDER BY 1",
+                (since,),
+            )
+        return {
+            group: {
+                "runs": runs,
+                "urls_fetched": fetched,
+                "valid_rows": valid,
+                "valid_per_url": round(valid / fetched, 3) if fetched else 0.0,
+            }
+            for group, runs, fetched, valid in found
+        }
@@ -0,0 +1,180 @@
+"""Incremental SQLite store for pipeline results.
+
+Replaces the old whole-run JSON cache, which only saved the final valid rows
+(and only when a run finished with >= 5 of them).  Here every raw row is
+written the moment it is produced, so a run that crashes half-way, or ends
+with too few valid rows, still leaves its fetched and extracted pages behind.
+
+Rows are keyed by query (job title / country / region) and URL, and tagged
+with the run that produced them.  A later run for the same query can:
+
+- reuse a finished run outright when it ended with enough valid rows
+  (``load_complete``), exactly like the old cache hit, or
+- resume: reload the stored rows (``load_rows``), seed its seen-URL set and
+  skip the domains an earlier run already worked through (``covered_domains``);
+  the pipeline leaves out rows of transient failures so those URLs are retried.
+
+Anything older than the TTL is ignored and purged on open.
+"""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class CompletedRun:
+    run_id: str
+    finished_at: float
+    valid_count: int
+
+
+class RunStore:
+    """Per-query row store shared by every run of the pipeline."""
+
+    def __init__(self, path: str | pathlib.Path, ttl_seconds: float) -> None:
+        self.path = pathlib.Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " run_id TEXT PRIMARY KEY,"
+                " query_key TEXT NOT NULL,"
+                " started_at REAL NOT NULL,"
+                " finished_at REAL,"
+                " valid_count INTEGER);"
+                "CREATE INDEX IF NOT EXISTS idx_runs_query ON runs(query_key, finished_at);"
+                "CREATE TABLE IF NOT EXISTS rows ("
+                " query_key TEXT NOT NULL,"
+                " url TEXT NOT NULL,"
+                " run_id TEXT NOT NULL,"
+                " domain TEXT,"
+                " row TEXT NOT NULL,"
+                " valid INTEGER,"
+                " stored_at REAL NOT NULL,"
+                " PRIMARY KEY (query_key, url));"
+                "CREATE TABLE IF NOT EXISTS domains ("
+                " query_key TEXT NOT NULL,"
+                " domain TEXT NOT NULL,"
+                " run_id TEXT NOT NULL,"
+                " urls_fetched INTEGER NOT NULL,"
+                " valid_rows INTEGER NOT NULL,"
+                " finished_at REAL NOT NULL,"
+                " PRIMARY KEY (query_key, domain));"
+            )
+            self._conn = conn
+            self._purge_expired(conn)
+        return self._conn
+
+    def _purge_expired(self, conn: sqlite3.Connection) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        conn.execute("DELETE FROM rows WHERE stored_at < ?", (cutoff,))
+        conn.execute("DELETE FROM domains WHERE finished_at < ?", (cutoff,))
+        conn.execute("DELETE FROM runs WHERE started_at < ?", (cutoff,))
+        conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(sql, params)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[run_store] write error: {e}")
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        try:
+            with self._lock:
+                return self._connect().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"[run_store] read error: {e}")
+            return []
+
+    # -- writes -------------------------------------------------------------
+
+    def start_run(self, run_id: str, query_key: str) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO runs (run_id, query_key, started_at) VALUES (?, ?, ?)",
+            (run_id, query_key, time.time()),
+        )
+
+    def add_row(self, run_id: str, query_key: str, row: dict) -> None:
+        """Persist one raw (pre-normalisation) row as soon as it is produced."""
+        url = row.get("web_search_result_url")
+        if not url:
+            return
+        self._execute(
+            "INSERT OR REPLACE INTO rows (query_key, url, run_id, domain, row, valid, stored_at)"
+            " VALUES (?, ?, ?, ?, ?, NULL, ?)",
+            (query_key, url, run_id, row.get("country_specific_site_url"), json.dumps(row, default=str), time.time()),
+        )
+
+    def mark_domain_done(self, run_id: str, query_key: str, domain: str, urls_fetched: int, valid_rows: int) -> None:
+        """Record that *domain* was worked through; resumed runs skip it."""
+        self._execute(
+            "INSERT OR REPLACE INTO domains (query_key, domain, run_id, urls_fetched, valid_rows, finished_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (query_key, domain, run_id, urls_fetched, valid_rows, time.time()),
+        )
+
+    def finish_run(self, run_id: str, query_key: str, rows: list[dict]) -> None:
+        """Store each row's validation outcome and mark the run complete."""
+        valid_by_url = [
+            (r.get("valid"), query_key, r["web_search_result_url"])
+            for r in rows if r.get("web_search_result_url")
+        ]
+        valid_count = sum(1 for r in rows if r.get("valid") == 1)
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany("UPDATE rows SET valid = ? WHERE query_key = ? AND url = ?", valid_by_url)
+                conn.execute(
+                    "UPDATE runs SET finished_at = ?, valid_count = ? WHERE run_id = ?",
+                    (time.time(), valid_count, run_id),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[run_store] write error: {e}")
+
+    # -- reads --------------------------------------------------------------
+
+    def last_complete_run(self, query_key: str) -> CompletedRun | None:
+        found = self._query(
+            "SELECT run_id, finished_at, valid_count FROM runs"
+            " WHERE query_key = ? AND finished_at IS NOT NULL AND finished_at >= ?"
+            " ORDER BY finished_at DESC LIMIT 1",
+            (query_key, time.time() - self.ttl_seconds),
+        )
+        if not found:
+            return None
+        run_id, finished_at, valid_count = found[0]
+        return CompletedRun(run_id=run_id, finished_at=finished_at, valid_count=valid_count or 0)
+
+    def load_rows(self, query_key: str, valid_only: bool = False) -> list[dict]:
+        """Every unexpired raw row stored for the query, oldest first."""
+        sql = "SELECT row FROM rows WHERE query_key = ? AND stored_at >= ?"
+        if valid_only:
+            sql += " AND valid = 1"
+        found = self._query(sql + " ORDER BY stored_at", (query_key, time.time() - self.ttl_seconds))
+        return [json.loads(r[0]) for r in found]
+
+    def covered_domains(self, query_key: str) -> dict[str, dict]:
+        """domain -> {"valid_rows", "urls_fetched"} for domains already worked through."""
+        found = self._query(
+            "SELECT domain, urls_fetched, valid_rows FROM domains WHERE query_key = ? AND finished_at >= ?",
+            (query_key, time.time() - self.ttl_seconds),
+        )
+        return {d: {"valid_rows": v, "urls_fetched": u} for d, u, v in found}
@@ -0,0 +1,336 @@
+"""Cross-domain fetch scheduler for the async pipeline engine.
+
+Replaces the old fixed ``FETCH_BATCH_SIZE`` batches.  URLs from every active
+domain sit in one priority queue (earlier-ranked domains first, then each
+domain's own URL-quality order).  A bounded pool of workers pulls the next-best
+URL the moment one frees up, skipping domains that already have
+``per_domain`` fetches in flight, so a slow page never stalls its neighbours.
+
+Per-domain bail-out rules (``BAIL_LIMITS`` plus consecutive wall / network /
+no-data counters) and the domain wall-clock timeout are applied as results
+arrive; a closed domain's queued URLs are dropped immediately.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+
+@dataclass
+class DomainState:
+    """Fetch bookkeeping for one domain while it is being scheduled."""
+    domain: str
+    rank: int
+    source_type: str | None
+    bail_limit: int
+    queued: int = 0
+    in_flight: int = 0
+    urls_fetched: int = 0
+    valid_rows: int = 0
+    wall_hits: int = 0
+    network_errors: int = 0
+    consecutive_wall: int = 0
+    consecutive_network: int = 0
+    consecutive_no_data: int = 0
+    started_at: float | None = None
+    closed_reason: str | None = None  # "bail" | "timeout" | "stopped"
+    done: bool = False
+
+    def record(self, outcome: str) -> None:
+        """Update counters for one fetched URL.
+
+        outcome: "data" | "wall" | "network" | "no_data"
+        """
+        self.urls_fetched += 1
+        if outcome == "data":
+            self.valid_rows += 1
+            self.consecutive_wall = 0
+            self.consecutive_network = 0
+            self.consecutive_no_data = 0
+        elif outcome == "wall":
+            self.wall_hits += 1
+            self.consecutive_wall += 1
+            self.consecutive_network = 0
+            self.consecutive_no_data = 0
+        elif outcome == "network":
+            self.network_errors += 1
+            self.consecutive_network += 1
+            self.consecutive_wall = 0
+            self.consecutive_no_data = 0
+        else:
+            self.consecutive_no_data += 1
+            self.consecutive_wall = 0
+            self.consecutive_network = 0
+
+    def should_bail(self, bail_limits: dict[str, int]) -> bool:
+        return (
+            self.consecutive_wall >= bail_limits["wall"] or
+            self.consecutive_network >= bail_limits["network"] or
+            self.consecutive_no_data >= self.bail_limit
+        )
+
+
+class FetchScheduler:
+    """Bounded worker pool draining a priority queue of URLs across all domains.
+
+    fetch(url, state)          -> awaitable result, run by a worker
+    on_result(state, result)   -> outcome string passed to DomainState.record
+    on_domain_done(state)      -> called once a domain has nothing queued or in flight
+    should_stop()              -> True once the run has enough data; queued URLs are dropped
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, DomainState], Awaitable[Any]],
+        on_result: Callable[[DomainState, Any], str],
+        on_domain_done: Callable[[DomainState], None],
+        should_stop: Callable[[], bool],
+        workers: int,
+        per_domain: int,
+        bail_limits: dict[str, int],
+        domain_timeout: float,
+    ) -> None:
+        self._fetch = fetch
+        self._on_result = on_result
+        self._on_domain_done = on_domain_done
+        self._should_stop = should_stop
+        self._n_workers = workers
+        self._per_domain = per_domain
+        self._bail_limits = bail_limits
+        self._domain_timeout = domain_timeout
+
+        self._heap: list[tuple[int, int, int, str, DomainState]] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._changed = asyncio.Event()
+        self._closed = False
+        self._tasks: list[asyncio.Task] = []
+
+        self.pages_done = 0
+        self._first_dispatch: float | None = None
+        self._last_done: float | None = None
+
+    # -- public API ---------------------------------------------------------
+
+    def start(self) -> None:
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self._n_workers)]
+
+    def add_domain(
+        self,
+        domain: str,
+        urls: list[str],
+        rank: int,
+        source_type: str | None,
+        bail_limit: int,
+    ) -> DomainState:
+        """Queue a domain's URLs (already in quality order)."""
+        state = DomainState(domain=domain, rank=rank, source_type=source_type, bail_limit=bail_limit)
+        for url_rank, url in enumerate(urls):
+            heapq.heappush(self._heap, (rank, url_rank, next(self._seq), url, state))
+        state.queued = len(urls)
+        self._maybe_finish(state)
+        self._notify()
+        return state
+
+    @property
+    def backlog(self) -> int:
+        """Number of URLs queued but not yet dispatched."""
+        return len(self._heap)
+
+    async def wait_for_room(self, low_water: int) -> None:
+        """Block until fewer than *low_water* URLs are queued."""
+        while len(self._heap) >= low_water and not self._closed:
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def join(self) -> None:
+        """Wait until every queued URL has been fetched or dropped."""
+        while (self._heap or self._in_flight) and not self._closed:
+            self._changed.clear()
+            await self._changed.wait()
+
+    def close(self) -> None:
+        self._closed = True
+        for t in self._tasks:
+            t.cancel()
+        self._notify()
+
+    def pages_per_second(self) -> float:
+        if not self.pages_done or self._first_dispatch is None or self._last_done is None:
+            return 0.0
+        elapsed = self._last_done - self._first_dispatch
+        return self.pages_done / elapsed if elapsed > 0 else 0.0
+
+    # -- internals ----------------------------------------------------------
+
+    def _notify(self) -> None:
+        self._changed.set()
+
+    def _close_domain(self, state: DomainState, reason: str) -> None:
+        if state.closed_reason is None:
+            state.closed_reason = reason
+        if state.queued:
+            self._heap = [e for e in self._heap if e[-1] is not state]
+            heapq.heapify(self._heap)
+            state.queued = 0
+        self._maybe_finish(state)
+
+    def _maybe_finish(self, state: DomainState) -> None:
+        if not state.done and state.queued == 0 and state.in_flight == 0:
+            state.done = True
+            self._on_domain_done(state)
+
+    def _next_item(self) -> tuple[str, DomainState] | None:
+        if self._heap and self._should_stop():
+            for state in {e[-1].domain: e[-1] for e in self._heap}.values():
+                self._close_domain(state, "stopped")
+            return None
+
+        deferred = []
+        picked = None
+        now = time.time()
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            state = entry[-1]
+            if state.started_at is not None and now - state.started_at > self._domain_timeout:
+                heapq.heappush(self._heap, entry)
+                self._close_domain(state, "timeout")
+                continue
+            if state.in_flight >= self._per_domain:
+                deferred.append(entry)
+                continue
+            picked = entry
+            break
+        for entry in deferred:
+            if entry[-1].closed_reason is None:  # a timeout above may have closed it
+                heapq.heappush(self._heap, entry)
+        if picked is None:
+            return None
+        state = picked[-1]
+        state.queued -= 1
+        return picked[3], state
+
+    async def _worker(self) -> None:
+        while not self._closed:
+            item = self._next_item()
+            if item is None:
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+
+            url, state = item
+            now = time.time()
+            if state.started_at is None:
+                state.started_at = now
+            if self._first_dispatch is None:
+                self._first_dispatch = now
+            state.in_flight += 1
+            self._in_flight += 1
+            try:
+                result = await self._fetch(url, state)
+                outcome = self._on_result(state, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[scheduler] fetch error for {url}: {e}")
+                outcome = "no_data"
+            finally:
+                state.in_flight -= 1
+                self._in_flight -= 1
+
+            state.record(outcome)
+            self.pages_done += 1
+            self._last_done = time.time()
+
+            if state.closed_reason is None and state.should_bail(self._bail_limits):
+                print(
+                    f"[scheduler] Bailing on {state.domain}: wall={state.consecutive_wall}, "
+                    f"network={state.consecutive_network}, no_data={state.consecutive_no_data}"
+                )
+                self._close_domain(state, "bail")
+            self._maybe_finish(state)
+            self._notify()
+
+
+class SearchPrefetcher:
+    """Run ``search_site`` for the next few domains ahead of the fetch stage.
+
+    Results are buffered in insertion order, bounded by *depth*.  Calling
+    ``prefetch(upcoming)`` again after the domain order changes cancels every
+    search that has not started yet and re-queues the new window in order, so
+    outstanding searches follow ``_reorder_domains_by_yield``.
+    """
+
+    def __init__(
+        self,
+        search: Callable[[str], Awaitable[list[str]]],
+        depth: int,
+        concurrency: int,
+    ) -> None:
+        self._search = search
+        self._depth = depth
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: dict[str, asyncio.Task] = {}  # buffer, oldest first
+        self._started: set[str] = set()
+        self.hits = 0    # claim() found the result already buffered
+        self.misses = 0  # claim() had to wait for (or start) the search
+
+    async def _run(self, domain: str) -> list[str]:
+        async with self._slots:
+            self._started.add(domain)
+            return await self._search(domain)
+
+    def prefetch(self, upcoming: list[str]) -> None:
+        """Make sure searches are queued for the first *depth* upcoming domains."""
+        window = upcoming[:self._depth]
+
+        # Searches that have not started yet are re-queued below in the new order
+        for domain, task in list(self._tasks.items()):
+            if domain not in self._started and not task.done():
+                task.cancel()
+                del self._tasks[domain]
+
+        # A full buffer must not be held hostage by results that fell out of the window
+        for domain in [d for d, t in self._tasks.items() if t.done() and d not in window]:
+            if len(self._tasks) < self._depth:
+                break
+            print(f"[prefetch] Dropping out-of-window search result for {domain}")
+            del self._tasks[domain]
+            self._started.discard(domain)
+
+        for domain in window:
+            if len(self._tasks) >= self._depth:
+                break
+            if domain not in self._tasks:
+                self._tasks[domain] = asyncio.ensure_future(self._run(domain))
+
+    def claim(self, domain: str) -> Awaitable[list[str]]:
+        """Take *domain*'s search out of the buffer, starting it if it was not prefetched.
+
+        Claim before the next ``prefetch()``: a claimed search is never
+        cancelled, re-queued or dropped as out-of-window.  Await the result.
+        """
+        task = self._tasks.pop(domain, None)
+        if task is not None and task.done():
+            self.hits += 1
+        else:
+            self.misses += 1
+        if task is None:
+            task = asyncio.ensure_future(self._run(domain))
+        return self._result(domain, task)
+
+    async def _result(self, domain: str, task: asyncio.Task) -> list[str]:
+        try:
+            return await task
+        finally:
+            self._started.discard(domain)
+
+    def close(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
@@ -1,8 +1,11 @@
 import json
 import re
-import requests
 from typing import Optional
 
+from utils import transport
+from utils.llm_usage import create_message
+from utils.tracing import span
+
 SALARY_SITE_WHITELIST: dict[str, list[str]] = {
     "US": [
         "salary.com", "payscale.com", "glassdoor.com", "comparably.com",
@@ -199,7 +202,8 @@ def ai_suggest_salary_sources(job_title: str, country: str, anthropic_client) ->
             f'Return ONLY a JSON array of domain names, e.g. ["salary.com", "bls.gov"]. '
             f"Return 8-12 domains, highest credibility first. No explanations, no markdown."
         )
-        response = anthropic_client.messages.create(
+        response = create_message(
+            anthropic_client, "suggest_sources",
             model=_HAIKU_MODEL,
             max_tokens=256,
             messages=[{"role": "user", "content": prompt}],
@@ -283,7 +287,8 @@ def classify_job_niche(
                 f"Include alternate phrasings, common abbreviations, and related specialty titles. "
                 f"Return ONLY a JSON array of strings, no explanation."
             )
-            response = anthropic_client.messages.create(
+            response = create_message(
+                anthropic_client, "classify_niche",
                 model=_HAIKU_MODEL,
                 max_tokens=256,
                 messages=[{"role": "user", "content": prompt}],
@@ -354,7 +359,7 @@ def discover_top_sites(
     }
 
     try:
-        resp = requests.get(SERPAPI_BASE, params=params, timeout=15)
+        resp = transport.get(SERPAPI_BASE, params=params, timeout=15)
         resp.raise_for_status()
         data = resp.json()
     except Exception as e:
@@ -449,9 +454,10 @@ def search_site(
     }
 
     try:
-        resp = requests.get(SERPAPI_BASE, params=params, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
+        with span("search", domain=domain):
+            resp = transport.get(SERPAPI_BASE, params=params, timeout=15)
+            resp.raise_for_status()
+            data = resp.json()
     except Exception as e:
         print(f"[serpapi] search_site({domain}) error: {e}")
         return []
@@ -0,0 +1,137 @@
+"""Lightweight timing spans for the pipeline.
+
+``span("search", domain=...)`` times a block and records it on the run's
+``SpanRecorder``, found through a context variable — so client code (fetch,
+LLM calls) records into whichever run called it without threading a recorder
+through every signature.  asyncio tasks inherit the variable; worker threads
+do too as long as the submitting code copies the context (``ConcurrencyLimiter``
+and the claude_client pools do).  With no active recorder a span costs one
+``ContextVar.get``.
+
+The pipeline drains new spans into ``timing`` events and writes per-name
+count / total / p50 / p95 / max to the run log.
+
+``count("http.requests")`` bumps a per-run counter on the same recorder, for
+client-side tallies (pooled connections, local pre-extraction) that would
+otherwise only exist process-wide and mix concurrent runs together.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+
+@dataclass
+class Span:
+    name: str
+    start: float     # seconds since the recorder was created
+    seconds: float
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+class SpanRecorder:
+    """Thread-safe collector of the spans recorded during one run."""
+
+    def __init__(self) -> None:
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans: list[Span] = []
+        self._drained = 0
+        self._counters: dict[str, int] = {}
+
+    def add(self, name: str, started: float, seconds: float, attrs: dict[str, Any]) -> None:
+        span = Span(name, round(started - self._origin, 4), round(seconds, 4), attrs)
+        with self._lock:
+            self._spans.append(span)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def counters(self, prefix: str = "") -> dict[str, int]:
+        """Counters whose name starts with *prefix*, with the prefix stripped."""
+        with self._lock:
+            return {name[len(prefix):]: n for name, n in self._counters.items() if name.startswith(prefix)}
+
+    def drain(self) -> list[Span]:
+        """Spans recorded since the previous drain."""
+        with self._lock:
+            new = self._spans[self._drained:]
+            self._drained = len(self._spans)
+        return new
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Per span name: count, total, p50, p95 and max seconds."""
+        with self._lock:
+            by_name: dict[str, list[float]] = {}
+            for span in self._spans:
+                by_name.setdefault(span.name, []).append(span.seconds)
+        return {
+            name: {
+                "count": len(values),
+                "total": round(sum(values), 3),
+                "p50": _percentile(sorted(values), 50),
+                "p95": _percentile(sorted(values), 95),
+                "max": round(max(values), 3),
+            }
+            for name, values in sorted(by_name.items())
+        }
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return round(ordered[rank - 1], 3)
+
+
+_recorder: contextvars.ContextVar[SpanRecorder | None] = contextvars.ContextVar("span_recorder", default=None)
+
+
+def current_recorder() -> SpanRecorder | None:
+    return _recorder.get()
+
+
+def set_recorder(recorder: SpanRecorder | None) -> contextvars.Token:
+    """Make *recorder* the active one for this context (and tasks / copied contexts started from it)."""
+    return _recorder.set(recorder)
+
+
+def reset_recorder(token: contextvars.Token) -> None:
+    try:
+        _recorder.reset(token)
+    except ValueError:
+        pass  # reset from a different context (e.g. a generator closed by another task)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+    """Time the block as one span; the yielded dict can take attributes learned inside it."""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield attrs
+        return
+    started = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        recorder.add(name, started, time.perf_counter() - started, attrs)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add *n* to the active run's counter *name* (no-op outside a run)."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.count(name, n)
+
+
+def record_span(name: str, seconds: float, **attrs: Any) -> None:
+    """Record an already-measured duration that ended just now."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add(name, time.perf_counter() - seconds, seconds, attrs)
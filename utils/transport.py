@@ -0,0 +1,182 @@
+"""Shared HTTP transport for every outbound client.
+
+All clients (Jina, direct HTTP fallback, SerpAPI, BLS, frankfurter) go through
+one ``requests.Session`` whose adapter keeps a urllib3 connection pool per
+host, so repeated calls reuse keep-alive connections instead of paying a fresh
+TCP+TLS handshake each time.  Connection failures and 5xx responses are retried
+with exponential backoff; 429s are left to the caller (see ``jina_client``).
+
+Pool sizes and retry policy are module constants; call ``configure()`` to
+change them at runtime (the session is rebuilt on next use).
+
+``get_transport_stats()`` reports, per host, how many requests were served
+from a pooled connection (hits) versus how many needed a new connection
+(misses / handshakes).  The same counts go to the active run's recorder (see
+``utils.tracing.count``), so ``get_run_transport_totals()`` covers only the
+calling run's requests.
+"""
+
+from __future__ import annotations
+
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from utils.tracing import count, current_recorder
+
+POOL_CONNECTIONS = 32      # distinct hosts kept pooled at once
+POOL_MAXSIZE = 16          # keep-alive connections kept per host
+RETRY_TOTAL = 2            # retries on connection errors / retryable statuses
+RETRY_BACKOFF_FACTOR = 0.5  # sleeps 0.5s, 1s, ... between retries
+RETRY_STATUS_FORCELIST = (500, 502, 503, 504)
+
+_lock = threading.Lock()
+_session: requests.Session | None = None
+_stats: dict[str, dict[str, int]] = {}
+
+
+def _record(host: str, key: str) -> None:
+    with _lock:
+        host_stats = _stats.setdefault(host, {"requests": 0, "new_connections": 0, "tls_handshakes": 0})
+        host_stats[key] += 1
+    count(f"http.{key}")
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def urlopen(self, *args, **kwargs):
+        _record(self.host, "requests")
+        return super().urlopen(*args, **kwargs)
+
+    def _new_conn(self):
+        _record(self.host, "new_connections")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def urlopen(self, *args, **kwargs):
+        _record(self.host, "requests")
+        return super().urlopen(*args, **kwargs)
+
+    def _new_conn(self):
+        _record(self.host, "new_connections")
+        _record(self.host, "tls_handshakes")
+        return super()._new_conn()
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose per-host pools count requests and new connections."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=RETRY_TOTAL,
+        connect=RETRY_TOTAL,
+        read=0,  # a read timeout already cost the full timeout — don't double it
+        status=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_FORCELIST,
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter = _PooledAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    # Stay stateless like bare requests.get — no cookies leaking between sites/threads
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def configure(
+    pool_connections: int | None = None,
+    pool_maxsize: int | None = None,
+    retry_total: int | None = None,
+    backoff_factor: float | None = None,
+) -> None:
+    """Override pool / retry settings; the shared session is rebuilt on next use."""
+    global POOL_CONNECTIONS, POOL_MAXSIZE, RETRY_TOTAL, RETRY_BACKOFF_FACTOR, _session
+    with _lock:
+        if pool_connections is not None:
+            POOL_CONNECTIONS = pool_connections
+        if pool_maxsize is not None:
+            POOL_MAXSIZE = pool_maxsize
+        if retry_total is not None:
+            RETRY_TOTAL = retry_total
+        if backoff_factor is not None:
+            RETRY_BACKOFF_FACTOR = backoff_factor
+        old, _session = _session, None
+    if old is not None:
+        old.close()
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def get_transport_stats() -> dict[str, dict[str, int]]:
+    """Per-host counters: requests, new_connections, tls_handshakes, pool_hits, pool_misses."""
+    with _lock:
+        snapshot = {host: dict(s) for host, s in _stats.items()}
+    for s in snapshot.values():
+        _add_pool_counts(s)
+    return snapshot
+
+
+def _add_pool_counts(s: dict[str, int]) -> dict[str, int]:
+    s["pool_misses"] = s["new_connections"]
+    s["pool_hits"] = max(0, s["requests"] - s["new_connections"])
+    return s
+
+
+def get_transport_totals() -> dict[str, int]:
+    """Counters summed over all hosts."""
+    totals = {"requests": 0, "new_connections": 0, "tls_handshakes": 0, "pool_hits": 0, "pool_misses": 0}
+    for s in get_transport_stats().values():
+        for key in totals:
+            totals[key] += s[key]
+    return totals
+
+
+def get_run_transport_totals() -> dict[str, int]:
+    """get_transport_totals for the requests made by the active run only."""
+    recorder = current_recorder()
+    counted = recorder.counters("http.") if recorder is not None else {}
+    return _add_pool_counts({key: counted.get(key, 0) for key in ("requests", "new_connections", "tls_handshakes")})
+
+
+def reset_transport_stats() -> None:
+    with _lock:
+        _stats.clear()